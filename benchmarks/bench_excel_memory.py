@@ -0,0 +1,103 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Benchmark of the peak memory of reading and writing XLSX files                     #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Benchmark of the peak resident memory of reading and writing XLSX workbooks,
+pandas (openpyxl / xlsxwriter) against the low-memory excel_io functions.
+
+Each measurement runs in a fresh interpreter, the peak memory of importing pandas
+is measured the same way and subtracted.
+
+    python ./benchmarks/bench_excel_memory.py --rows 100000 500000 1000000
+'''
+# Standard libraries
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+LIB_DIR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'masking_policy_for_small_populations_lib')
+
+SETUP_CODE = '''
+import resource, sys, time
+import numpy as np
+import pandas as pd
+from excel_io import read_excel_low_memory, write_excel_low_memory
+'''
+GENERATE_CODE = '''
+rows = int(sys.argv[2])
+rng = np.random.default_rng(0)
+data = pd.DataFrame({'PARTITION_COLUMN_01': rng.choice(['A', 'B', 'C'], rows),
+                     'SUBCATEGORY_COLUMN_01': rng.choice(['X', 'Y'], rows),
+                     'MEASURE_COLUMN_01': rng.integers(0, 100, rows),
+                     'MEASURE_COLUMN_02': rng.integers(0, 100, rows).astype(str)})
+'''
+CASE_CODE_DICT = {
+    'baseline': '',
+    'pandas read': 'data = pd.read_excel(sys.argv[1])',
+    'low-memory read': 'data = read_excel_low_memory(sys.argv[1])',
+    'pandas write': GENERATE_CODE + '''
+with pd.ExcelWriter(sys.argv[1] + '.out.xlsx', engine='xlsxwriter') as writer:
+    data.to_excel(writer, index=False)
+''',
+    'low-memory write': GENERATE_CODE + "write_excel_low_memory(data, sys.argv[1] + '.out.xlsx')",
+}
+REPORT_CODE = '''
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def run_case(case_name: str, input_file_path: str, rows: int) -> tuple[float, float]:
+    '''
+    Peak memory and wall time of one case in a fresh interpreter
+
+    Args:
+        case_name (str): case name, key of CASE_CODE_DICT
+        input_file_path (str): full path to the XLSX file to read
+        rows (int): number of rows
+
+    Returns:
+        peak_mib (float): peak resident memory in MiB
+        seconds (float): wall time
+    '''
+    code = SETUP_CODE + CASE_CODE_DICT[case_name] + REPORT_CODE
+    environment = dict(os.environ, PYTHONPATH=LIB_DIR_PATH)
+    start_time = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code, input_file_path, str(rows)], env=environment,
+                            check=True, capture_output=True, text=True).stdout
+    seconds = time.perf_counter() - start_time
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak_kib = int(output.strip().splitlines()[-1]) / (1024 if sys.platform == 'darwin' else 1)
+    return peak_kib / 1024, seconds
+
+def main() -> None:
+    '''
+    Benchmark execution
+    '''
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 500_000, 1_000_000], help='workbook sizes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir_path:
+        for rows in args.rows:
+            input_file_path = os.path.join(temp_dir_path, f'bench_{rows}.xlsx')
+            # Write cases write next to the input workbook, which is left untouched
+            subprocess.run([sys.executable, '-c', SETUP_CODE + GENERATE_CODE + 'write_excel_low_memory(data, sys.argv[1])',
+                            input_file_path, str(rows)], env=dict(os.environ, PYTHONPATH=LIB_DIR_PATH), check=True)
+            baseline_mib, _ = run_case('baseline', input_file_path, rows)
+            print(f'{rows:,} rows')
+            for case_name in ['pandas read', 'low-memory read', 'pandas write', 'low-memory write']:
+                peak_mib, seconds = run_case(case_name, input_file_path, rows)
+                print(f'    {case_name + ":":<20}{peak_mib - baseline_mib:10.1f} MiB peak{seconds:10.2f} s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Benchmark of the cold start import time of the masking modules                     #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Benchmark of the cold start time of importing the masking modules in a fresh interpreter.
+
+The bare interpreter start-up is measured the same way and subtracted. The benchmark fails
+if the median import time is above the budget, or if a heavy module (pandas, numpy, tkinter)
+is loaded by the import itself.
+
+    python ./benchmarks/bench_import_time.py --runs 20 --budget-ms 50
+'''
+# Standard libraries
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+LIB_DIR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'masking_policy_for_small_populations_lib')
+IMPORTED_MODULE_NAMES = ['masking_policy_for_small_populations', 'batch_masking']
+HEAVY_MODULE_NAMES = ['pandas', 'numpy', 'tkinter']
+
+
+def time_interpreter(code: str, runs: int) -> float:
+    '''
+    Median wall time of running code in a fresh interpreter
+
+    Args:
+        code (str): python code passed to -c
+        runs (int): number of runs
+
+    Returns:
+        median_seconds (float): median wall time
+    '''
+    environment = dict(os.environ, PYTHONPATH=LIB_DIR_PATH, PYTHONDONTWRITEBYTECODE='1')
+    run_seconds: list[float] = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env=environment, check=True)
+        run_seconds.append(time.perf_counter() - start_time)
+    return statistics.median(run_seconds)
+
+def get_loaded_heavy_modules() -> list[str]:
+    '''
+    Heavy modules loaded by importing the masking modules
+
+    Returns:
+        heavy_module_names (list[str]): names of loaded heavy modules
+    '''
+    code = f'import sys, {", ".join(IMPORTED_MODULE_NAMES)}; ' \
+           f'print(",".join(m for m in {HEAVY_MODULE_NAMES!r} if m in sys.modules))'
+    environment = dict(os.environ, PYTHONPATH=LIB_DIR_PATH)
+    output = subprocess.run([sys.executable, '-c', code], env=environment, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    return [module_name for module_name in output.split(',') if module_name]
+
+def main() -> None:
+    '''
+    Benchmark execution
+    '''
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20, help='fresh interpreters per measurement')
+    parser.add_argument('--budget-ms', type=float, default=50, help='import time budget above the bare interpreter')
+    args = parser.parse_args()
+
+    interpreter_seconds = time_interpreter('pass', args.runs)
+    import_seconds = time_interpreter(f'import {", ".join(IMPORTED_MODULE_NAMES)}', args.runs)
+    import_ms = (import_seconds - interpreter_seconds) * 1000
+    heavy_module_names = get_loaded_heavy_modules()
+
+    print(f'{"bare interpreter:":<30}{interpreter_seconds * 1000:8.1f} ms')
+    print(f'{"masking modules import:":<30}{import_ms:8.1f} ms (budget {args.budget_ms:.0f} ms)')
+    print(f'{"heavy modules loaded:":<30}{", ".join(heavy_module_names) or "none"}')
+    if import_ms > args.budget_ms or heavy_module_names:
+        sys.exit('Import time budget exceeded!')
+
+if __name__ == '__main__':
+    main()
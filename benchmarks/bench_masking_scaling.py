@@ -0,0 +1,109 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Benchmark of apply_full_masking scaling with the number of rows                    #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Benchmark of apply_full_masking on synthetic data for the three Measure Columns Relation Types,
+from 10^3 to 10^7 rows.
+
+For each size the best of --repeats runs is reported with the time per row and the scaling
+exponent against the previous size (1.0 is linear). Results can be saved with --output and
+compared to a saved baseline with --baseline; the benchmark fails if any case is slower than
+the baseline by more than --tolerance.
+
+    python ./benchmarks/bench_masking_scaling.py --rows 1000 10000 100000 1000000 --output scaling.json
+    python ./benchmarks/bench_masking_scaling.py --rows 1000 10000 100000 1000000 --baseline scaling.json
+'''
+# Standard libraries
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'masking_policy_for_small_populations_lib'))
+
+# User-defined libraries
+import masking_policy_for_small_populations
+from synthetic_data import generate_masking_data, get_synthetic_masking_spec
+
+RELATION_TYPE_NAMES: dict[str, str] = {'0': 'none', '1': 'rate', '2': 'sum'}
+
+
+def time_masking(n_rows: int, relation_type: str, repeats: int, seed: int) -> float:
+    '''
+    Best wall time of apply_full_masking on synthetic data
+
+    Args:
+        n_rows (int): number of rows
+        relation_type (str): '0' (none), '1' (rate) or '2' (sum)
+        repeats (int): number of runs
+        seed (int): random seed
+
+    Returns:
+        seconds (float): best wall time
+    '''
+    synthetic_data = generate_masking_data(n_rows, relation_type, seed=seed)
+    masking_arguments = get_synthetic_masking_spec(synthetic_data, relation_type).masking_arguments(synthetic_data.columns)
+    run_seconds: list[float] = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        masking_policy_for_small_populations.apply_full_masking(synthetic_data, **masking_arguments)
+        run_seconds.append(time.perf_counter() - start_time)
+    return min(run_seconds)
+
+def main() -> None:
+    '''
+    Benchmark execution
+    '''
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10**3, 10**4, 10**5, 10**6, 10**7], help='dataset sizes')
+    parser.add_argument('--relation-types', nargs='+', default=['0', '1', '2'], choices=['0', '1', '2'])
+    parser.add_argument('--repeats', type=int, default=3, help='runs per case, the best one is kept')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the synthetic data')
+    parser.add_argument('--output', default=None, help='JSON file to save the results to')
+    parser.add_argument('--baseline', default=None, help='JSON file of previous results to compare to')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    baseline_results: dict[str, float] = {}
+    if args.baseline is not None:
+        with open(args.baseline, 'r', encoding='utf-8') as baseline_file:
+            baseline_results = json.load(baseline_file)
+
+    results: dict[str, float] = {}
+    regressions: list[str] = []
+    for relation_type_enum in args.relation_types:
+        print(f'Relation type {RELATION_TYPE_NAMES[relation_type_enum]}')
+        previous_case: tuple[int, float] | None = None
+        for n_rows_enum in sorted(args.rows):
+            seconds = time_masking(n_rows_enum, relation_type_enum, args.repeats, args.seed)
+            case_name = f'{RELATION_TYPE_NAMES[relation_type_enum]}/{n_rows_enum}'
+            results[case_name] = seconds
+            scaling_text = ''
+            if previous_case is not None:
+                scaling_text = f'exponent {math.log(seconds / previous_case[1]) / math.log(n_rows_enum / previous_case[0]):5.2f}'
+            baseline_text = ''
+            if case_name in baseline_results:
+                slowdown = seconds / baseline_results[case_name]
+                baseline_text = f'x{slowdown:5.2f} vs baseline'
+                if slowdown > args.tolerance:
+                    regressions.append(case_name)
+            print(f'    {n_rows_enum:>12,} rows{seconds:10.3f} s{seconds / n_rows_enum * 1e6:10.2f} us/row    {scaling_text:<16}{baseline_text}')
+            previous_case = (n_rows_enum, seconds)
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=4)
+    if regressions:
+        sys.exit(f'Slower than baseline by more than x{args.tolerance}: {", ".join(regressions)}')
+
+if __name__ == '__main__':
+    main()
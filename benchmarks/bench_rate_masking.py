@@ -0,0 +1,114 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Benchmark of the horizontal masking procedure for Rate relation                    #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Benchmark comparing the row-by-row Rate masking loop with the vectorized apply_rate_masking.
+
+The row loop is timed on a slice of the synthetic data and extrapolated to the full row count.
+
+    python ./benchmarks/bench_rate_masking.py --rows 1000000 --loop-rows 20000
+'''
+# Standard libraries
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'masking_policy_for_small_populations_lib'))
+
+# User-defined libraries
+from masking_engine import get_measure_value_matrix, apply_simple_masking, apply_rate_masking # pylint: disable=wrong-import-position
+
+
+def generate_rate_data(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    '''
+    Generating a synthetic Rate file with numerator, denominator and rate columns
+
+    Args:
+        n_rows (int): number of rows
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        rate_data (pd.DataFrame): synthetic data
+    '''
+    rng = np.random.default_rng(seed)
+    denominator = rng.integers(0, 200, n_rows)
+    numerator = rng.binomial(denominator, 0.3)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(denominator > 0, numerator / denominator, 0)
+    return pd.DataFrame({'MEASURE_COLUMN_NUMERATOR': numerator,
+                         'MEASURE_COLUMN_DENOMINATOR': denominator,
+                         'MEASURE_COLUMN_RATE': rate})
+
+def row_loop_rate_masking(unmasked_data: pd.DataFrame,
+                          measure_column_names: list[str],
+                          masked_cells: np.ndarray) -> np.ndarray:
+    '''
+    Row-by-row Rate masking as done before apply_rate_masking
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        measure_column_names (list[str]): numerator and denominator column names
+        masked_cells (np.ndarray): boolean matrix of masked cells so far
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells
+    '''
+    masked_cells = masked_cells.copy()
+    for row_position_enum, row_index_enum in enumerate(unmasked_data.index.values):
+        if masked_cells[row_position_enum].any():
+            masked_cells[row_position_enum] = True
+        temp_value_list = []
+        for column_name_enum in measure_column_names:
+            if unmasked_data.loc[row_index_enum, column_name_enum] not in [None, 'nan']:
+                temp_value_list.append(unmasked_data.loc[row_index_enum, measure_column_names])
+        if len(temp_value_list) >= 1:
+            try:
+                n1min = min(temp_value_list)
+                if 1 <= n1min <= 9:
+                    masked_cells[row_position_enum] = True
+            except (ValueError, TypeError):
+                pass
+    return masked_cells
+
+def main() -> None:
+    '''
+    Benchmark execution
+    '''
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='rows of synthetic Rate data')
+    parser.add_argument('--loop-rows', type=int, default=20_000, help='rows timed with the row loop')
+    args = parser.parse_args()
+
+    measure_column_names = ['MEASURE_COLUMN_NUMERATOR', 'MEASURE_COLUMN_DENOMINATOR']
+    rate_data = generate_rate_data(args.rows)
+    measure_values = get_measure_value_matrix(rate_data, measure_column_names)
+    masked_cells = apply_simple_masking(measure_values, 1, 9)
+
+    start_time = time.perf_counter()
+    vectorized_masked_cells = apply_rate_masking(measure_values, masked_cells, 1, 9)
+    vectorized_seconds = time.perf_counter() - start_time
+
+    loop_rows = min(args.loop_rows, args.rows)
+    start_time = time.perf_counter()
+    loop_masked_cells = row_loop_rate_masking(rate_data.iloc[:loop_rows], measure_column_names, masked_cells[:loop_rows])
+    loop_seconds = (time.perf_counter() - start_time) * args.rows / loop_rows
+
+    if not np.array_equal(loop_masked_cells, vectorized_masked_cells[:loop_rows]):
+        sys.exit('Row loop and vectorized Rate masking disagree!')
+    print(f'rows: {args.rows:,}')
+    print(f'{f"row loop (extrapolated from {loop_rows:,} rows):":<45}{loop_seconds:10.3f} s')
+    print(f'{"vectorized:":<45}{vectorized_seconds:10.3f} s')
+    print(f'speedup: {loop_seconds / vectorized_seconds:,.0f}x')
+
+if __name__ == '__main__':
+    main()
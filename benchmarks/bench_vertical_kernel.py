@@ -0,0 +1,154 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Benchmark of the vertical masking kernels                                          #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Benchmark comparing the kernels of the vertical masking procedure on every subcategory subset of
+synthetic data: the unsorted NumPy scan (get_group_two_smallest), the NumPy kernel on rows sorted
+by group and, when Numba is installed, the compiled loop kernel. Compilation is timed separately.
+
+    python ./benchmarks/bench_vertical_kernel.py --rows 1000000 --repeats 3
+'''
+# Standard libraries
+import argparse
+import itertools
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'masking_policy_for_small_populations_lib'))
+
+# User-defined libraries
+from masking_engine import get_measure_value_matrix, get_column_codes, combine_group_codes, get_group_offsets, \
+    get_group_two_smallest
+from masking_kernels import get_sorted_vertical_limits, load_jit_kernel
+from synthetic_data import generate_masking_data, get_synthetic_masking_spec
+
+
+def get_unsorted_vertical_limits(measure_values: np.ndarray,
+                                 group_codes: np.ndarray,
+                                 n_groups: int) -> np.ndarray:
+    '''
+    Vertical masking limits from the unsorted NumPy scan, as done before the sorted kernels
+
+    Args:
+        measure_values (np.ndarray): float matrix of measure values
+        group_codes (np.ndarray): integer group code per row, -1 for no group
+        n_groups (int): number of groups
+
+    Returns:
+        group_limits (np.ndarray): float matrix of the smallest value of the group for its two smallest
+            non-zero values, inf for other cells
+    '''
+    valid_cells, n1min, n2min = get_group_two_smallest(measure_values, group_codes, n_groups)
+    row_positions, column_positions = np.nonzero(valid_cells)
+    cell_groups = group_codes[row_positions]
+    cell_n1min = n1min[cell_groups, column_positions]
+    cell_values = measure_values[row_positions, column_positions]
+    smallest_cells = (cell_values == cell_n1min) | (cell_values == n2min[cell_groups, column_positions])
+    group_limits = np.full(measure_values.shape, np.inf)
+    group_limits[row_positions[smallest_cells], column_positions[smallest_cells]] = cell_n1min[smallest_cells]
+    return group_limits
+
+def get_sorted_kernel_limits(measure_values: np.ndarray,
+                             row_order: np.ndarray,
+                             group_offsets: np.ndarray,
+                             use_jit: bool) -> np.ndarray:
+    '''
+    Vertical masking limits from a sorted kernel
+
+    Args:
+        measure_values (np.ndarray): float matrix of measure values
+        row_order (np.ndarray): row positions sorted by group code
+        group_offsets (np.ndarray): start of each group in row_order, plus the end of the last group
+        use_jit (bool): True for the compiled kernel, False for NumPy
+
+    Returns:
+        group_limits (np.ndarray): float matrix of the smallest value of the group for its two smallest
+            non-zero values, inf for other cells
+    '''
+    grouped_rows = row_order[group_offsets[0]:]
+    group_limits = np.full(measure_values.shape, np.inf)
+    group_limits[grouped_rows] = get_sorted_vertical_limits(measure_values[grouped_rows], group_offsets - group_offsets[0],
+                                                            use_jit)
+    return group_limits
+
+def time_kernel(kernel, groupings: list, repeats: int) -> tuple[float, list[np.ndarray]]:
+    '''
+    Best time of a kernel over all groupings
+
+    Args:
+        kernel (Callable): kernel taking a grouping
+        groupings (list): group codes, number of groups, row order and group offsets per subcategory subset
+        repeats (int): number of timed runs
+
+    Returns:
+        best_seconds (float): best time of a run over all groupings
+        group_limits_list (list[np.ndarray]): limits per grouping
+    '''
+    best_seconds = np.inf
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        group_limits_list = [kernel(grouping_enum) for grouping_enum in groupings]
+        best_seconds = min(best_seconds, time.perf_counter() - start_time)
+    return best_seconds, group_limits_list
+
+def main() -> None:
+    '''
+    Benchmark execution
+    '''
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='rows of synthetic Sum data')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per kernel, the best one is kept')
+    args = parser.parse_args()
+
+    synthetic_data = generate_masking_data(n_rows=args.rows)
+    masking_spec = get_synthetic_masking_spec(synthetic_data)
+    measure_values = get_measure_value_matrix(synthetic_data, masking_spec.measure_columns)
+    column_codes_dict = {column_name_enum: get_column_codes(synthetic_data[column_name_enum]) \
+                         for column_name_enum in masking_spec.partition_columns + masking_spec.subcategory_columns}
+    groupings = []
+    for subcategory_column_names_subset in itertools.combinations(masking_spec.subcategory_columns,
+                                                                  len(masking_spec.subcategory_columns)-1):
+        group_codes, n_groups = combine_group_codes([column_codes_dict[column_name_enum] for column_name_enum \
+                                                     in masking_spec.partition_columns + list(subcategory_column_names_subset)],
+                                                    len(synthetic_data))
+        groupings.append((group_codes, n_groups) + get_group_offsets(group_codes, n_groups))
+
+    unsorted_seconds, expected_limits_list = time_kernel(
+        lambda grouping: get_unsorted_vertical_limits(measure_values, grouping[0], grouping[1]), groupings, args.repeats)
+    sort_seconds, _ = time_kernel(lambda grouping: get_group_offsets(grouping[0], grouping[1]), groupings, args.repeats)
+    kernel_seconds_dict = {}
+    kernel_seconds_dict['NumPy, sorted:'], numpy_limits_list = time_kernel(
+        lambda grouping: get_sorted_kernel_limits(measure_values, grouping[2], grouping[3], False), groupings, args.repeats)
+    if any(not np.array_equal(limits_enum, expected_enum) for limits_enum, expected_enum in zip(numpy_limits_list, expected_limits_list)):
+        sys.exit('Sorted NumPy kernel and unsorted scan disagree!')
+    compile_seconds = None
+    if load_jit_kernel() is not None:
+        start_time = time.perf_counter()
+        get_sorted_vertical_limits(measure_values[:10], np.array([0, 10]), True)
+        compile_seconds = time.perf_counter() - start_time
+        kernel_seconds_dict['Numba, sorted:'], jit_limits_list = time_kernel(
+            lambda grouping: get_sorted_kernel_limits(measure_values, grouping[2], grouping[3], True), groupings, args.repeats)
+        if any(not np.array_equal(limits_enum, expected_enum) for limits_enum, expected_enum in zip(jit_limits_list, expected_limits_list)):
+            sys.exit('Numba kernel and unsorted scan disagree!')
+
+    print(f'rows: {args.rows:,}, groupings: {len(groupings)}, groups: {sum(grouping[1] for grouping in groupings):,}')
+    print(f'{"NumPy, unsorted (get_group_two_smallest):":<45}{unsorted_seconds:10.3f} s')
+    print(f'{"sorting rows by group (get_group_offsets):":<45}{sort_seconds:10.3f} s')
+    for kernel_label, kernel_seconds in kernel_seconds_dict.items():
+        print(f'{kernel_label:<45}{kernel_seconds:10.3f} s   speedup: {unsorted_seconds / kernel_seconds:.1f}x')
+    if compile_seconds is None:
+        print('Numba, sorted:                               not installed')
+    else:
+        print(f'{"Numba compilation or cache load:":<45}{compile_seconds:10.3f} s')
+
+if __name__ == '__main__':
+    main()
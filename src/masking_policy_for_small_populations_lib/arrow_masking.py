@@ -0,0 +1,177 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Masking of Parquet and Arrow (Feather) files with column projection                #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing masking of Parquet and Arrow IPC (Feather) files.
+
+Only the partition, subcategory and measure columns are decoded into pandas to determine the masked
+cells. The remaining columns stay as Arrow arrays and are written back unchanged, while measure and
+additional masking columns are replaced by string columns holding the masking string.
+'''
+# Standard libraries
+import os
+
+# User-defined libraries
+from  terminal_interactions import OutputClass
+from masking_policy_for_small_populations import GlobalMaskingPol
+
+ARROW_FILE_EXTENSIONS: list[str] = ['.parquet', '.feather', '.arrow']
+
+
+def read_arrow_table(input_file_path: str, column_names: list[str] | None = None):
+    '''
+    Reading a Parquet or Arrow IPC file into an Arrow table, decoding only the requested columns
+
+    Args:
+        input_file_path (str): full path to file
+        column_names (list[str] | None, optional): columns to read, all columns if None. Defaults to None.
+
+    Returns:
+        arrow_table (pyarrow.Table): table
+    '''
+    try:
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ModuleNotFoundError as import_error:
+        raise ImportError('Parquet and Arrow files require the pyarrow package') from import_error
+    if os.path.splitext(input_file_path)[1].lower() == '.parquet':
+        return pyarrow.parquet.read_table(input_file_path, columns=column_names)
+    return pyarrow.feather.read_table(input_file_path, columns=column_names)
+
+def write_arrow_table(arrow_table, output_file_path: str) -> None:
+    '''
+    Writing an Arrow table into a Parquet or Arrow IPC file
+
+    Args:
+        arrow_table (pyarrow.Table): table
+        output_file_path (str): full path to file
+    '''
+    import pyarrow.feather
+    import pyarrow.parquet
+    if os.path.splitext(output_file_path)[1].lower() == '.parquet':
+        pyarrow.parquet.write_table(arrow_table, output_file_path)
+    else:
+        pyarrow.feather.write_feather(arrow_table, output_file_path)
+
+def get_arrow_column_names(input_file_path: str) -> list[str]:
+    '''
+    Reading the column names of a Parquet or Arrow IPC file without reading its data
+
+    Args:
+        input_file_path (str): full path to file
+
+    Returns:
+        column_names (list[str]): column names
+    '''
+    import pyarrow.ipc
+    import pyarrow.parquet
+    if os.path.splitext(input_file_path)[1].lower() == '.parquet':
+        return list(pyarrow.parquet.read_schema(input_file_path).names)
+    with pyarrow.ipc.open_file(input_file_path) as arrow_reader:
+        return list(arrow_reader.schema.names)
+
+def mask_arrow_file(input_file_path: str,
+                    masking_string: str = 'Msk',
+                    partition_column_numbers: list | None = None,
+                    subcategory_column_numbers: list | None = None,
+                    measure_columns_relation_type: str | None = None,
+                    measure_column_numbers: list | None = None,
+                    additional_masking_column_flag: bool = False,
+                    additional_masking_column_numbers: list | None = None,
+                    masking_policy: GlobalMaskingPol | None = None,
+                    max_workers: int | None = None,
+                    masking_cache=None,
+                    compact_flag: bool = False) -> str:
+    '''
+    Masking a Parquet or Arrow IPC file, decoding only the columns used for masking.
+    Column, worker and cache arguments are the same as apply_full_masking, all column arguments are required.
+
+    Args:
+        input_file_path (str): full path to a Parquet or Arrow IPC file
+        masking_string (str, optional): string to replace number to be masked. Defaults to 'Msk'.
+        partition_column_numbers (list | None, optional): partition columns (see User_Guide). Defaults to None.
+        subcategory_column_numbers (list | None, optional): subcategory columns (see User_Guide). Defaults to None.
+        measure_columns_relation_type (str | None, optional): measure columns relation type. Defaults to None.
+        measure_column_numbers (list | None, optional): measure columns (see User_Guide). Defaults to None.
+        additional_masking_column_flag (bool, optional): boolean for additional columns to be masked. Defaults to False.
+        additional_masking_column_numbers (list | None, optional): additional columns to be masked (see User_Guide). Defaults to None.
+        masking_policy (GlobalMaskingPol | None, optional): masking limits. Defaults to None (GlobalMaskingPol()).
+        max_workers (int | None, optional): number of processes to mask partitions in parallel. Defaults to None (serial).
+        masking_cache (MaskingCache | None, optional): on-disk cache of masked cells (see masking_cache). Defaults to None.
+        compact_flag (bool, optional): encode the decoded partition and subcategory columns as categoricals and narrow
+            measure columns (see compact_unmasked_data). Defaults to False.
+
+    Returns:
+        output_file_path (str): full path to masked file
+    '''
+    import pyarrow
+    from masking_engine import compute_masked_cells, compute_masked_cells_parallel
+    from masking_policy_for_small_populations import compact_unmasked_data
+
+    if os.path.splitext(input_file_path)[1].lower() not in ARROW_FILE_EXTENSIONS:
+        raise ValueError(f'{os.path.basename(input_file_path)} is not a Parquet or Arrow file')
+    if partition_column_numbers is None or subcategory_column_numbers is None \
+        or measure_columns_relation_type is None or measure_column_numbers is None:
+        raise ValueError('Masking Parquet and Arrow files requires partition, subcategory and measure columns')
+    if masking_policy is None:
+        masking_policy = GlobalMaskingPol()
+
+    column_names = get_arrow_column_names(input_file_path)
+    partition_column_names = [column_names[int(column_number_enum)-1] for column_number_enum in partition_column_numbers]
+    subcategory_column_names = [column_names[int(column_number_enum)-1] for column_number_enum in subcategory_column_numbers]
+    measure_column_names = [column_names[int(column_number_enum)-1] for column_number_enum in measure_column_numbers]
+    additional_masking_column_names: list[str] = []
+    if additional_masking_column_flag:
+        additional_masking_column_names = [column_names[int(column_number_enum)-1] \
+                                           for column_number_enum in additional_masking_column_numbers or []]
+
+    # Only the columns used to determine the masked cells are decoded into pandas
+    masking_data = read_arrow_table(input_file_path, list(dict.fromkeys(
+        partition_column_names + subcategory_column_names + measure_column_names))).to_pandas()
+    if compact_flag:
+        masking_data = compact_unmasked_data(masking_data, partition_column_names + subcategory_column_names)
+    masked_cells = None
+    if masking_cache is not None:
+        cache_key = masking_cache.get_key(masking_data, partition_column_names, subcategory_column_names,
+                                          measure_columns_relation_type, measure_column_names, masking_policy)
+        masked_cells = masking_cache.get(cache_key, (len(masking_data), len(measure_column_names)))
+    if masked_cells is None:
+        if max_workers is None:
+            masked_cells = compute_masked_cells(masking_data, partition_column_names, subcategory_column_names,
+                                                measure_columns_relation_type, measure_column_names,
+                                                masking_policy.gmp_msk_min, masking_policy.gmp_msk_max,
+                                                complementary_suppression=masking_policy.gmp_complementary)
+        else:
+            masked_cells = compute_masked_cells_parallel(masking_data, partition_column_names, subcategory_column_names,
+                                                         measure_columns_relation_type, measure_column_names,
+                                                         masking_policy.gmp_msk_min, masking_policy.gmp_msk_max,
+                                                         max_workers, complementary_suppression=masking_policy.gmp_complementary)
+        if masking_cache is not None:
+            masking_cache.put(cache_key, masked_cells)
+    del masking_data
+
+    # Columns to be masked are rewritten as strings, as apply_full_masking does, all others are kept as read
+    arrow_table = read_arrow_table(input_file_path)
+    masked_rows = masked_cells.any(axis=1)
+    masked_column_dict = {column_name_enum: masked_cells[:, column_position_enum] \
+                          for column_position_enum, column_name_enum in enumerate(measure_column_names)}
+    for column_name_enum in additional_masking_column_names:
+        masked_column_dict[column_name_enum] = masked_rows
+    for column_name_enum, column_masked_cells in masked_column_dict.items():
+        column_strings = arrow_table.column(column_name_enum).to_pandas().astype(str).mask(column_masked_cells, masking_string)
+        arrow_table = arrow_table.set_column(arrow_table.schema.get_field_index(column_name_enum), column_name_enum,
+                                             pyarrow.array(column_strings.to_numpy(dtype=object), type=pyarrow.string()))
+
+    file_root, file_extension = os.path.splitext(input_file_path)
+    output_file_path = f'{file_root}_Masked{file_extension}'
+    OutputClass.process(f'Generating {os.path.basename(output_file_path)}')
+    write_arrow_table(arrow_table, output_file_path)
+    OutputClass.success(f'{output_file_path} is generated!')
+    return output_file_path
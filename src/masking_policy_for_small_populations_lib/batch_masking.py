@@ -0,0 +1,554 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Headless masking of files driven by a declarative masking spec                     #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing unattended masking of one or more files with a JSON or TOML masking spec.
+
+Example spec (JSON):
+
+    {
+        "partition_columns": ["PARTITION_COLUMN_01", "PARTITION_COLUMN_02"],
+        "subcategory_columns": ["SUBCATEGORY_COLUMN_01", "SUBCATEGORY_COLUMN_02"],
+        "measure_columns_relation_type": "2",
+        "measure_columns": ["MEASURE_COLUMN_SUM", "MEASURE_COLUMN_01", "MEASURE_COLUMN_02"],
+        "additional_masking_columns": ["MEASURE_COLUMN_RATE"],
+        "masking_string": "Msk",
+        "gmp_msk_min": 1,
+        "gmp_msk_max": 9,
+        "complementary_suppression": false,
+        "compact_dtypes": false
+    }
+
+Measure columns are given in the same order as in the interactive routine:
+numerator then denominator for Rate ('1'), Sum Column then Element Columns for Sum ('2').
+compact_dtypes reads partition and subcategory columns as categoricals and narrows numeric columns.
+
+Invalid specs and unsupported requests raise MaskingSpecError; only the command line turns it into an exit.
+
+    python ./src/masking_policy_for_small_populations_lib/batch_masking.py --spec spec.json file_01.csv file_02.xlsx
+    python ./src/masking_policy_for_small_populations_lib/batch_masking.py --spec spec.json --file-workers 8 ./tables/
+'''
+from __future__ import annotations
+
+# Standard libraries
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import TYPE_CHECKING
+
+# User-defined libraries
+from  terminal_interactions import OutputClass
+import masking_policy_for_small_populations
+from masking_policy_for_small_populations import GlobalMaskingPol
+import arrow_masking
+from arrow_masking import ARROW_FILE_EXTENSIONS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Command line options that cannot be given together: each option and the options it excludes
+INCOMPATIBLE_OPTIONS: dict[str, list[str]] = {
+    '--masked-cells': ['--stream', '--incremental', '--file-workers', '--report', '--cache-dir'],
+    '--stream': ['--incremental', '--file-workers', '--report', '--cache-dir', '--max-workers'],
+    '--incremental': ['--file-workers', '--report', '--cache-dir'],
+    '--file-workers': ['--report', '--cache-dir', '--max-workers'],
+}
+
+# Command line options that are only used together with another option
+REQUIRED_OPTIONS: dict[str, str] = {
+    '--presorted': '--stream',
+}
+
+# Endings of the file names written next to the input files, skipped when directories are expanded
+OUTPUT_FILE_SUFFIXES: list[str] = ['_Masked', '_Masked_cells', '_Policy_sweep', '_Policy_sweep_cells']
+
+
+class MaskingSpecError(ValueError):
+    '''
+        Class of errors in a masking spec, or in a request it cannot be used for
+    '''
+
+
+class MaskingSpec:
+    '''
+        Class to define the columns and limits used to mask a file
+    '''
+    relation_type_options: dict[str, str] = {'0': '0', 'none': '0',
+                                             '1': '1', 'rate': '1',
+                                             '2': '2', 'sum': '2'}
+
+    def __init__(self,
+                 partition_columns: list[str],
+                 subcategory_columns: list[str],
+                 measure_columns_relation_type: str,
+                 measure_columns: list[str],
+                 additional_masking_columns: list[str] | None = None,
+                 masking_string: str = 'Msk',
+                 gmp_msk_min: float = 1,
+                 gmp_msk_max: float = 9,
+                 complementary_suppression: bool = False,
+                 compact_dtypes: bool = False) -> None:
+        relation_type = str(measure_columns_relation_type).lower()
+        if relation_type not in MaskingSpec.relation_type_options:
+            raise MaskingSpecError(f'Invalid Measure Columns Relation Type {measure_columns_relation_type}')
+        self.partition_columns = list(partition_columns)
+        self.subcategory_columns = list(subcategory_columns)
+        self.measure_columns_relation_type = MaskingSpec.relation_type_options[relation_type]
+        self.measure_columns = list(measure_columns)
+        self.additional_masking_columns = list(additional_masking_columns or [])
+        self.masking_string = masking_string
+        self.gmp_msk_min = gmp_msk_min
+        self.gmp_msk_max = gmp_msk_max
+        self.complementary_suppression = bool(complementary_suppression)
+        self.compact_dtypes = bool(compact_dtypes)
+        if self.measure_columns_relation_type == '1' and len(self.measure_columns) != 2:
+            raise MaskingSpecError('Rate relation requires exactly a numerator and a denominator Measure Column')
+        if self.measure_columns_relation_type == '2' and len(self.measure_columns) < 2:
+            raise MaskingSpecError('Sum relation requires a Sum Column and at least one Element Column')
+
+    @classmethod
+    def from_dict(cls, spec_dict: dict) -> 'MaskingSpec':
+        '''
+        Creating a masking spec from a dict, e.g. a parsed JSON or TOML file
+
+        Args:
+            spec_dict (dict): masking spec entries
+
+        Returns:
+            masking_spec (MaskingSpec): masking spec
+        '''
+        required_keys = ['partition_columns', 'subcategory_columns', 'measure_columns_relation_type', 'measure_columns']
+        optional_keys = ['additional_masking_columns', 'masking_string', 'gmp_msk_min', 'gmp_msk_max', 'complementary_suppression',
+                         'compact_dtypes']
+        for key_enum in required_keys:
+            if key_enum not in spec_dict:
+                raise MaskingSpecError(f'{key_enum} is missing in masking spec')
+        for key_enum in spec_dict:
+            if key_enum not in required_keys + optional_keys:
+                raise MaskingSpecError(f'{key_enum} is not a masking spec entry')
+        return cls(**spec_dict)
+
+    def to_dict(self) -> dict:
+        '''
+        Collecting the masking spec entries into a dict
+
+        Returns:
+            spec_dict (dict): masking spec entries
+        '''
+        return {'partition_columns': self.partition_columns,
+                'subcategory_columns': self.subcategory_columns,
+                'measure_columns_relation_type': self.measure_columns_relation_type,
+                'measure_columns': self.measure_columns,
+                'additional_masking_columns': self.additional_masking_columns,
+                'masking_string': self.masking_string,
+                'gmp_msk_min': self.gmp_msk_min,
+                'gmp_msk_max': self.gmp_msk_max,
+                'complementary_suppression': self.complementary_suppression,
+                'compact_dtypes': self.compact_dtypes}
+
+    def masking_policy(self) -> GlobalMaskingPol:
+        '''
+        Masking limits of the spec
+
+        Returns:
+            masking_policy (GlobalMaskingPol): masking limits
+        '''
+        return GlobalMaskingPol(gmp_msk_min=self.gmp_msk_min, gmp_msk_max=self.gmp_msk_max,
+                                gmp_complementary=self.complementary_suppression)
+
+    def import_arguments(self) -> dict:
+        '''
+        Keyword arguments for import_unmasked_data: partition and subcategory columns are encoded
+        as categoricals and numeric columns narrowed when compact_dtypes is set
+
+        Returns:
+            import_arguments (dict): keyword arguments for import_unmasked_data
+        '''
+        return {'compact_flag': self.compact_dtypes,
+                'categorical_column_names': self.partition_columns + self.subcategory_columns}
+
+    def masking_arguments(self, column_names: list[str]) -> dict:
+        '''
+        Converting column names into the column numbers expected by apply_full_masking
+
+        Args:
+            column_names (list[str]): column names of the data to be masked
+
+        Returns:
+            masking_arguments (dict): keyword arguments for apply_full_masking
+        '''
+        column_names = list(column_names)
+        for column_name_enum in self.partition_columns + self.subcategory_columns \
+            + self.measure_columns + self.additional_masking_columns:
+            if column_name_enum not in column_names:
+                raise MaskingSpecError(f'{column_name_enum} is not a column of the source file')
+        column_number = lambda column_name: str(column_names.index(column_name) + 1)
+        return {'masking_string': self.masking_string,
+                'partition_column_numbers': [column_number(column_name_enum) for column_name_enum in self.partition_columns],
+                'subcategory_column_numbers': [column_number(column_name_enum) for column_name_enum in self.subcategory_columns],
+                'measure_columns_relation_type': self.measure_columns_relation_type,
+                'measure_column_numbers': [column_number(column_name_enum) for column_name_enum in self.measure_columns],
+                'additional_masking_column_flag': len(self.additional_masking_columns) > 0,
+                'additional_masking_column_numbers': [column_number(column_name_enum) \
+                                                      for column_name_enum in self.additional_masking_columns],
+                'masking_policy': self.masking_policy()}
+
+def read_spec_file(spec_file_path: str) -> dict:
+    '''
+    Reading the entries of a JSON or TOML spec file
+
+    Args:
+        spec_file_path (str): full path to spec file
+
+    Returns:
+        spec_dict (dict): spec entries
+    '''
+    if os.path.splitext(spec_file_path)[1].lower() == '.json':
+        with open(spec_file_path, 'r', encoding='utf-8') as spec_file:
+            return json.load(spec_file)
+    if os.path.splitext(spec_file_path)[1].lower() == '.toml':
+        try:
+            import tomllib # pylint: disable=import-outside-toplevel
+        except ModuleNotFoundError:
+            try:
+                import tomli as tomllib # pylint: disable=import-outside-toplevel
+            except ModuleNotFoundError:
+                raise MaskingSpecError('Reading TOML masking specs requires Python 3.11+ or the tomli package')
+        with open(spec_file_path, 'rb') as spec_file:
+            return tomllib.load(spec_file)
+    raise MaskingSpecError(f'{spec_file_path} is not a JSON or TOML file')
+
+def load_masking_spec(spec_file_path: str) -> MaskingSpec:
+    '''
+    Loading a masking spec from a JSON or TOML file
+
+    Args:
+        spec_file_path (str): full path to spec file
+
+    Returns:
+        masking_spec (MaskingSpec): masking spec
+    '''
+    return MaskingSpec.from_dict(read_spec_file(spec_file_path))
+
+def check_unmasked_rows(unmasked_data: pd.DataFrame, data_name: str) -> None:
+    '''
+    Checking that data has rows before masking it, as apply_full_masking exits on empty columns
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        data_name (str): file or sheet name, for the error message
+    '''
+    if len(unmasked_data) == 0:
+        raise MaskingSpecError(f'{data_name} has no rows to mask')
+
+def mask_file(input_file_path: str,
+              masking_spec: MaskingSpec,
+              max_workers: int | None = None,
+              report_flag: bool = False,
+              masking_cache=None) -> str:
+    '''
+    Masking a CSV, XLSX, Parquet or Arrow file without any prompt.
+    Parquet and Arrow files are masked with column projection (see arrow_masking).
+
+    Args:
+        input_file_path (str): full path to file
+        masking_spec (MaskingSpec): masking spec
+        max_workers (int | None, optional): number of processes to mask partitions in parallel. Defaults to None.
+        report_flag (bool, optional): write a JSON run report next to the masked file. Defaults to False.
+        masking_cache (MaskingCache | None, optional): on-disk cache of masked cells (see masking_cache). Defaults to None.
+
+    Returns:
+        output_file_path (str): full path to masked file
+    '''
+    if report_flag:
+        return mask_file_with_report(input_file_path, masking_spec, max_workers, masking_cache)
+    if os.path.splitext(input_file_path)[1].lower() in ARROW_FILE_EXTENSIONS:
+        return arrow_masking.mask_arrow_file(
+            input_file_path, max_workers=max_workers, masking_cache=masking_cache, compact_flag=masking_spec.compact_dtypes,
+            **masking_spec.masking_arguments(arrow_masking.get_arrow_column_names(input_file_path)))
+    input_file_path, unmasked_data = masking_policy_for_small_populations.import_unmasked_data(
+        input_file_path, **masking_spec.import_arguments())
+    check_unmasked_rows(unmasked_data, os.path.basename(input_file_path))
+    masked_data = masking_policy_for_small_populations.apply_full_masking(
+        unmasked_data, max_workers=max_workers, masking_cache=masking_cache,
+        **masking_spec.masking_arguments(unmasked_data.columns))
+    return masking_policy_for_small_populations.export_masked_data(masked_data, input_file_path)
+
+def mask_file_with_report(input_file_path: str,
+                          masking_spec: MaskingSpec,
+                          max_workers: int | None = None,
+                          masking_cache=None) -> str:
+    '''
+    Masking a CSV or XLSX file and writing a JSON run report (see masking_report) next to the masked file,
+    including the time spent reading and writing the file
+
+    Args:
+        input_file_path (str): full path to file
+        masking_spec (MaskingSpec): masking spec
+        max_workers (int | None, optional): number of processes to mask partitions in parallel. Defaults to None.
+        masking_cache (MaskingCache | None, optional): on-disk cache of masked cells (see masking_cache). Defaults to None.
+
+    Returns:
+        output_file_path (str): full path to masked file
+    '''
+    import time
+    from masking_report import MaskingReport
+    if os.path.splitext(input_file_path)[1].lower() in ARROW_FILE_EXTENSIONS:
+        raise MaskingSpecError('Run reports are available for CSV and XLSX files only')
+    masking_report = MaskingReport()
+    start_time = time.perf_counter()
+    input_file_path, unmasked_data = masking_policy_for_small_populations.import_unmasked_data(
+        input_file_path, **masking_spec.import_arguments())
+    read_time_s = time.perf_counter() - start_time
+    check_unmasked_rows(unmasked_data, os.path.basename(input_file_path))
+    masked_data = masking_policy_for_small_populations.apply_full_masking(
+        unmasked_data, max_workers=max_workers, masking_report=masking_report, masking_cache=masking_cache,
+        **masking_spec.masking_arguments(unmasked_data.columns))
+    start_time = time.perf_counter()
+    output_file_path = masking_policy_for_small_populations.export_masked_data(masked_data, input_file_path)
+    masking_report.run_info.update(input_file_path=input_file_path, output_file_path=output_file_path,
+                                   read_time_s=read_time_s, write_time_s=time.perf_counter() - start_time)
+    masking_report.write_json(f'{os.path.splitext(output_file_path)[0]}_report.json')
+    return output_file_path
+
+def mask_file_to_cells(input_file_path: str,
+                       masking_spec: MaskingSpec,
+                       max_workers: int | None = None) -> str:
+    '''
+    Masking a CSV or XLSX file and writing only the masked cells, with the reason each one is masked for
+    (see masking_audit), into a _Masked_cells.csv file next to it
+
+    Args:
+        input_file_path (str): full path to file
+        masking_spec (MaskingSpec): masking spec
+        max_workers (int | None, optional): number of processes to mask partitions in parallel. Defaults to None.
+
+    Returns:
+        masked_cell_file_path (str): full path to the table of masked cells
+    '''
+    from masking_audit import MaskingAudit
+    if os.path.splitext(input_file_path)[1].lower() in ARROW_FILE_EXTENSIONS:
+        raise MaskingSpecError('Masked cell tables are available for CSV and XLSX files only')
+    masking_audit = MaskingAudit()
+    input_file_path, unmasked_data = masking_policy_for_small_populations.import_unmasked_data(
+        input_file_path, **masking_spec.import_arguments())
+    check_unmasked_rows(unmasked_data, os.path.basename(input_file_path))
+    masking_policy_for_small_populations.apply_full_masking(
+        unmasked_data, max_workers=max_workers, masking_audit=masking_audit,
+        **masking_spec.masking_arguments(unmasked_data.columns))
+    masked_cell_file_path = f'{os.path.splitext(input_file_path)[0]}_Masked_cells.csv'
+    OutputClass.process(f'Generating {os.path.basename(masked_cell_file_path)}')
+    masking_audit.write_csv(masked_cell_file_path)
+    OutputClass.success(f'{masked_cell_file_path} is generated!')
+    return masked_cell_file_path
+
+def stream_file(input_file_path: str,
+                masking_spec: MaskingSpec,
+                chunk_size: int = 100_000,
+                presorted: bool = False) -> str:
+    '''
+    Masking a CSV file partition by partition without any prompt
+
+    Args:
+        input_file_path (str): full path to a CSV file
+        masking_spec (MaskingSpec): masking spec
+        chunk_size (int, optional): number of rows read at a time. Defaults to 100_000.
+        presorted (bool, optional): input rows are sorted by Partition Columns. Defaults to False.
+
+    Returns:
+        output_file_path (str): full path to masked file
+    '''
+    import pandas as pd
+    import streaming_masking
+    column_names = list(pd.read_csv(input_file_path, nrows=0).columns)
+    return streaming_masking.stream_full_masking(input_file_path, chunk_size=chunk_size, presorted=presorted,
+                                                 **masking_spec.masking_arguments(column_names))
+
+def mask_files(input_file_paths: list[str],
+               masking_spec: MaskingSpec,
+               max_workers: int | None = None,
+               report_flag: bool = False,
+               masking_cache=None) -> list[str]:
+    '''
+    Masking several files with the same masking spec
+
+    Args:
+        input_file_paths (list[str]): full paths to files
+        masking_spec (MaskingSpec): masking spec
+        max_workers (int | None, optional): number of processes to mask partitions in parallel. Defaults to None.
+        report_flag (bool, optional): write a JSON run report next to each masked file. Defaults to False.
+        masking_cache (MaskingCache | None, optional): on-disk cache of masked cells (see masking_cache). Defaults to None.
+
+    Returns:
+        output_file_paths (list[str]): full paths to masked files
+    '''
+    return [mask_file(input_file_path, masking_spec, max_workers, report_flag, masking_cache) \
+            for input_file_path in input_file_paths]
+
+def find_input_files(input_paths: list[str]) -> list[str]:
+    '''
+    Expanding directories and glob patterns into CSV, XLSX, Parquet and Arrow files.
+    Files generated by this routine (see OUTPUT_FILE_SUFFIXES) are skipped.
+
+    Args:
+        input_paths (list[str]): files, directories or glob patterns
+
+    Returns:
+        input_file_paths (list[str]): full paths to files
+    '''
+    input_file_paths: list[str] = []
+    for input_path_enum in input_paths:
+        if os.path.isdir(input_path_enum):
+            candidate_file_paths = sorted(glob.glob(os.path.join(input_path_enum, '*')))
+        elif glob.has_magic(input_path_enum):
+            candidate_file_paths = sorted(glob.glob(input_path_enum))
+        else:
+            candidate_file_paths = [input_path_enum]
+        for file_path_enum in candidate_file_paths:
+            file_root, file_extension = os.path.splitext(file_path_enum)
+            if file_extension.lower() in ['.csv', '.xlsx'] + ARROW_FILE_EXTENSIONS \
+                and not file_root.endswith(tuple(OUTPUT_FILE_SUFFIXES)) and file_path_enum not in input_file_paths:
+                input_file_paths.append(file_path_enum)
+    return input_file_paths
+
+def mask_files_concurrently(input_file_paths: list[str],
+                            masking_spec: MaskingSpec,
+                            max_workers: int | None = None) -> list[str]:
+    '''
+    Masking several files in a bounded process pool. Each process reads, masks and exports its own file,
+    so only file paths and the masking spec are sent to the processes, never the data.
+
+    Args:
+        input_file_paths (list[str]): full paths to files
+        masking_spec (MaskingSpec): masking spec
+        max_workers (int | None, optional): number of masking processes. Defaults to None (CPU count).
+
+    Returns:
+        output_file_paths (list[str]): full paths to masked files, in input order
+    '''
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as mask_executor:
+        mask_futures = [mask_executor.submit(mask_file, input_file_path, masking_spec) \
+                        for input_file_path in input_file_paths]
+        return [mask_future.result() for mask_future in mask_futures]
+
+def mask_directory(input_path: str,
+                   masking_spec: MaskingSpec,
+                   max_workers: int | None = None) -> list[str]:
+    '''
+    Masking every CSV, XLSX, Parquet and Arrow file of a directory or glob pattern
+
+    Args:
+        input_path (str): directory or glob pattern
+        masking_spec (MaskingSpec): masking spec
+        max_workers (int | None, optional): number of masking processes. Defaults to None (CPU count).
+
+    Returns:
+        output_file_paths (list[str]): full paths to masked files
+    '''
+    input_file_paths = find_input_files([input_path])
+    if len(input_file_paths) == 0:
+        OutputClass.warning(f'No file to mask found in {input_path}')
+        return []
+    OutputClass.info(f'{len(input_file_paths)} files to mask')
+    return mask_files_concurrently(input_file_paths, masking_spec, max_workers)
+
+def main(argv: list[str] | None = None) -> list[str]:
+    '''
+    Command line entry point
+
+    Args:
+        argv (list[str] | None, optional): command line arguments. Defaults to None (sys.argv).
+
+    Returns:
+        output_file_paths (list[str]): full paths to masked files
+    '''
+    parser = argparse.ArgumentParser(description='Mask CSV, XLSX, Parquet or Arrow files with a JSON or TOML masking spec.')
+    parser.add_argument('--spec', required=True, help='masking spec file (.json or .toml)')
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help='processes to mask partitions in parallel (not with --stream or --file-workers)')
+    parser.add_argument('--stream', action='store_true', help='mask CSV files partition by partition')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='rows read at a time with --stream')
+    parser.add_argument('--presorted', action='store_true', help='CSV rows are sorted by Partition Columns (with --stream)')
+    parser.add_argument('--file-workers', type=int, default=None, help='processes to mask several files at once')
+    parser.add_argument('--incremental', action='store_true',
+                        help='mask CSV files again only where partitions changed since the previous run')
+    parser.add_argument('--cache-dir', default=None, help='directory of an on-disk cache of masked cells')
+    parser.add_argument('--cache-max-mb', type=float, default=512, help='size limit of the cache in MiB')
+    parser.add_argument('--report', action='store_true', help='write a JSON run report next to each masked file')
+    parser.add_argument('--masked-cells', action='store_true',
+                        help='write only masked cells and the reason for each one (_Masked_cells.csv) instead of masked files')
+    parser.add_argument('input_paths', nargs='+', help='CSV, XLSX, Parquet or Arrow files, directories or glob patterns to mask')
+    args = parser.parse_args(argv)
+
+    try:
+        return mask_input_paths(args)
+    # Missing optional packages (pyarrow, openpyxl, xlsxwriter) are reported like spec errors
+    except (MaskingSpecError, ImportError) as masking_error:
+        OutputClass.error(str(masking_error))
+
+def is_option_given(args: argparse.Namespace, option_name: str) -> bool:
+    '''
+    Checking whether an option without default value was given on the command line
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments (see main)
+        option_name (str): option name, e.g. --max-workers
+
+    Returns:
+        option_flag (bool): True if the option was given
+    '''
+    return getattr(args, option_name.lstrip('-').replace('-', '_')) not in [None, False]
+
+def mask_input_paths(args: argparse.Namespace) -> list[str]:
+    '''
+    Masking the files given on the command line
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments (see main)
+
+    Returns:
+        output_file_paths (list[str]): full paths to masked files
+    '''
+    masking_spec = load_masking_spec(args.spec)
+    input_file_paths = find_input_files(args.input_paths)
+    for option_name, incompatible_option_names in INCOMPATIBLE_OPTIONS.items():
+        given_option_names = [option_name_enum for option_name_enum in incompatible_option_names \
+                              if is_option_given(args, option_name_enum)]
+        if is_option_given(args, option_name) and len(given_option_names) > 0:
+            raise MaskingSpecError(f'{option_name} cannot be combined with {", ".join(given_option_names)}')
+    for option_name, required_option_name in REQUIRED_OPTIONS.items():
+        if is_option_given(args, option_name) and not is_option_given(args, required_option_name):
+            raise MaskingSpecError(f'{option_name} requires {required_option_name}')
+    if args.masked_cells:
+        return [mask_file_to_cells(input_file_path, masking_spec, args.max_workers) for input_file_path in input_file_paths]
+    if args.incremental:
+        import incremental_masking
+        return [incremental_masking.mask_file_incrementally(input_file_path, masking_spec, args.max_workers) \
+                for input_file_path in input_file_paths]
+    if args.stream:
+        return [stream_file(input_file_path, masking_spec, args.chunk_size, args.presorted) \
+                for input_file_path in input_file_paths]
+    if args.file_workers is not None:
+        return mask_files_concurrently(input_file_paths, masking_spec, args.file_workers)
+    if args.cache_dir is None:
+        return mask_files(input_file_paths, masking_spec, args.max_workers, args.report)
+    from masking_cache import MaskingCache
+    masking_cache = MaskingCache(args.cache_dir, int(args.cache_max_mb * 2**20))
+    output_file_paths = mask_files(input_file_paths, masking_spec, args.max_workers, args.report, masking_cache)
+    masking_cache.report()
+    return output_file_paths
+
+# Program entry point
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,399 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Low-memory reading and writing of XLSX workbooks                                   #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing low-memory XLSX input and output.
+
+Workbooks are read with openpyxl in read-only mode, row by row, and turned into DataFrames one chunk
+at a time instead of holding every cell as a Python object. Workbooks are written with xlsxwriter in
+constant memory mode, where each row is flushed to disk as soon as the next one starts.
+
+Sheets of an existing workbook are replaced in its zip package (see replace_excel_sheets): the new sheet
+XML is streamed into a copy of the package, and every other part, other sheets included, is copied as is.
+'''
+from __future__ import annotations
+
+# Standard libraries
+import itertools
+import math
+import posixpath
+from typing import TYPE_CHECKING, Callable, Iterator
+
+if TYPE_CHECKING:
+    import zipfile
+    import pandas as pd
+
+
+def get_excel_sheet_names(input_file_path: str) -> list[str]:
+    '''
+    Reading the sheet names of an XLSX file without reading its cells
+
+    Args:
+        input_file_path (str): full path to file
+
+    Returns:
+        sheet_names (list[str]): sheet names, in workbook order
+    '''
+    try:
+        import openpyxl
+    except ModuleNotFoundError as import_error:
+        raise ImportError('Reading XLSX files requires the openpyxl package') from import_error
+    workbook = openpyxl.load_workbook(input_file_path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+def iter_excel_chunks(input_file_path: str,
+                      chunk_size: int = 100_000,
+                      sheet_name: str | None = None) -> Iterator[pd.DataFrame]:
+    '''
+    Reading the rows of a sheet of an XLSX file in chunks, as pd.read_excel reads them: empty and error
+    cells are None, whole numbers are integers, blank rows are kept but trailing blank rows are dropped.
+    Cells keep their Python type, column labels are cell positions and rows may differ in width.
+
+    Args:
+        input_file_path (str): full path to file
+        chunk_size (int, optional): number of rows per chunk. Defaults to 100_000.
+        sheet_name (str | None, optional): sheet to read, the first sheet if None. Defaults to None.
+
+    Returns:
+        chunks (Iterator[pd.DataFrame]): chunks of rows of object columns, the header row included
+    '''
+    import pandas as pd
+    try:
+        import openpyxl
+        from openpyxl.cell.cell import ERROR_CODES
+    except ModuleNotFoundError as import_error:
+        raise ImportError('Reading XLSX files requires the openpyxl package') from import_error
+
+    def convert_cell(cell_value):
+        if isinstance(cell_value, float) and cell_value.is_integer():
+            return int(cell_value)
+        return None if cell_value in ERROR_CODES else cell_value
+
+    def iter_rows(worksheet) -> Iterator[list]:
+        blank_row_count = 0
+        for row_values in worksheet.iter_rows(values_only=True):
+            row_values = list(row_values)
+            while row_values and row_values[-1] is None:
+                row_values.pop()
+            if len(row_values) == 0:
+                blank_row_count += 1
+                continue
+            # Blank rows are only returned once a row with data follows them
+            for _ in range(blank_row_count):
+                yield []
+            blank_row_count = 0
+            yield [convert_cell(cell_value) for cell_value in row_values]
+
+    workbook = openpyxl.load_workbook(input_file_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0] if sheet_name is None else workbook[sheet_name]
+        # The stored dimensions may be wrong, rows are read as far as they go
+        worksheet.reset_dimensions()
+        row_iterator = iter_rows(worksheet)
+        while True:
+            chunk_rows = list(itertools.islice(row_iterator, chunk_size))
+            if len(chunk_rows) == 0:
+                break
+            yield pd.DataFrame(chunk_rows, dtype=object)
+    finally:
+        workbook.close()
+
+def get_excel_column_names(header_values: list) -> list:
+    '''
+    Column names pd.read_excel gives to a header row: blank names become Unnamed: <position> and
+    repeated names get a .1, .2, ... suffix
+
+    Args:
+        header_values (list): cells of the header row, None for empty cells
+
+    Returns:
+        column_names (list): column names
+    '''
+    from pandas.io.parsers import TextParser
+    return list(TextParser([['' if header_value is None else header_value for header_value in header_values]],
+                           header=0, skip_blank_lines=False).read().columns)
+
+def infer_excel_dtypes(sheet_data: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Converting object columns of a whole sheet to the types pd.read_excel gives them
+
+    Args:
+        sheet_data (pd.DataFrame): object columns of a sheet, None for empty cells
+
+    Returns:
+        sheet_data (pd.DataFrame): typed sheet data
+    '''
+    import pandas as pd
+    typed_columns = {}
+    for column_position_enum in range(sheet_data.shape[1]):
+        column_values = sheet_data.iloc[:, column_position_enum]
+        inferred_type = pd.api.types.infer_dtype(column_values, skipna=True)
+        if inferred_type == 'empty':
+            typed_columns[column_position_enum] = column_values.astype(float)
+        elif inferred_type in ['integer', 'floating', 'mixed-integer-float'] \
+            or (inferred_type == 'boolean' and column_values.isna().any()):
+            typed_columns[column_position_enum] = pd.to_numeric(column_values)
+        elif inferred_type == 'boolean':
+            typed_columns[column_position_enum] = column_values.astype(bool)
+        elif inferred_type == 'string':
+            typed_columns[column_position_enum] = column_values.astype('str')
+        else:
+            typed_columns[column_position_enum] = column_values.infer_objects()
+    return pd.concat(typed_columns, axis=1).set_axis(sheet_data.columns, axis=1)
+
+def read_excel_low_memory(input_file_path: str,
+                          sheet_name: str | None = None,
+                          column_names: list[str] | None = None,
+                          chunk_size: int = 50_000) -> pd.DataFrame:
+    '''
+    Reading a sheet of an XLSX file chunk by chunk, so that openpyxl never holds the whole sheet as cells.
+    Column names and types are those of pd.read_excel; types are inferred once for the whole sheet.
+
+    Args:
+        input_file_path (str): full path to file
+        sheet_name (str | None, optional): sheet to read, the first sheet if None. Defaults to None.
+        column_names (list[str] | None, optional): columns to keep, all columns if None. Defaults to None.
+        chunk_size (int, optional): number of rows per chunk. Defaults to 50_000.
+
+    Returns:
+        unmasked_data (pd.DataFrame): sheet data
+    '''
+    import pandas as pd
+    chunks: list[pd.DataFrame] = []
+    header_values: list | None = None
+    column_positions: list[int] | None = None
+    for chunk in iter_excel_chunks(input_file_path, chunk_size, sheet_name):
+        if header_values is None:
+            header_values = chunk.iloc[0].tolist()
+            while header_values and header_values[-1] is None:
+                header_values.pop()
+            chunk = chunk.iloc[1:]
+            if column_names is not None:
+                sheet_column_names = get_excel_column_names(header_values)
+                column_positions = [sheet_column_names.index(column_name_enum) for column_name_enum in column_names]
+        # Only the requested columns are kept from each chunk
+        chunks.append(chunk if column_positions is None else chunk.reindex(columns=column_positions))
+    if header_values is None or sum(len(chunk_enum) for chunk_enum in chunks) == 0:
+        return pd.read_excel(input_file_path, sheet_name=sheet_name or 0, usecols=column_names)
+    sheet_data = pd.concat(chunks, ignore_index=True)
+    if column_names is None:
+        # As in pd.read_excel, the sheet is as wide as its widest row
+        sheet_width = max(len(header_values), sheet_data.shape[1])
+        sheet_data = sheet_data.reindex(columns=range(sheet_width))
+        column_names = get_excel_column_names(header_values + [None] * (sheet_width - len(header_values)))
+    return infer_excel_dtypes(sheet_data).set_axis(column_names, axis=1)
+
+
+class ConstantMemoryExcelWriter:
+    '''
+        Class to write DataFrames into XLSX sheets with xlsxwriter in constant memory mode.
+        Rows of a sheet must be written in order; each sheet is written in one go.
+    '''
+    chunk_size: int = 10_000
+
+    def __init__(self, output_file_path: str) -> None:
+        try:
+            import xlsxwriter
+        except ModuleNotFoundError as import_error:
+            raise ImportError('Writing XLSX files requires the xlsxwriter package') from import_error
+        self.output_file_path = output_file_path
+        self.workbook = xlsxwriter.Workbook(output_file_path, {'constant_memory': True})
+        # Same header look as pandas.DataFrame.to_excel
+        self.header_format = self.workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        self.worksheet = None
+        self.next_row = 0
+
+    def add_sheet(self, sheet_name: str, column_names: list[str]) -> None:
+        '''
+        Starting a new sheet with a header row
+
+        Args:
+            sheet_name (str): sheet name
+            column_names (list[str]): column names
+        '''
+        self.worksheet = self.workbook.add_worksheet(sheet_name)
+        self.worksheet.write_row(0, 0, [str(column_name) for column_name in column_names], self.header_format)
+        self.next_row = 1
+
+    def write_frame(self, data: pd.DataFrame) -> None:
+        '''
+        Appending the rows of a DataFrame to the current sheet
+
+        Args:
+            data (pd.DataFrame): rows to append
+        '''
+        for chunk_start in range(0, len(data), ConstantMemoryExcelWriter.chunk_size):
+            # Missing values are written as empty cells, as pandas.DataFrame.to_excel does
+            chunk = data.iloc[chunk_start:chunk_start + ConstantMemoryExcelWriter.chunk_size]
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for row_values in chunk.itertuples(index=False, name=None):
+                self.worksheet.write_row(self.next_row, 0, row_values)
+                self.next_row += 1
+
+    def close(self) -> None:
+        '''
+        Closing the workbook
+        '''
+        self.workbook.close()
+
+def write_excel_low_memory(masked_data: pd.DataFrame,
+                           output_file_path: str,
+                           sheet_name: str = 'Sheet1') -> None:
+    '''
+    Writing a DataFrame into a single-sheet XLSX file in constant memory mode
+
+    Args:
+        masked_data (pd.DataFrame): data to write
+        output_file_path (str): full path to file
+        sheet_name (str, optional): sheet name. Defaults to 'Sheet1'.
+    '''
+    excel_writer = ConstantMemoryExcelWriter(output_file_path)
+    excel_writer.add_sheet(sheet_name, list(masked_data.columns))
+    excel_writer.write_frame(masked_data)
+    excel_writer.close()
+
+SPREADSHEET_NAMESPACE: str = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+PACKAGE_RELATIONSHIP_NAMESPACE: str = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CONTENT_TYPE_NAMESPACE: str = 'http://schemas.openxmlformats.org/package/2006/content-types'
+DOCUMENT_RELATIONSHIP_NAMESPACE: str = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+def get_excel_sheet_parts(excel_package: zipfile.ZipFile) -> dict[str, str]:
+    '''
+    Finding the part of the zip package of an XLSX file that holds each sheet
+
+    Args:
+        excel_package (zipfile.ZipFile): opened XLSX file
+
+    Returns:
+        sheet_parts (dict[str, str]): part name per sheet name, e.g. xl/worksheets/sheet1.xml
+    '''
+    from xml.etree import ElementTree
+    relationship_targets = {relationship_enum.get('Id'): relationship_enum.get('Target') for relationship_enum \
+                            in ElementTree.fromstring(excel_package.read('xl/_rels/workbook.xml.rels'))}
+    sheet_parts: dict[str, str] = {}
+    for sheet_enum in ElementTree.fromstring(excel_package.read('xl/workbook.xml')).iter(f'{{{SPREADSHEET_NAMESPACE}}}sheet'):
+        sheet_target = relationship_targets[sheet_enum.get(f'{{{DOCUMENT_RELATIONSHIP_NAMESPACE}}}id')]
+        # Targets are relative to xl/, or absolute from the package root
+        sheet_parts[sheet_enum.get('name')] = sheet_target.lstrip('/') if sheet_target.startswith('/') \
+            else posixpath.normpath(posixpath.join('xl', sheet_target))
+    return sheet_parts
+
+def write_sheet_xml(sheet_file, data: pd.DataFrame, chunk_size: int = 10_000) -> None:
+    '''
+    Writing a DataFrame as the XML of a sheet, header row first, one chunk of rows at a time.
+    Numbers and booleans are written as values, dates in ISO format and anything else as inline strings.
+    Missing values are written as empty cells, as pandas.DataFrame.to_excel does.
+
+    Args:
+        sheet_file (BinaryIO): sheet part opened for writing
+        data (pd.DataFrame): rows to write
+        chunk_size (int, optional): number of rows converted at a time. Defaults to 10_000.
+    '''
+    import datetime
+    import re
+    from xml.sax.saxutils import escape
+    try:
+        from openpyxl.utils import get_column_letter
+    except ModuleNotFoundError as import_error:
+        raise ImportError('Writing XLSX sheets requires the openpyxl package') from import_error
+    column_letters = [get_column_letter(column_position_enum + 1) for column_position_enum in range(data.shape[1])]
+    # Control characters are not allowed in XML, they are written as _xHHHH_ as Excel does
+    control_character_pattern = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+    def get_cell_xml(cell_reference: str, cell_value) -> str:
+        if isinstance(cell_value, bool):
+            return f'<c r="{cell_reference}" t="b"><v>{int(cell_value)}</v></c>'
+        if isinstance(cell_value, (int, float)) and math.isfinite(cell_value):
+            return f'<c r="{cell_reference}"><v>{cell_value}</v></c>'
+        if isinstance(cell_value, (datetime.date, datetime.time)):
+            return f'<c r="{cell_reference}" t="d"><v>{cell_value.isoformat()}</v></c>'
+        cell_text = control_character_pattern.sub(lambda match: f'_x{ord(match.group()):04X}_', escape(str(cell_value)))
+        return f'<c r="{cell_reference}" t="inlineStr"><is><t xml:space="preserve">{cell_text}</t></is></c>'
+
+    def write_row(row_number: int, row_values: tuple) -> None:
+        sheet_file.write((f'<row r="{row_number}">' + ''.join(
+            get_cell_xml(f'{column_letter}{row_number}', cell_value) \
+            for column_letter, cell_value in zip(column_letters, row_values) if cell_value is not None) + '</row>') \
+            .encode('utf-8'))
+
+    sheet_file.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{SPREADSHEET_NAMESPACE}">'
+                     '<sheetData>'.encode('utf-8'))
+    write_row(1, tuple(str(column_name) for column_name in data.columns))
+    for chunk_start in range(0, len(data), chunk_size):
+        # Object columns hold Python values, e.g. int, float, bool and pd.Timestamp
+        chunk = data.iloc[chunk_start:chunk_start + chunk_size]
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row_position_enum, row_values in enumerate(chunk.itertuples(index=False, name=None)):
+            write_row(chunk_start + row_position_enum + 2, row_values)
+    sheet_file.write(b'</sheetData></worksheet>')
+
+def remove_package_part(part_xml: bytes, namespace: str, part_file_name: str) -> bytes:
+    '''
+    Removing the content type or relationship of a part from [Content_Types].xml or a .rels part
+
+    Args:
+        part_xml (bytes): content of [Content_Types].xml or of a .rels part
+        namespace (str): namespace of its elements
+        part_file_name (str): file name of the part, e.g. calcChain.xml
+
+    Returns:
+        part_xml (bytes): content without the elements of this part
+    '''
+    from xml.etree import ElementTree
+    ElementTree.register_namespace('', namespace)
+    root_element = ElementTree.fromstring(part_xml)
+    for child_element in list(root_element):
+        if child_element.get('TargetMode') != 'External' \
+            and posixpath.basename(child_element.get('PartName') or child_element.get('Target') or '') == part_file_name:
+            root_element.remove(child_element)
+    return ElementTree.tostring(root_element, encoding='UTF-8', xml_declaration=True)
+
+def replace_excel_sheets(input_file_path: str,
+                         output_file_path: str,
+                         sheet_names: list[str],
+                         get_sheet_data: Callable[[str], pd.DataFrame]) -> None:
+    '''
+    Copying an XLSX file with some sheets replaced by new data. The other sheets are copied byte for byte,
+    formulas, formatting and blank rows included. Replaced sheets lose their drawings, comments and tables,
+    and the calculation chain is dropped so that Excel rebuilds it.
+
+    Args:
+        input_file_path (str): full path to the XLSX file
+        output_file_path (str): full path to the new XLSX file
+        sheet_names (list[str]): sheets to replace
+        get_sheet_data (Callable[[str], pd.DataFrame]): new data of a sheet, called once per sheet to replace
+    '''
+    import shutil
+    import zipfile
+    with zipfile.ZipFile(input_file_path) as input_package, \
+        zipfile.ZipFile(output_file_path, 'w', compression=zipfile.ZIP_DEFLATED) as output_package:
+        sheet_parts = get_excel_sheet_parts(input_package)
+        replaced_parts = {sheet_parts[sheet_name_enum]: sheet_name_enum for sheet_name_enum in sheet_names}
+        replaced_rels_parts = [posixpath.join(posixpath.dirname(part_name_enum), '_rels',
+                                              f'{posixpath.basename(part_name_enum)}.rels') for part_name_enum in replaced_parts]
+        for part_info in input_package.infolist():
+            if part_info.filename in replaced_parts:
+                with output_package.open(part_info.filename, 'w', force_zip64=True) as sheet_file:
+                    write_sheet_xml(sheet_file, get_sheet_data(replaced_parts[part_info.filename]))
+            elif part_info.filename == 'xl/calcChain.xml' or part_info.filename in replaced_rels_parts:
+                continue
+            elif part_info.filename == '[Content_Types].xml':
+                output_package.writestr(part_info, remove_package_part(input_package.read(part_info),
+                                                                      CONTENT_TYPE_NAMESPACE, 'calcChain.xml'))
+            elif part_info.filename == 'xl/_rels/workbook.xml.rels':
+                output_package.writestr(part_info, remove_package_part(input_package.read(part_info),
+                                                                      PACKAGE_RELATIONSHIP_NAMESPACE, 'calcChain.xml'))
+            else:
+                with input_package.open(part_info) as input_part, \
+                    output_package.open(part_info, 'w', force_zip64=True) as output_part:
+                    shutil.copyfileobj(input_part, output_part)
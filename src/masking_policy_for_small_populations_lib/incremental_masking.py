@@ -0,0 +1,233 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Incremental re-masking of changed partitions only                                  #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing incremental masking of CSV files that grow or change partition by partition,
+e.g. multi-year tables getting a new school year every year.
+
+Partitions never interact in apply_full_masking. A fingerprint of each partition (hash of its rows)
+and of the masking spec is saved next to the _Masked.csv output. On the next run, only partitions
+whose fingerprint changed are masked again; the other partitions are copied from the previous
+_Masked.csv file. When the changed rows were appended after unchanged ones, they are masked and
+appended to the previous output, which is then neither read nor rewritten. A changed spec, column
+list or column type masks the whole file again.
+
+    python ./src/masking_policy_for_small_populations_lib/batch_masking.py --spec spec.json --incremental table.csv
+'''
+from __future__ import annotations
+
+# Standard libraries
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# User-defined libraries
+from  terminal_interactions import OutputClass
+import masking_policy_for_small_populations
+from batch_masking import MaskingSpec, MaskingSpecError, check_unmasked_rows
+from masking_engine import combine_group_codes, get_column_codes
+
+
+def get_fingerprint_file_path(output_file_path: str) -> str:
+    '''
+    Full path to the fingerprint file kept next to a masked file
+
+    Args:
+        output_file_path (str): full path to masked file
+
+    Returns:
+        fingerprint_file_path (str): full path to fingerprint file
+    '''
+    return f'{os.path.splitext(output_file_path)[0]}.fingerprints.json'
+
+def get_spec_fingerprint(unmasked_data: pd.DataFrame, masking_spec: MaskingSpec) -> str:
+    '''
+    Fingerprint of everything, other than the partition rows, that the masked output depends on:
+    the masking spec, the column names and the column types
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        masking_spec (MaskingSpec): masking spec
+
+    Returns:
+        spec_fingerprint (str): hexadecimal digest
+    '''
+    spec_text = json.dumps({'masking_spec': masking_spec.to_dict(),
+                            'columns': [str(column_name_enum) for column_name_enum in unmasked_data.columns],
+                            'dtypes': [str(dtype_enum) for dtype_enum in unmasked_data.dtypes]}, sort_keys=True)
+    return hashlib.sha256(spec_text.encode('utf-8')).hexdigest()
+
+def get_partition_keys(data: pd.DataFrame, partition_column_names: list[str]) -> tuple[np.ndarray, list[str]]:
+    '''
+    Partition key of every row, built from the text of the partition values so that keys of
+    unmasked and masked data match. Rows with missing partition values are in no group of
+    apply_full_masking; they form a partition of their own, keyed by blank text as in the masked file.
+
+    Args:
+        data (pd.DataFrame): unmasked or masked data
+        partition_column_names (list[str]): partition column names
+
+    Returns:
+        partition_codes (np.ndarray): partition code per row
+        partition_keys (list[str]): key of each partition code
+    '''
+    if len(partition_column_names) == 0:
+        return np.zeros(len(data), dtype=np.int64), [json.dumps([])]
+    partition_data = data[partition_column_names]
+    key_data = partition_data.astype(str).where(partition_data.notna(), '')
+    partition_codes, _ = combine_group_codes([get_column_codes(key_data[column_name_enum]) \
+                                              for column_name_enum in partition_column_names], len(data))
+    _, first_row_positions = np.unique(partition_codes, return_index=True)
+    partition_keys = [json.dumps(key_values) for key_values in key_data.iloc[first_row_positions].values.tolist()]
+    return partition_codes, partition_keys
+
+def get_partition_fingerprints(unmasked_data: pd.DataFrame,
+                               partition_codes: np.ndarray,
+                               n_partitions: int) -> list[str]:
+    '''
+    Fingerprint of each partition: hash of its rows, in order
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        partition_codes (np.ndarray): partition code per row
+        n_partitions (int): number of partitions
+
+    Returns:
+        partition_fingerprints (list[str]): hexadecimal digest per partition code
+    '''
+    row_hashes = pd.util.hash_pandas_object(unmasked_data, index=False).to_numpy()
+    row_order = np.argsort(partition_codes, kind='stable')
+    partition_ends = np.cumsum(np.bincount(partition_codes, minlength=n_partitions))
+    sorted_row_hashes = row_hashes[row_order]
+    return [hashlib.sha256(sorted_row_hashes[partition_start:partition_end].tobytes()).hexdigest() \
+            for partition_start, partition_end in zip(np.concatenate([[0], partition_ends[:-1]]), partition_ends)]
+
+def read_fingerprints(fingerprint_file_path: str) -> dict | None:
+    '''
+    Reading a fingerprint file
+
+    Args:
+        fingerprint_file_path (str): full path to fingerprint file
+
+    Returns:
+        fingerprint_dict (dict | None): fingerprints, None if the file does not exist
+    '''
+    if not os.path.exists(fingerprint_file_path):
+        return None
+    with open(fingerprint_file_path, 'r', encoding='utf-8') as fingerprint_file:
+        return json.load(fingerprint_file)
+
+def write_fingerprints(fingerprint_file_path: str, fingerprint_dict: dict) -> None:
+    '''
+    Writing a fingerprint file
+
+    Args:
+        fingerprint_file_path (str): full path to fingerprint file
+        fingerprint_dict (dict): fingerprints
+    '''
+    with open(fingerprint_file_path, 'w', encoding='utf-8') as fingerprint_file:
+        json.dump(fingerprint_dict, fingerprint_file, indent=1)
+
+def mask_file_incrementally(input_file_path: str,
+                            masking_spec: MaskingSpec,
+                            max_workers: int | None = None) -> str:
+    '''
+    Masking a CSV file, masking again only partitions that changed since the previous run
+    and copying the others from the previous _Masked.csv file
+
+    Args:
+        input_file_path (str): full path to a CSV file
+        masking_spec (MaskingSpec): masking spec
+        max_workers (int | None, optional): number of processes to mask partitions in parallel. Defaults to None.
+
+    Returns:
+        output_file_path (str): full path to masked file
+    '''
+    if os.path.splitext(input_file_path)[1] not in ['.csv', '.CSV']:
+        raise MaskingSpecError('Incremental masking supports CSV files only')
+    input_file_path, unmasked_data = masking_policy_for_small_populations.import_unmasked_data(
+        input_file_path, **masking_spec.import_arguments())
+    check_unmasked_rows(unmasked_data, os.path.basename(input_file_path))
+    masking_arguments = masking_spec.masking_arguments(unmasked_data.columns)
+    partition_column_names = list(masking_spec.partition_columns)
+    output_file_path = f'{os.path.splitext(input_file_path)[0]}_Masked.csv'
+    fingerprint_file_path = get_fingerprint_file_path(output_file_path)
+
+    partition_codes, partition_keys = get_partition_keys(unmasked_data, partition_column_names)
+    partition_fingerprints = get_partition_fingerprints(unmasked_data, partition_codes, len(partition_keys))
+    spec_fingerprint = get_spec_fingerprint(unmasked_data, masking_spec)
+
+    # Partitions with the same fingerprint as in the previous run are kept
+    previous_fingerprint_dict = read_fingerprints(fingerprint_file_path)
+    kept_partitions = np.zeros(len(partition_keys), dtype=bool)
+    if previous_fingerprint_dict is not None and os.path.exists(output_file_path) \
+        and previous_fingerprint_dict['spec'] == spec_fingerprint:
+        previous_partition_fingerprints = previous_fingerprint_dict['partitions']
+        kept_partitions = np.array([previous_partition_fingerprints.get(partition_key_enum) == partition_fingerprint_enum \
+                                    for partition_key_enum, partition_fingerprint_enum \
+                                    in zip(partition_keys, partition_fingerprints)], dtype=bool)
+    kept_rows = kept_partitions[partition_codes]
+    row_order_fingerprint = hashlib.sha256(partition_codes.tobytes()).hexdigest()
+    fingerprint_dict = {'spec': spec_fingerprint, 'rows': len(unmasked_data), 'row_order': row_order_fingerprint,
+                        'partitions': dict(zip(partition_keys, partition_fingerprints))}
+
+    # Rows appended after unchanged rows (e.g. a new school year) are masked and appended to the previous output
+    n_previous_rows = previous_fingerprint_dict.get('rows', -1) if kept_rows.any() else -1
+    if 0 < n_previous_rows <= len(unmasked_data) and kept_rows[:n_previous_rows].all() and not kept_rows[n_previous_rows:].any() \
+        and len(previous_fingerprint_dict['partitions']) == int(kept_partitions.sum()) \
+        and previous_fingerprint_dict['row_order'] == hashlib.sha256(partition_codes[:n_previous_rows].tobytes()).hexdigest():
+        OutputClass.info(f'{int((~kept_partitions).sum())} of {len(partition_keys)} partitions to mask, appended')
+        if n_previous_rows < len(unmasked_data):
+            appended_masked_data = masking_policy_for_small_populations.apply_full_masking(
+                unmasked_data.iloc[n_previous_rows:], max_workers=max_workers, **masking_arguments)
+            # Without fingerprints, an interrupted append is detected and the next run masks everything
+            os.remove(fingerprint_file_path)
+            appended_masked_data.to_csv(output_file_path, index=False, header=False, mode='a')
+        write_fingerprints(fingerprint_file_path, fingerprint_dict)
+        OutputClass.success(f'{output_file_path} is generated!')
+        return output_file_path
+
+    masked_data = pd.DataFrame(index=unmasked_data.index, columns=unmasked_data.columns, dtype=object)
+    if kept_rows.any():
+        previous_masked_data = pd.read_csv(output_file_path, dtype=str, keep_default_na=False)
+        previous_partition_codes, previous_partition_keys = get_partition_keys(previous_masked_data, partition_column_names)
+        # Rows of a kept partition are identical and in the same order in both files
+        partition_code_dict = {partition_key_enum: partition_code_enum \
+                               for partition_code_enum, partition_key_enum in enumerate(partition_keys)}
+        previous_row_codes = np.array([partition_code_dict.get(partition_key_enum, -1) \
+                                       for partition_key_enum in previous_partition_keys], dtype=np.int64)[previous_partition_codes]
+        previous_kept_rows = (previous_row_codes >= 0) & kept_partitions[np.maximum(previous_row_codes, 0)]
+        previous_row_positions = np.flatnonzero(previous_kept_rows)
+        previous_row_positions = previous_row_positions[np.argsort(previous_row_codes[previous_row_positions], kind='stable')]
+        current_row_positions = np.flatnonzero(kept_rows)
+        current_row_positions = current_row_positions[np.argsort(partition_codes[current_row_positions], kind='stable')]
+        if len(previous_row_positions) == len(current_row_positions) \
+            and list(previous_masked_data.columns) == [str(column_name_enum) for column_name_enum in unmasked_data.columns]:
+            masked_data.iloc[current_row_positions] = previous_masked_data.iloc[previous_row_positions].to_numpy(dtype=object)
+        else:
+            OutputClass.warning(f'{os.path.basename(output_file_path)} does not match its fingerprints, all partitions are masked')
+            kept_partitions[:] = False
+            kept_rows[:] = False
+    OutputClass.info(f'{int((~kept_partitions).sum())} of {len(partition_keys)} partitions to mask')
+    if (~kept_rows).any():
+        # The subset keeps the column types of the whole file, so values are written the same way
+        changed_masked_data = masking_policy_for_small_populations.apply_full_masking(
+            unmasked_data[~kept_rows], max_workers=max_workers, **masking_arguments)
+        masked_data.loc[~kept_rows] = changed_masked_data.to_numpy(dtype=object)
+
+    OutputClass.process(f'Generating {os.path.basename(output_file_path)}')
+    temporary_output_file_path = f'{output_file_path}.tmp'
+    masked_data.to_csv(temporary_output_file_path, index=False, header=True, mode='w')
+    os.replace(temporary_output_file_path, output_file_path)
+    write_fingerprints(fingerprint_file_path, fingerprint_dict)
+    OutputClass.success(f'{output_file_path} is generated!')
+    return output_file_path
@@ -0,0 +1,198 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Reason-coded table of masked cells                                                 #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing an opt-in audit of apply_full_masking: the reason every masked cell was masked for,
+written as a sparse table with one line per masked cell instead of the whole masked file.
+
+Each cell gets the reason of the first procedure that masked it:
+    primary                         value within the masking limits (simple masking procedure)
+    vertical:<column>+<column>...   one of the two smallest values of a subcategory group, grouped by the
+                                    Partition Columns and the listed Subcategory Columns
+    rate, sum                       horizontal masking procedure of the measure column relation
+    complementary                   complementary suppression
+    additional                      Additional Masking Column of a row with a masked measure cell
+
+    masking_audit = MaskingAudit()
+    masked_data = apply_full_masking(unmasked_data, ..., masking_audit=masking_audit)
+    masking_audit.write_csv('table_Masked_cells.csv')
+
+The row column is the 0-based position of the row in the data, i.e. line row + 2 of a CSV file.
+Key columns named row, column or reason are written as key_row, key_column or key_reason.
+'''
+from __future__ import annotations
+
+# Standard libraries
+import itertools
+import numpy as np
+import pandas as pd
+
+# User-defined libraries
+from masking_engine import REASON_CODE_ADDITIONAL, REASON_CODE_COMPLEMENTARY, REASON_CODE_PRIMARY, \
+    REASON_CODE_RATE, REASON_CODE_SUM, REASON_CODE_VERTICAL
+
+
+def get_reason_labels(subcategory_column_names: list[str]) -> dict[int, str]:
+    '''
+    Label of every reason code
+
+    Args:
+        subcategory_column_names (list[str]): subcategory column names
+
+    Returns:
+        reason_labels (dict[int, str]): label per reason code
+    '''
+    reason_labels = {REASON_CODE_PRIMARY: 'primary', REASON_CODE_RATE: 'rate', REASON_CODE_SUM: 'sum',
+                     REASON_CODE_COMPLEMENTARY: 'complementary', REASON_CODE_ADDITIONAL: 'additional'}
+    for subset_enum, subcategory_column_names_subset \
+        in enumerate(itertools.combinations(subcategory_column_names, len(subcategory_column_names)-1)):
+        reason_labels[REASON_CODE_VERTICAL + subset_enum] = \
+            'vertical:' + '+'.join(str(column_name_enum) for column_name_enum in subcategory_column_names_subset)
+    return reason_labels
+
+def get_key_column_labels(key_column_names: list) -> list[str]:
+    '''
+    Labels of the key columns in a table of masked cells: names of the table's own columns (row, column,
+    reason) are prefixed with key_, as many times as needed to be unique
+
+    Args:
+        key_column_names (list): key column names
+
+    Returns:
+        key_column_labels (list[str]): key column labels
+    '''
+    used_labels = {'row', 'column', 'reason'} | {str(column_name_enum) for column_name_enum in key_column_names}
+    key_column_labels: list[str] = []
+    for column_name_enum in key_column_names:
+        column_label = str(column_name_enum)
+        if column_label in ['row', 'column', 'reason']:
+            while column_label in used_labels:
+                column_label = f'key_{column_label}'
+            used_labels.add(column_label)
+        key_column_labels.append(column_label)
+    return key_column_labels
+
+
+class MaskingAudit:
+    '''
+        Class to collect the reason every cell was masked for during a masking run
+    '''
+
+    def __init__(self, key_column_names: list[str] | None = None) -> None:
+        '''
+        Args:
+            key_column_names (list[str] | None, optional): columns identifying a row in the table.
+                Defaults to None (Partition and Subcategory Columns).
+        '''
+        self.key_column_names = None if key_column_names is None else list(key_column_names)
+        self.key_data: pd.DataFrame | None = None
+        self.measure_column_names: list[str] = []
+        self.additional_masking_column_names: list[str] = []
+        self.reason_labels: dict[int, str] = {}
+        self.reason_codes: np.ndarray | None = None
+
+    def start(self,
+              unmasked_data: pd.DataFrame,
+              partition_column_names: list[str],
+              subcategory_column_names: list[str],
+              measure_column_names: list[str],
+              additional_masking_column_names: list[str]) -> np.ndarray:
+        '''
+        Starting the audit of a masking run
+
+        Args:
+            unmasked_data (pd.DataFrame): unmasked data
+            partition_column_names (list[str]): partition column names
+            subcategory_column_names (list[str]): subcategory column names
+            measure_column_names (list[str]): measure column names
+            additional_masking_column_names (list[str]): additional masking column names
+
+        Returns:
+            reason_codes (np.ndarray): zero uint8 matrix (rows x measure columns) for compute_masked_cells to fill
+        '''
+        key_column_names = self.key_column_names
+        if key_column_names is None:
+            key_column_names = list(dict.fromkeys(partition_column_names + subcategory_column_names))
+        self.key_data = unmasked_data[key_column_names]
+        self.measure_column_names = list(measure_column_names)
+        self.additional_masking_column_names = list(additional_masking_column_names)
+        self.reason_labels = get_reason_labels(subcategory_column_names)
+        self.reason_codes = np.zeros((len(unmasked_data), len(measure_column_names)), dtype=np.uint8)
+        return self.reason_codes
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Collecting masked cells into a table, ordered by row then column
+
+        Returns:
+            masked_cell_table (pd.DataFrame): row, key columns (see get_key_column_labels), column and reason
+                of every masked cell
+        '''
+        row_positions, column_positions = np.nonzero(self.reason_codes)
+        reason_codes = self.reason_codes[row_positions, column_positions]
+        masked_rows = np.flatnonzero(self.reason_codes.any(axis=1))
+        n_additional_columns = len(self.additional_masking_column_names)
+        if n_additional_columns > 0:
+            row_positions = np.concatenate([row_positions, np.repeat(masked_rows, n_additional_columns)])
+            column_positions = np.concatenate([column_positions, len(self.measure_column_names) \
+                                               + np.tile(np.arange(n_additional_columns), len(masked_rows))])
+            reason_codes = np.concatenate([reason_codes, np.full(len(masked_rows) * n_additional_columns,
+                                                                 REASON_CODE_ADDITIONAL, dtype=np.uint8)])
+        cell_order = np.lexsort((column_positions, row_positions))
+        row_positions, column_positions, reason_codes = \
+            row_positions[cell_order], column_positions[cell_order], reason_codes[cell_order]
+
+        column_names = [str(column_name_enum) for column_name_enum \
+                        in self.measure_column_names + self.additional_masking_column_names]
+        masked_cell_table = self.key_data.iloc[row_positions].reset_index(drop=True)
+        masked_cell_table.columns = get_key_column_labels(list(self.key_data.columns))
+        masked_cell_table.insert(0, 'row', row_positions)
+        masked_cell_table['column'] = pd.Categorical.from_codes(column_positions, categories=column_names)
+        reason_codes_used = sorted(self.reason_labels)
+        masked_cell_table['reason'] = pd.Categorical.from_codes(
+            np.searchsorted(reason_codes_used, reason_codes),
+            categories=[self.reason_labels[reason_code_enum] for reason_code_enum in reason_codes_used])
+        return masked_cell_table
+
+    def write_csv(self, masked_cell_file_path: str) -> None:
+        '''
+        Writing the table of masked cells into a CSV file
+
+        Args:
+            masked_cell_file_path (str): full path to CSV file
+        '''
+        self.to_frame().to_csv(masked_cell_file_path, index=False, header=True, mode='w')
+
+
+def apply_masked_cell_table(unmasked_data: pd.DataFrame,
+                            masked_cell_table: pd.DataFrame,
+                            masking_string: str = 'Msk') -> pd.DataFrame:
+    '''
+    Writing the masking string into the cells listed in a table of masked cells, e.g. to apply or verify
+    masks downstream without the masked file. Only the listed columns are converted into strings.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        masked_cell_table (pd.DataFrame): table of masked cells, with row and column entries
+        masking_string (str, optional): string to replace masked values. Defaults to 'Msk'.
+
+    Returns:
+        masked_data (pd.DataFrame): masked data
+    '''
+    masked_data = unmasked_data.copy(deep=False)
+    column_names = [str(column_name_enum) for column_name_enum in unmasked_data.columns]
+    row_positions = masked_cell_table['row'].to_numpy(dtype=np.int64)
+    cell_columns = masked_cell_table['column'].astype(str).to_numpy()
+    for column_name_enum in pd.unique(cell_columns):
+        column_name = unmasked_data.columns[column_names.index(column_name_enum)]
+        masked_rows = np.zeros(len(unmasked_data), dtype=bool)
+        masked_rows[row_positions[cell_columns == column_name_enum]] = True
+        masked_data[column_name] = unmasked_data[column_name].astype(str).mask(masked_rows, masking_string)
+    return masked_data
@@ -0,0 +1,164 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Content-addressed on-disk cache of masked cells                                    #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing an on-disk cache of the masked cells computed by apply_full_masking.
+
+The cache key is a hash of the content of the partition, subcategory and measure columns, of the
+column names and relation type, and of the masking policy. Masked cells are stored bit-packed,
+one file per key. The least recently used files are evicted once the cache exceeds its size limit.
+
+    masking_cache = MaskingCache('./.masking_cache', max_bytes=256 * 2**20)
+    masked_data = apply_full_masking(unmasked_data, ..., masking_cache=masking_cache)
+    print(masking_cache.hits, masking_cache.misses)
+'''
+from __future__ import annotations
+
+# Standard libraries
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# User-defined libraries
+from  terminal_interactions import OutputClass
+
+
+class MaskingCache:
+    '''
+        Class to store and retrieve masked cells on disk, with least recently used eviction
+    '''
+    file_extension: str = '.npz'
+
+    def __init__(self, cache_dir_path: str, max_bytes: int = 512 * 2**20) -> None:
+        '''
+        Args:
+            cache_dir_path (str): cache directory, created if needed
+            max_bytes (int, optional): size limit of the cache files. Defaults to 512 MiB.
+        '''
+        self.cache_dir_path = cache_dir_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir_path, exist_ok=True)
+
+    def get_key(self,
+                unmasked_data: pd.DataFrame,
+                partition_column_names: list[str],
+                subcategory_column_names: list[str],
+                measure_columns_relation_type: str,
+                measure_column_names: list[str],
+                masking_policy) -> str:
+        '''
+        Cache key of a masking run. The masking string is not part of it, since it does not change the masked cells.
+
+        Args:
+            unmasked_data (pd.DataFrame): unmasked data
+            partition_column_names (list[str]): partition column names
+            subcategory_column_names (list[str]): subcategory column names
+            measure_columns_relation_type (str): '0' no relation, '1' rate, '2' sum
+            measure_column_names (list[str]): measure column names
+            masking_policy (GlobalMaskingPol): masking limits
+
+        Returns:
+            cache_key (str): hexadecimal digest
+        '''
+        masking_column_names = list(dict.fromkeys(partition_column_names + subcategory_column_names + measure_column_names))
+        key_hash = hashlib.sha256(json.dumps({
+            'partition_columns': [str(column_name_enum) for column_name_enum in partition_column_names],
+            'subcategory_columns': [str(column_name_enum) for column_name_enum in subcategory_column_names],
+            'measure_columns_relation_type': str(measure_columns_relation_type),
+            'measure_columns': [str(column_name_enum) for column_name_enum in measure_column_names],
+            'gmp_msk_min': masking_policy.gmp_msk_min,
+            'gmp_msk_max': masking_policy.gmp_msk_max,
+            'gmp_complementary': getattr(masking_policy, 'gmp_complementary', False),
+            'rows': len(unmasked_data)}, sort_keys=True).encode('utf-8'))
+        key_hash.update(pd.util.hash_pandas_object(unmasked_data[masking_column_names], index=False).to_numpy().tobytes())
+        return key_hash.hexdigest()
+
+    def get_file_path(self, cache_key: str) -> str:
+        '''
+        Full path to the cache file of a key
+
+        Args:
+            cache_key (str): cache key
+
+        Returns:
+            cache_file_path (str): full path to cache file
+        '''
+        return os.path.join(self.cache_dir_path, f'{cache_key}{MaskingCache.file_extension}')
+
+    def get(self, cache_key: str, shape: tuple[int, int]) -> np.ndarray | None:
+        '''
+        Retrieving masked cells, and marking them as recently used
+
+        Args:
+            cache_key (str): cache key
+            shape (tuple[int, int]): expected shape of the masked cells (rows x measure columns)
+
+        Returns:
+            masked_cells (np.ndarray | None): boolean matrix of masked cells, None if not cached
+        '''
+        cache_file_path = self.get_file_path(cache_key)
+        try:
+            with np.load(cache_file_path) as cache_file:
+                cached_shape = tuple(int(size_enum) for size_enum in cache_file['shape'])
+                packed_cells = cache_file['packed_cells']
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        if cached_shape != tuple(shape):
+            self.misses += 1
+            return None
+        os.utime(cache_file_path)
+        self.hits += 1
+        return np.unpackbits(packed_cells, count=shape[0] * shape[1]).astype(bool).reshape(shape)
+
+    def put(self, cache_key: str, masked_cells: np.ndarray) -> None:
+        '''
+        Storing masked cells, then evicting the least recently used files above the size limit
+
+        Args:
+            cache_key (str): cache key
+            masked_cells (np.ndarray): boolean matrix of masked cells
+        '''
+        cache_file_path = self.get_file_path(cache_key)
+        # Written under a temporary name first, so that readers never see a partial file
+        temporary_file_path = f'{cache_file_path}.{os.getpid()}.tmp'
+        with open(temporary_file_path, 'wb') as cache_file:
+            np.savez(cache_file, shape=np.array(masked_cells.shape), packed_cells=np.packbits(masked_cells, axis=None))
+        os.replace(temporary_file_path, cache_file_path)
+        self.evict()
+
+    def evict(self) -> None:
+        '''
+        Removing the least recently used cache files until the cache is within its size limit
+        '''
+        cache_file_list = []
+        for file_name_enum in os.listdir(self.cache_dir_path):
+            if file_name_enum.endswith(MaskingCache.file_extension):
+                file_stat = os.stat(os.path.join(self.cache_dir_path, file_name_enum))
+                cache_file_list.append((file_stat.st_mtime, file_stat.st_size, file_name_enum))
+        cache_bytes = sum(file_size for _, file_size, _ in cache_file_list)
+        for _, file_size, file_name_enum in sorted(cache_file_list):
+            if cache_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir_path, file_name_enum))
+            except FileNotFoundError:
+                pass
+            cache_bytes -= file_size
+
+    def report(self) -> None:
+        '''
+        Displaying cache hits and misses
+        '''
+        OutputClass.info(f'Masking cache: {self.hits} hits, {self.misses} misses')
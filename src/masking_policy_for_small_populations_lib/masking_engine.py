@@ -0,0 +1,773 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Columnar masking engine operating on whole measure matrices                        #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing vectorized masking procedures used by apply_full_masking.
+'''
+# Standard libraries
+import concurrent.futures
+import contextlib
+import heapq
+import itertools
+import numpy as np
+import pandas as pd
+
+# Reason a cell was first masked for, see masking_audit. Vertical codes follow REASON_CODE_VERTICAL,
+# one per subcategory subset in itertools.combinations order.
+REASON_CODE_PRIMARY = 1
+REASON_CODE_RATE = 2
+REASON_CODE_SUM = 3
+REASON_CODE_COMPLEMENTARY = 4
+REASON_CODE_ADDITIONAL = 5
+REASON_CODE_VERTICAL = 16
+
+
+def get_measure_value_matrix(unmasked_data: pd.DataFrame,
+                             measure_column_names: list[str]) -> np.ndarray:
+    '''
+    Collecting measure columns into a single float matrix (rows x measure columns).
+    Missing values, either NaN/None or the 'nan' string, are stored as NaN.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        measure_column_names (list[str]): measure column names
+
+    Returns:
+        measure_values (np.ndarray): float matrix of measure values
+    '''
+    measure_data = unmasked_data[measure_column_names]
+    if any(measure_data[column_name_enum].dtype == object for column_name_enum in measure_column_names):
+        measure_data = measure_data.replace('nan', np.nan)
+    return measure_data.to_numpy(dtype=np.float64, na_value=np.nan)
+
+def apply_simple_masking(measure_values: np.ndarray,
+                         msk_min: float,
+                         msk_max: float) -> np.ndarray:
+    '''
+    Simple masking procedure: any measure value within the masking limits is masked.
+    Missing values are never masked.
+
+    Args:
+        measure_values (np.ndarray): float matrix of measure values
+        msk_min (float): lower masking limit
+        msk_max (float): upper masking limit
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells
+    '''
+    return (measure_values >= msk_min) & (measure_values <= msk_max)
+
+def get_column_codes(column_values: pd.Series) -> tuple[np.ndarray, int]:
+    '''
+    Encoding a partition or subcategory column into integer codes.
+    Missing values are encoded as -1.
+
+    Args:
+        column_values (pd.Series): column values
+
+    Returns:
+        column_codes (np.ndarray): integer code per row
+        n_codes (int): number of distinct non-missing values
+    '''
+    if isinstance(column_values.dtype, pd.CategoricalDtype):
+        # Already encoded at load (see compact_unmasked_data), unused categories are dropped by combine_group_codes
+        return column_values.cat.codes.to_numpy(dtype=np.int64), len(column_values.cat.categories)
+    column_codes, column_uniques = pd.factorize(column_values, sort=False)
+    return column_codes, len(column_uniques)
+
+def combine_group_codes(column_codes_list: list[tuple[np.ndarray, int]],
+                        n_rows: int) -> tuple[np.ndarray, int]:
+    '''
+    Combining column codes into one group code per row. Rows with a missing value
+    in any of the columns do not belong to any group and are encoded as -1.
+    No columns means a single group holding every row.
+
+    Args:
+        column_codes_list (list[tuple[np.ndarray, int]]): output of get_column_codes per column
+        n_rows (int): number of rows
+
+    Returns:
+        group_codes (np.ndarray): integer group code per row
+        n_groups (int): number of groups
+    '''
+    combined_codes = np.zeros(n_rows, dtype=np.int64)
+    missing_rows = np.zeros(n_rows, dtype=bool)
+    for column_codes, n_codes in column_codes_list:
+        missing_rows |= column_codes < 0
+        # Re-factorizing after each column keeps the mixed-radix code below n_rows * n_codes
+        combined_codes, _ = pd.factorize(combined_codes * max(n_codes, 1) + np.maximum(column_codes, 0))
+    kept_group_codes, group_uniques = pd.factorize(combined_codes[~missing_rows])
+    group_codes = np.full(n_rows, -1, dtype=np.int64)
+    group_codes[~missing_rows] = kept_group_codes
+    return group_codes, len(group_uniques)
+
+def get_group_two_smallest(measure_values: np.ndarray,
+                           group_codes: np.ndarray,
+                           n_groups: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Finding the two smallest non-zero values of every group and measure column in a single pass.
+    Ties count twice, i.e. the second smallest of (5, 5, 7) is 5.
+
+    Args:
+        measure_values (np.ndarray): float matrix of measure values
+        group_codes (np.ndarray): integer group code per row, -1 for no group
+        n_groups (int): number of groups
+
+    Returns:
+        valid_cells (np.ndarray): boolean matrix of non-zero, non-missing cells belonging to a group
+        n1min (np.ndarray): smallest value per (group, measure column), inf if none
+        n2min (np.ndarray): second smallest value per (group, measure column), inf if none
+    '''
+    n_columns = measure_values.shape[1]
+    valid_cells = (measure_values != 0) & ~np.isnan(measure_values) & (group_codes >= 0)[:, None]
+    cell_ids = (group_codes[:, None] * n_columns + np.arange(n_columns))[valid_cells]
+    cell_values = measure_values[valid_cells]
+
+    n1min = np.full((n_groups, n_columns), np.inf)
+    np.minimum.at(n1min.reshape(-1), cell_ids, cell_values)
+    n1min_cells = cell_values == n1min.reshape(-1)[cell_ids]
+    n1min_counts = np.bincount(cell_ids[n1min_cells], minlength=n_groups * n_columns).reshape(n_groups, n_columns)
+    n2min = np.full((n_groups, n_columns), np.inf)
+    np.minimum.at(n2min.reshape(-1), cell_ids[~n1min_cells], cell_values[~n1min_cells])
+    n2min = np.where(n1min_counts >= 2, n1min, n2min)
+    return valid_cells, n1min, n2min
+
+def get_group_vertical_limits(measure_values: np.ndarray,
+                              group_codes: np.ndarray,
+                              n_groups: int) -> np.ndarray:
+    '''
+    Upper masking limit from which each cell is one of the two masked smallest non-zero values of its group
+    and measure column. Rows are sorted by group once and every group is assessed by the kernel at once
+    (see masking_kernels, compiled with Numba when installed).
+
+    Args:
+        measure_values (np.ndarray): float matrix of measure values
+        group_codes (np.ndarray): integer group code per row, -1 for no group
+        n_groups (int): number of groups
+
+    Returns:
+        group_limits (np.ndarray): float matrix of the smallest value of the group for its two smallest
+            non-zero values, inf for other cells
+    '''
+    from masking_kernels import get_sorted_vertical_limits
+
+    row_order, group_offsets = get_group_offsets(group_codes, n_groups)
+    # Rows without a group come first in row_order and are left out
+    grouped_rows = row_order[group_offsets[0]:]
+    group_limits = np.full(measure_values.shape, np.inf)
+    group_limits[grouped_rows] = get_sorted_vertical_limits(measure_values[grouped_rows], group_offsets - group_offsets[0])
+    return group_limits
+
+def apply_group_masking(measure_values: np.ndarray,
+                        group_codes: np.ndarray,
+                        n_groups: int,
+                        msk_max: float) -> np.ndarray:
+    '''
+    Masking the two smallest non-zero values of every group and measure column,
+    if the smallest one is not above the upper masking limit.
+
+    Args:
+        measure_values (np.ndarray): float matrix of measure values
+        group_codes (np.ndarray): integer group code per row, -1 for no group
+        n_groups (int): number of groups
+        msk_max (float): upper masking limit
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells
+    '''
+    return get_group_vertical_limits(measure_values, group_codes, n_groups) <= msk_max
+
+def apply_vertical_masking(unmasked_data: pd.DataFrame,
+                           measure_values: np.ndarray,
+                           partition_column_names: list[str],
+                           subcategory_column_names: list[str],
+                           msk_max: float,
+                           phase_record: dict | None = None,
+                           reason_codes: np.ndarray | None = None) -> np.ndarray:
+    '''
+    Vertical masking procedure for subcategories. For every partition and every combination of
+    all but one Subcategory Column, the two smallest non-zero values are masked.
+    Column codes are built once and each subcategory subset is assessed in one grouped pass.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        measure_values (np.ndarray): float matrix of measure values
+        partition_column_names (list[str]): partition column names
+        subcategory_column_names (list[str]): subcategory column names
+        msk_max (float): upper masking limit
+        phase_record (dict | None, optional): run report record the number of groups is added to. Defaults to None.
+        reason_codes (np.ndarray | None, optional): reason code matrix, set for cells first masked by each subset. Defaults to None.
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells
+    '''
+    masked_cells = np.zeros(measure_values.shape, dtype=bool)
+    if len(subcategory_column_names) == 0:
+        return masked_cells
+    column_codes_dict = {column_name_enum: get_column_codes(unmasked_data[column_name_enum]) \
+                         for column_name_enum in partition_column_names + subcategory_column_names}
+    for subset_enum, subcategory_column_names_subset \
+        in enumerate(itertools.combinations(subcategory_column_names, len(subcategory_column_names)-1)):
+        group_codes, n_groups = combine_group_codes([column_codes_dict[column_name_enum] for column_name_enum \
+                                                     in partition_column_names + list(subcategory_column_names_subset)],
+                                                    len(unmasked_data))
+        subset_masked_cells = apply_group_masking(measure_values, group_codes, n_groups, msk_max)
+        if reason_codes is not None:
+            reason_codes[subset_masked_cells & (reason_codes == 0)] = REASON_CODE_VERTICAL + subset_enum
+        masked_cells |= subset_masked_cells
+        if phase_record is not None:
+            phase_record['groups'] = (phase_record['groups'] or 0) + n_groups
+    return masked_cells
+
+def get_vertical_masking_limits(unmasked_data: pd.DataFrame,
+                                measure_values: np.ndarray,
+                                partition_column_names: list[str],
+                                subcategory_column_names: list[str]) -> np.ndarray:
+    '''
+    Lowest upper masking limit at which every cell is masked by the vertical masking procedure, so that
+    apply_vertical_masking(..., msk_max) equals get_vertical_masking_limits(...) <= msk_max for any msk_max.
+    Groups and their two smallest values do not depend on the masking limits and are assessed once.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        measure_values (np.ndarray): float matrix of measure values
+        partition_column_names (list[str]): partition column names
+        subcategory_column_names (list[str]): subcategory column names
+
+    Returns:
+        vertical_limits (np.ndarray): float matrix of lowest upper masking limits, inf for cells never masked
+    '''
+    vertical_limits = np.full(measure_values.shape, np.inf)
+    if len(subcategory_column_names) == 0:
+        return vertical_limits
+    column_codes_dict = {column_name_enum: get_column_codes(unmasked_data[column_name_enum]) \
+                         for column_name_enum in partition_column_names + subcategory_column_names}
+    for subcategory_column_names_subset in itertools.combinations(subcategory_column_names, len(subcategory_column_names)-1):
+        group_codes, n_groups = combine_group_codes([column_codes_dict[column_name_enum] for column_name_enum \
+                                                     in partition_column_names + list(subcategory_column_names_subset)],
+                                                    len(unmasked_data))
+        np.minimum(vertical_limits, get_group_vertical_limits(measure_values, group_codes, n_groups), out=vertical_limits)
+    return vertical_limits
+
+def apply_rate_masking(measure_values: np.ndarray,
+                       masked_cells: np.ndarray,
+                       msk_min: float,
+                       msk_max: float) -> np.ndarray:
+    '''
+    Horizontal masking procedure for Rate relation. Numerator and denominator are both masked on
+    rows where either one is already masked or the smaller of the two is within the masking limits.
+
+    Args:
+        measure_values (np.ndarray): float matrix of numerator and denominator values
+        masked_cells (np.ndarray): boolean matrix of masked cells so far
+        msk_min (float): lower masking limit
+        msk_max (float): upper masking limit
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells
+    '''
+    # fmin skips missing values, rows without any value stay NaN
+    row_min_values = np.fmin.reduce(measure_values, axis=1)
+    masked_rows = masked_cells.any(axis=1) | ((row_min_values >= msk_min) & (row_min_values <= msk_max))
+    return masked_cells | masked_rows[:, None]
+
+def apply_sum_masking(measure_values: np.ndarray,
+                      masked_cells: np.ndarray,
+                      msk_max: float) -> np.ndarray:
+    '''
+    Horizontal masking procedure for Sum relation, where the first column is the Sum Column.
+    Rows with a masked Sum Column get all measure columns masked. On other rows, the smallest
+    non-zero value is masked if any measure column is already masked, and the two smallest
+    non-zero values are masked if the smallest one is not above the upper masking limit.
+
+    Args:
+        measure_values (np.ndarray): float matrix of sum and element values
+        masked_cells (np.ndarray): boolean matrix of masked cells so far
+        msk_max (float): upper masking limit
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells
+    '''
+    masked_cells = masked_cells.copy()
+    sum_masked_rows = masked_cells[:, 0].copy()
+    if measure_values.shape[1] >= 2:
+        nonzero_values = np.where((measure_values != 0) & ~np.isnan(measure_values), measure_values, np.inf)
+        two_smallest_values = np.partition(nonzero_values, 1, axis=1)
+        n1min = two_smallest_values[:, 0]
+        n2min = two_smallest_values[:, 1]
+        # Rows with less than two non-zero values are not assessed
+        assessed_rows = ~sum_masked_rows & np.isfinite(n2min)
+        n1min_cells = measure_values == n1min[:, None]
+        n2min_cells = measure_values == n2min[:, None]
+        masked_cells |= (assessed_rows & masked_cells.any(axis=1))[:, None] & n1min_cells
+        masked_cells |= (assessed_rows & (n1min <= msk_max))[:, None] & (n1min_cells | n2min_cells)
+    masked_cells[sum_masked_rows] = True
+    return masked_cells
+
+def get_group_offsets(group_codes: np.ndarray,
+                      n_groups: int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Sorting rows by group once, so that the rows of any set of groups can be gathered
+    without scanning every row.
+
+    Args:
+        group_codes (np.ndarray): integer group code per row, -1 for no group
+        n_groups (int): number of groups
+
+    Returns:
+        row_order (np.ndarray): row positions sorted by group code
+        group_offsets (np.ndarray): start of each group in row_order, plus the end of the last group
+    '''
+    row_order = np.argsort(group_codes, kind='stable')
+    group_row_counts = np.bincount(group_codes[group_codes >= 0], minlength=n_groups)
+    # Rows without a group (-1) come first in row_order and are skipped
+    n_missing_rows = len(group_codes) - int(group_row_counts.sum())
+    group_offsets = np.concatenate([[0], np.cumsum(group_row_counts)]) + n_missing_rows
+    return row_order, group_offsets
+
+def get_group_rows(row_order: np.ndarray,
+                   group_offsets: np.ndarray,
+                   group_ids: np.ndarray) -> np.ndarray:
+    '''
+    Row positions of the given groups
+
+    Args:
+        row_order (np.ndarray): row positions sorted by group code (see get_group_offsets)
+        group_offsets (np.ndarray): start of each group in row_order (see get_group_offsets)
+        group_ids (np.ndarray): group codes
+
+    Returns:
+        row_positions (np.ndarray): row positions of the groups, group by group
+    '''
+    group_lengths = group_offsets[group_ids + 1] - group_offsets[group_ids]
+    group_ends = np.cumsum(group_lengths)
+    positions_in_group = np.arange(group_ends[-1] if len(group_ends) else 0) - np.repeat(group_ends - group_lengths, group_lengths)
+    return row_order[np.repeat(group_offsets[group_ids], group_lengths) + positions_in_group]
+
+def suppress_single_masked_cells(measure_values: np.ndarray,
+                                 masked_cells: np.ndarray,
+                                 local_codes: np.ndarray,
+                                 n_local_groups: int,
+                                 checked_cells: np.ndarray) -> np.ndarray:
+    '''
+    Complementary suppression within groups: where a group and measure column holds exactly one
+    masked non-zero value, its smallest unmasked non-zero value is masked too (ties count).
+
+    Args:
+        measure_values (np.ndarray): float matrix of measure values of the rows to check
+        masked_cells (np.ndarray): boolean matrix of masked cells of the rows to check
+        local_codes (np.ndarray): group code per row, from 0 to n_local_groups-1
+        n_local_groups (int): number of groups
+        checked_cells (np.ndarray): boolean matrix (groups x measure columns) of group columns to check
+
+    Returns:
+        new_masked_cells (np.ndarray): boolean matrix of cells to mask in addition
+    '''
+    n_columns = measure_values.shape[1]
+    valid_cells = (measure_values != 0) & ~np.isnan(measure_values)
+    cell_ids = local_codes[:, None] * n_columns + np.arange(n_columns)
+    masked_counts = np.bincount(cell_ids[valid_cells & masked_cells], minlength=n_local_groups * n_columns)
+    exposed_cells = (masked_counts == 1) & checked_cells.reshape(-1)
+    candidate_cells = valid_cells & ~masked_cells & exposed_cells[cell_ids]
+    candidate_min = np.full(n_local_groups * n_columns, np.inf)
+    np.minimum.at(candidate_min, cell_ids[candidate_cells], measure_values[candidate_cells])
+    return candidate_cells & (measure_values == candidate_min[cell_ids])
+
+def suppress_single_masked_row_cells(measure_values: np.ndarray,
+                                     masked_cells: np.ndarray,
+                                     measure_columns_relation_type: str) -> np.ndarray:
+    '''
+    Complementary suppression across measure columns of the rows to check. For Rate relation,
+    rows with a masked cell get both cells masked. For Sum relation, rows with a masked Sum Column
+    get all cells masked, and rows with exactly one masked non-zero value get their smallest unmasked
+    non-zero value masked too (ties count).
+
+    Args:
+        measure_values (np.ndarray): float matrix of measure values of the rows to check
+        masked_cells (np.ndarray): boolean matrix of masked cells of the rows to check
+        measure_columns_relation_type (str): '0' no relation, '1' rate, '2' sum
+
+    Returns:
+        new_masked_cells (np.ndarray): boolean matrix of cells to mask in addition
+    '''
+    if measure_columns_relation_type == '1':
+        return masked_cells.any(axis=1)[:, None] & ~masked_cells
+    if measure_columns_relation_type != '2':
+        return np.zeros(masked_cells.shape, dtype=bool)
+    valid_cells = (measure_values != 0) & ~np.isnan(measure_values)
+    exposed_rows = ~masked_cells[:, 0] & ((valid_cells & masked_cells).sum(axis=1) == 1)
+    candidate_cells = valid_cells & ~masked_cells & exposed_rows[:, None]
+    candidate_min = np.where(candidate_cells, measure_values, np.inf).min(axis=1, initial=np.inf)
+    new_masked_cells = candidate_cells & (measure_values == candidate_min[:, None])
+    new_masked_cells |= masked_cells[:, 0][:, None] & ~masked_cells
+    return new_masked_cells
+
+def apply_complementary_suppression(unmasked_data: pd.DataFrame,
+                                    measure_values: np.ndarray,
+                                    masked_cells: np.ndarray,
+                                    partition_column_names: list[str],
+                                    subcategory_column_names: list[str],
+                                    measure_columns_relation_type: str,
+                                    phase_record: dict | None = None) -> np.ndarray:
+    '''
+    Complementary suppression until no masked value can be recovered by subtraction: no vertical group
+    (partition and all but one Subcategory Column) and no row of related Measure Columns is left with a
+    single masked value. A worklist keeps the group columns and rows touched by new suppressions, and
+    only those are checked again, until no new cell is masked.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        measure_values (np.ndarray): float matrix of measure values
+        masked_cells (np.ndarray): boolean matrix of masked cells after the three masking procedures
+        partition_column_names (list[str]): partition column names
+        subcategory_column_names (list[str]): subcategory column names
+        measure_columns_relation_type (str): '0' no relation, '1' rate, '2' sum
+        phase_record (dict | None, optional): run report record the group checks and rounds are added to. Defaults to None.
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells
+    '''
+    masked_cells = masked_cells.copy()
+    n_rows, n_columns = masked_cells.shape
+    vertical_groupings: list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+    if len(subcategory_column_names) > 0:
+        column_codes_dict = {column_name_enum: get_column_codes(unmasked_data[column_name_enum]) \
+                             for column_name_enum in partition_column_names + subcategory_column_names}
+        for subcategory_column_names_subset in itertools.combinations(subcategory_column_names, len(subcategory_column_names)-1):
+            group_codes, n_groups = combine_group_codes([column_codes_dict[column_name_enum] for column_name_enum \
+                                                         in partition_column_names + list(subcategory_column_names_subset)],
+                                                        n_rows)
+            row_order, group_offsets = get_group_offsets(group_codes, n_groups)
+            vertical_groupings.append((group_codes, row_order, group_offsets, np.zeros((n_groups, n_columns), dtype=bool)))
+    dirty_rows = np.zeros(n_rows, dtype=bool)
+
+    def add_to_worklist(row_positions: np.ndarray, column_positions: np.ndarray) -> None:
+        dirty_rows[row_positions] = True
+        for group_codes, _, _, dirty_group_cells in vertical_groupings:
+            cell_groups = group_codes[row_positions]
+            dirty_group_cells[cell_groups[cell_groups >= 0], column_positions[cell_groups >= 0]] = True
+
+    # Every group column and row holding a masked cell is checked once
+    add_to_worklist(*np.nonzero(masked_cells))
+    n_checked_groups, n_rounds = 0, 0
+    new_cell_flag = True
+    while new_cell_flag:
+        new_cell_flag = False
+        n_rounds += 1
+        for group_codes, row_order, group_offsets, dirty_group_cells in vertical_groupings:
+            dirty_group_ids = np.flatnonzero(dirty_group_cells.any(axis=1))
+            if len(dirty_group_ids) == 0:
+                continue
+            n_checked_groups += len(dirty_group_ids)
+            row_positions = get_group_rows(row_order, group_offsets, dirty_group_ids)
+            local_codes = np.searchsorted(dirty_group_ids, group_codes[row_positions])
+            checked_cells = dirty_group_cells[dirty_group_ids]
+            dirty_group_cells[dirty_group_ids] = False
+            new_masked_cells = suppress_single_masked_cells(measure_values[row_positions], masked_cells[row_positions],
+                                                            local_codes, len(dirty_group_ids), checked_cells)
+            new_row_positions, new_column_positions = np.nonzero(new_masked_cells)
+            if len(new_row_positions) > 0:
+                new_cell_flag = True
+                new_row_positions = row_positions[new_row_positions]
+                masked_cells[new_row_positions, new_column_positions] = True
+                add_to_worklist(new_row_positions, new_column_positions)
+        row_positions = np.flatnonzero(dirty_rows)
+        dirty_rows[:] = False
+        new_masked_cells = suppress_single_masked_row_cells(measure_values[row_positions], masked_cells[row_positions],
+                                                            measure_columns_relation_type)
+        new_row_positions, new_column_positions = np.nonzero(new_masked_cells)
+        if len(new_row_positions) > 0:
+            new_cell_flag = True
+            new_row_positions = row_positions[new_row_positions]
+            masked_cells[new_row_positions, new_column_positions] = True
+            add_to_worklist(new_row_positions, new_column_positions)
+    if phase_record is not None:
+        phase_record['groups'] = n_checked_groups
+        phase_record['rounds'] = n_rounds
+    return masked_cells
+
+def compute_masked_cells(unmasked_data: pd.DataFrame,
+                         partition_column_names: list[str],
+                         subcategory_column_names: list[str],
+                         measure_columns_relation_type: str,
+                         measure_column_names: list[str],
+                         msk_min: float,
+                         msk_max: float,
+                         masking_report=None,
+                         complementary_suppression: bool = False,
+                         reason_codes: np.ndarray | None = None) -> np.ndarray:
+    '''
+    Applying the three masking procedures to determine the masked measure cells.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        partition_column_names (list[str]): partition column names
+        subcategory_column_names (list[str]): subcategory column names
+        measure_columns_relation_type (str): '0' no relation, '1' rate, '2' sum
+        measure_column_names (list[str]): measure column names
+        msk_min (float): lower masking limit
+        msk_max (float): upper masking limit
+        masking_report (MaskingReport | None, optional): run report to record the phases into. Defaults to None.
+        complementary_suppression (bool, optional): apply complementary suppression afterwards. Defaults to False.
+        reason_codes (np.ndarray | None, optional): zero uint8 matrix (rows x measure columns) filled with
+            the reason each cell was first masked for. Defaults to None.
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells (rows x measure columns)
+    '''
+    # Without a run report, phases are not timed and masked cells are not counted
+    phase = masking_report.phase if masking_report is not None else lambda phase_name, **counts: contextlib.nullcontext()
+    n_rows = len(unmasked_data)
+
+    # 1) Simple masking procedure
+    with phase('simple', rows=n_rows) as phase_record:
+        measure_values = get_measure_value_matrix(unmasked_data, measure_column_names)
+        masked_cells = apply_simple_masking(measure_values, msk_min, msk_max)
+        if reason_codes is not None:
+            reason_codes[masked_cells] = REASON_CODE_PRIMARY
+        if phase_record is not None:
+            phase_record['cells_masked'] = int(masked_cells.sum())
+
+    # 2) Vertical masking procedure for subcategories
+    # This routine requires at least one Subcategory Column
+    with phase('vertical', rows=n_rows) as phase_record:
+        vertical_masked_cells = apply_vertical_masking(unmasked_data, measure_values, partition_column_names,
+                                                       subcategory_column_names, msk_max, phase_record, reason_codes)
+        if phase_record is not None:
+            phase_record['cells_masked'] = int((vertical_masked_cells & ~masked_cells).sum())
+        masked_cells |= vertical_masked_cells
+
+    # 3) Horizontal masking procedure for measure column relations
+    with phase('horizontal', rows=n_rows) as phase_record:
+        previous_masked_cells = masked_cells
+        if measure_columns_relation_type == '1':
+            masked_cells = apply_rate_masking(measure_values, masked_cells, msk_min, msk_max)
+        if measure_columns_relation_type == '2':
+            masked_cells = apply_sum_masking(measure_values, masked_cells, msk_max)
+        if reason_codes is not None:
+            reason_codes[masked_cells & ~previous_masked_cells] = \
+                REASON_CODE_RATE if measure_columns_relation_type == '1' else REASON_CODE_SUM
+        if phase_record is not None:
+            phase_record['cells_masked'] = int((masked_cells & ~previous_masked_cells).sum())
+
+    # 4) Complementary suppression, until no masked value can be recovered by subtraction
+    if complementary_suppression:
+        with phase('complementary', rows=n_rows) as phase_record:
+            previous_masked_cells = masked_cells
+            masked_cells = apply_complementary_suppression(unmasked_data, measure_values, masked_cells, partition_column_names,
+                                                           subcategory_column_names, measure_columns_relation_type,
+                                                           phase_record)
+            if reason_codes is not None:
+                reason_codes[masked_cells & ~previous_masked_cells] = REASON_CODE_COMPLEMENTARY
+            if phase_record is not None:
+                phase_record['cells_masked'] = int((masked_cells & ~previous_masked_cells).sum())
+    return masked_cells
+
+def compute_masked_cells_sweep(unmasked_data: pd.DataFrame,
+                               partition_column_names: list[str],
+                               subcategory_column_names: list[str],
+                               measure_columns_relation_type: str,
+                               measure_column_names: list[str],
+                               masking_limits: list[tuple[float, float, bool]]) -> tuple[list[np.ndarray], list[dict]]:
+    '''
+    Applying compute_masked_cells for several masking limits in one pass over the groups: measure values
+    and vertical masking limits are computed once, then every policy only compares them with its limits.
+    Complementary suppression, when asked for, still runs once per policy.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        partition_column_names (list[str]): partition column names
+        subcategory_column_names (list[str]): subcategory column names
+        measure_columns_relation_type (str): '0' no relation, '1' rate, '2' sum
+        measure_column_names (list[str]): measure column names
+        masking_limits (list[tuple[float, float, bool]]): lower limit, upper limit and complementary suppression per policy
+
+    Returns:
+        masked_cells_list (list[np.ndarray]): boolean matrix of masked cells per policy
+        masking_counts_list (list[dict]): cells first masked by each procedure per policy
+    '''
+    measure_values = get_measure_value_matrix(unmasked_data, measure_column_names)
+    vertical_limits = get_vertical_masking_limits(unmasked_data, measure_values, partition_column_names,
+                                                  subcategory_column_names)
+    masked_cells_list: list[np.ndarray] = []
+    masking_counts_list: list[dict] = []
+    for msk_min, msk_max, complementary_suppression in masking_limits:
+        masked_cells = apply_simple_masking(measure_values, msk_min, msk_max)
+        masking_counts = {'primary': int(masked_cells.sum())}
+        vertical_masked_cells = vertical_limits <= msk_max
+        masking_counts['vertical'] = int((vertical_masked_cells & ~masked_cells).sum())
+        masked_cells |= vertical_masked_cells
+        previous_masked_cells = masked_cells
+        if measure_columns_relation_type == '1':
+            masked_cells = apply_rate_masking(measure_values, masked_cells, msk_min, msk_max)
+        if measure_columns_relation_type == '2':
+            masked_cells = apply_sum_masking(measure_values, masked_cells, msk_max)
+        masking_counts['horizontal'] = int((masked_cells & ~previous_masked_cells).sum())
+        masking_counts['complementary'] = 0
+        if complementary_suppression:
+            previous_masked_cells = masked_cells
+            masked_cells = apply_complementary_suppression(unmasked_data, measure_values, masked_cells, partition_column_names,
+                                                           subcategory_column_names, measure_columns_relation_type)
+            masking_counts['complementary'] = int((masked_cells & ~previous_masked_cells).sum())
+        masked_cells_list.append(masked_cells)
+        masking_counts_list.append(masking_counts)
+    return masked_cells_list, masking_counts_list
+
+def compute_shard_masked_cells(shard_data: pd.DataFrame,
+                               *masking_arguments,
+                               report_flag: bool = False,
+                               reason_flag: bool = False,
+                               **masking_options) -> tuple[np.ndarray, list[dict] | None, np.ndarray | None]:
+    '''
+    Applying compute_masked_cells in a worker process, with a run report and reason codes of its own if needed
+
+    Args:
+        shard_data (pd.DataFrame): unmasked data of whole partitions
+        masking_arguments: other positional arguments of compute_masked_cells
+        report_flag (bool, optional): record a run report. Defaults to False.
+        reason_flag (bool, optional): record reason codes. Defaults to False.
+        masking_options: other keyword arguments of compute_masked_cells
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells (rows x measure columns)
+        phase_records (list[dict] | None): phase records of the run report, None without report
+        reason_codes (np.ndarray | None): reason code matrix, None without reason codes
+    '''
+    masking_report = None
+    if report_flag:
+        from masking_report import MaskingReport
+        masking_report = MaskingReport()
+        masking_report.start()
+    reason_codes = np.zeros((len(shard_data), len(masking_arguments[3])), dtype=np.uint8) if reason_flag else None
+    masked_cells = compute_masked_cells(shard_data, *masking_arguments, masking_report=masking_report,
+                                        reason_codes=reason_codes, **masking_options)
+    if masking_report is None:
+        return masked_cells, None, reason_codes
+    masking_report.finish()
+    return masked_cells, masking_report.phases, reason_codes
+
+def get_partition_shards(unmasked_data: pd.DataFrame,
+                         partition_column_names: list[str],
+                         n_shards: int) -> list[np.ndarray]:
+    '''
+    Splitting rows into shards of whole partitions with similar row counts.
+    Rows with a missing partition value go with the first shard.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        partition_column_names (list[str]): partition column names
+        n_shards (int): maximum number of shards
+
+    Returns:
+        shard_row_positions (list[np.ndarray]): row positions of each non-empty shard
+    '''
+    partition_codes, n_partitions = combine_group_codes([get_column_codes(unmasked_data[column_name_enum]) \
+                                                         for column_name_enum in partition_column_names],
+                                                        len(unmasked_data))
+    partition_row_counts = np.bincount(partition_codes[partition_codes >= 0], minlength=n_partitions)
+    # Largest partitions first, each one to the shard with the fewest rows so far
+    shard_row_counts = [(0, shard_enum) for shard_enum in range(n_shards)]
+    partition_shards = np.zeros(n_partitions + 1, dtype=np.int64)
+    for partition_code_enum in np.argsort(-partition_row_counts, kind='stable'):
+        shard_row_count, shard_enum = heapq.heappop(shard_row_counts)
+        partition_shards[partition_code_enum] = shard_enum
+        heapq.heappush(shard_row_counts, (shard_row_count + partition_row_counts[partition_code_enum], shard_enum))
+    # Code -1 indexes the extra last entry, which stays on the first shard
+    row_shards = partition_shards[partition_codes]
+    return [shard_row_positions for shard_row_positions in \
+            (np.flatnonzero(row_shards == shard_enum) for shard_enum in range(n_shards)) if len(shard_row_positions) > 0]
+
+def compute_masked_cells_parallel(unmasked_data: pd.DataFrame,
+                                  partition_column_names: list[str],
+                                  subcategory_column_names: list[str],
+                                  measure_columns_relation_type: str,
+                                  measure_column_names: list[str],
+                                  msk_min: float,
+                                  msk_max: float,
+                                  max_workers: int,
+                                  masking_report=None,
+                                  complementary_suppression: bool = False,
+                                  reason_codes: np.ndarray | None = None) -> np.ndarray:
+    '''
+    Applying compute_masked_cells on shards of whole partitions in a process pool.
+    Partitions never interact, so the merged result is identical to the serial one.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        partition_column_names (list[str]): partition column names
+        subcategory_column_names (list[str]): subcategory column names
+        measure_columns_relation_type (str): '0' no relation, '1' rate, '2' sum
+        measure_column_names (list[str]): measure column names
+        msk_min (float): lower masking limit
+        msk_max (float): upper masking limit
+        max_workers (int): number of worker processes
+        masking_report (MaskingReport | None, optional): run report, phase times are summed over shards. Defaults to None.
+        complementary_suppression (bool, optional): apply complementary suppression afterwards. Defaults to False.
+        reason_codes (np.ndarray | None, optional): zero uint8 matrix filled with reason codes. Defaults to None.
+
+    Returns:
+        masked_cells (np.ndarray): boolean matrix of masked cells (rows x measure columns)
+    '''
+    masking_arguments = (partition_column_names, subcategory_column_names, measure_columns_relation_type,
+                         measure_column_names, msk_min, msk_max)
+    masking_options = {'complementary_suppression': complementary_suppression}
+    if max_workers <= 1 or len(partition_column_names) == 0:
+        return compute_masked_cells(unmasked_data, *masking_arguments, masking_report=masking_report,
+                                    reason_codes=reason_codes, **masking_options)
+    shard_row_positions_list = get_partition_shards(unmasked_data, partition_column_names, max_workers)
+    if len(shard_row_positions_list) <= 1:
+        return compute_masked_cells(unmasked_data, *masking_arguments, masking_report=masking_report,
+                                    reason_codes=reason_codes, **masking_options)
+
+    # Only the columns used for masking are sent to the workers
+    masking_data = unmasked_data[list(dict.fromkeys(partition_column_names + subcategory_column_names + measure_column_names))]
+    masked_cells = np.zeros((len(unmasked_data), len(measure_column_names)), dtype=bool)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(max_workers, len(shard_row_positions_list))) as executor:
+        shard_futures = {executor.submit(compute_shard_masked_cells, masking_data.iloc[shard_row_positions],
+                                         *masking_arguments, report_flag=masking_report is not None,
+                                         reason_flag=reason_codes is not None, **masking_options): \
+                         shard_row_positions for shard_row_positions in shard_row_positions_list}
+        for shard_future in concurrent.futures.as_completed(shard_futures):
+            shard_masked_cells, phase_records, shard_reason_codes = shard_future.result()
+            masked_cells[shard_futures[shard_future]] = shard_masked_cells
+            if masking_report is not None:
+                masking_report.merge(phase_records)
+            if reason_codes is not None:
+                reason_codes[shard_futures[shard_future]] = shard_reason_codes
+    return masked_cells
+
+def apply_masking_string(unmasked_data: pd.DataFrame,
+                         masked_cells: np.ndarray,
+                         measure_column_names: list[str],
+                         additional_masking_column_names: list[str],
+                         masking_string: str) -> pd.DataFrame:
+    '''
+    Writing the masking string into all masked cells. Additional Masking Columns are masked on every
+    row with at least one masked measure cell. Only measure and Additional Masking Columns are
+    converted into strings, one at a time; the other columns are shared with the unmasked data.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        masked_cells (np.ndarray): boolean matrix of masked measure cells
+        measure_column_names (list[str]): measure column names
+        additional_masking_column_names (list[str]): additional masking column names
+        masking_string (str): string to replace masked values
+
+    Returns:
+        masked_data (pd.DataFrame): masked data
+    '''
+    masked_data = unmasked_data.copy(deep=False)
+    masked_rows = masked_cells.any(axis=1)
+    for column_position, column_name_enum in enumerate(measure_column_names):
+        masked_data[column_name_enum] = unmasked_data[column_name_enum].astype(str) \
+            .mask(masked_cells[:, column_position], masking_string)
+    for column_name_enum in additional_masking_column_names:
+        masked_data[column_name_enum] = unmasked_data[column_name_enum].astype(str).mask(masked_rows, masking_string)
+    return masked_data
@@ -0,0 +1,125 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Group kernels of the vertical masking procedure                                    #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing the kernel of the vertical masking procedure: for rows sorted by group, the upper
+masking limit from which each cell is one of the two masked smallest non-zero values of its group.
+
+The kernel is compiled with Numba when it is installed (pip install numba), and the NumPy path is
+used otherwise; both give the same limits. Numba is imported and the kernel compiled on first use only.
+'''
+# Standard libraries
+import functools
+import numpy as np
+
+
+def get_sorted_vertical_limits_loop(sorted_values: np.ndarray,
+                                    group_offsets: np.ndarray) -> np.ndarray:
+    '''
+    Loop version of get_sorted_vertical_limits_numpy, compiled by load_jit_kernel.
+    Every group and measure column is scanned twice: once for the two smallest values, once to flag them.
+
+    Args:
+        sorted_values (np.ndarray): float matrix of measure values, rows sorted by group
+        group_offsets (np.ndarray): start of each group in sorted_values, plus the end of the last group
+
+    Returns:
+        sorted_limits (np.ndarray): float matrix of the smallest value of the group for its two smallest
+            non-zero values, inf for other cells
+    '''
+    n_rows, n_columns = sorted_values.shape
+    sorted_limits = np.full((n_rows, n_columns), np.inf)
+    for group_enum in range(len(group_offsets) - 1):
+        group_start, group_end = group_offsets[group_enum], group_offsets[group_enum + 1]
+        for column_enum in range(n_columns):
+            n1min, n2min = np.inf, np.inf
+            for row_enum in range(group_start, group_end):
+                cell_value = sorted_values[row_enum, column_enum]
+                # Zero and missing values are skipped, ties count twice
+                if cell_value == 0 or np.isnan(cell_value):
+                    continue
+                if cell_value < n1min:
+                    n1min, n2min = cell_value, n1min
+                elif cell_value < n2min:
+                    n2min = cell_value
+            if n1min == np.inf:
+                continue
+            for row_enum in range(group_start, group_end):
+                cell_value = sorted_values[row_enum, column_enum]
+                if cell_value == n1min or cell_value == n2min:
+                    sorted_limits[row_enum, column_enum] = n1min
+    return sorted_limits
+
+def get_sorted_vertical_limits_numpy(sorted_values: np.ndarray,
+                                     group_offsets: np.ndarray) -> np.ndarray:
+    '''
+    Upper masking limit from which each cell is masked by the vertical masking procedure, for rows sorted
+    by group: the two smallest non-zero values of a group and measure column are masked once the smallest
+    one is within the limit. Ties count twice, i.e. the second smallest of (5, 5, 7) is 5.
+
+    Args:
+        sorted_values (np.ndarray): float matrix of measure values, rows sorted by group
+        group_offsets (np.ndarray): start of each group in sorted_values, plus the end of the last group.
+            Groups are not empty.
+
+    Returns:
+        sorted_limits (np.ndarray): float matrix of the smallest value of the group for its two smallest
+            non-zero values, inf for other cells
+    '''
+    if len(group_offsets) < 2:
+        return np.full(sorted_values.shape, np.inf)
+    group_starts = group_offsets[:-1]
+    group_lengths = np.diff(group_offsets)
+    valid_values = np.where((sorted_values != 0) & ~np.isnan(sorted_values), sorted_values, np.inf)
+    n1min = np.repeat(np.minimum.reduceat(valid_values, group_starts, axis=0), group_lengths, axis=0)
+    n1min_cells = valid_values == n1min
+    n1min_counts = np.repeat(np.add.reduceat(n1min_cells, group_starts, axis=0), group_lengths, axis=0)
+    n2min = np.repeat(np.minimum.reduceat(np.where(n1min_cells, np.inf, valid_values), group_starts, axis=0),
+                      group_lengths, axis=0)
+    smallest_cells = n1min_cells | ((valid_values == n2min) & (n1min_counts == 1))
+    return np.where(smallest_cells & (valid_values != np.inf), n1min, np.inf)
+
+@functools.lru_cache(maxsize=None)
+def load_jit_kernel():
+    '''
+    Compiling get_sorted_vertical_limits_loop with Numba, once per process
+
+    Returns:
+        jit_kernel (Callable | None): compiled kernel, None if Numba is not installed
+    '''
+    try:
+        import numba
+    except ImportError:
+        return None
+    return numba.njit(cache=True, nogil=True)(get_sorted_vertical_limits_loop)
+
+def get_sorted_vertical_limits(sorted_values: np.ndarray,
+                               group_offsets: np.ndarray,
+                               use_jit: bool | None = None) -> np.ndarray:
+    '''
+    Upper masking limit from which each cell is masked by the vertical masking procedure, for rows sorted
+    by group (see get_sorted_vertical_limits_numpy), with the compiled kernel when available
+
+    Args:
+        sorted_values (np.ndarray): float matrix of measure values, rows sorted by group
+        group_offsets (np.ndarray): start of each group in sorted_values, plus the end of the last group
+        use_jit (bool | None, optional): True for the compiled kernel, False for NumPy.
+            Defaults to None (compiled kernel if Numba is installed).
+
+    Returns:
+        sorted_limits (np.ndarray): float matrix of the smallest value of the group for its two smallest
+            non-zero values, inf for other cells
+    '''
+    jit_kernel = load_jit_kernel() if use_jit is not False else None
+    if use_jit and jit_kernel is None:
+        raise ImportError('The compiled vertical masking kernel requires the numba package')
+    if jit_kernel is None:
+        return get_sorted_vertical_limits_numpy(sorted_values, group_offsets)
+    return jit_kernel(np.ascontiguousarray(sorted_values, dtype=np.float64), group_offsets.astype(np.int64))
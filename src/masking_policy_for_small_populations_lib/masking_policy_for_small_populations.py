@@ -12,58 +12,130 @@
 
 '''
 Module providing masking capabilities for a chosen data file.
+
+pandas, numpy and tkinter are imported on first use, so that importing this module stays fast
+for headless jobs that never open the file dialog.
 '''
+from __future__ import annotations
+
 # Standard libraries
-import heapq
 import os
-import itertools
-from tkinter import Tk
-from tkinter.filedialog import askopenfilename
-import pandas as pd
-import numpy as np
+from typing import TYPE_CHECKING
 
 # User-defined libraries
 from  terminal_interactions import InputClass, OutputClass
+from excel_io import read_excel_low_memory, write_excel_low_memory
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from masking_report import MaskingReport
+    from masking_cache import MaskingCache
+    from masking_audit import MaskingAudit
 
 class GlobalMaskingPol:
     '''
-        Class to define current masking limits
+        Class to define current masking limits, and whether masked values must also be
+        protected from recovery by subtraction (complementary suppression)
     '''
-    def __init__(self) -> None:
-        self.gmp_msk_max = 9
-        self.gmp_msk_min = 1
+    def __init__(self, gmp_msk_min: float = 1, gmp_msk_max: float = 9, gmp_complementary: bool = False) -> None:
+        self.gmp_msk_max = gmp_msk_max
+        self.gmp_msk_min = gmp_msk_min
+        self.gmp_complementary = gmp_complementary
 
 
-def import_unmasked_data(file_path:str = None) -> tuple[str, pd.DataFrame]:
+def compact_unmasked_data(unmasked_data: pd.DataFrame,
+                          categorical_column_names: list[str] | None = None) -> pd.DataFrame:
     '''
-    Importing unmasked data from a CSV or XLSX file into a Pandas dataframe
+    Encoding repeated text columns as categoricals and narrowing numeric columns, so that grouping works
+    on small integer codes and the data takes several times less memory. The masked output is unchanged:
+    values are converted to text the same way, and only integer values that fit exactly are narrowed.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        categorical_column_names (list[str] | None, optional): columns to encode, e.g. partition and subcategory
+            columns. Defaults to None (text columns with at most half as many distinct values as rows).
+
+    Returns:
+        unmasked_data (pd.DataFrame): compacted data
+    '''
+    import numpy as np
+    import pandas as pd
+    compact_columns = {}
+    for column_name_enum in unmasked_data.columns:
+        column_values = unmasked_data[column_name_enum]
+        if isinstance(column_values.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_object_dtype(column_values.dtype) or pd.api.types.is_string_dtype(column_values.dtype):
+            if categorical_column_names is None and column_values.nunique(dropna=False) > len(column_values) // 2:
+                continue
+            if categorical_column_names is None or column_name_enum in categorical_column_names:
+                compact_columns[column_name_enum] = column_values.astype('category')
+        elif pd.api.types.is_integer_dtype(column_values.dtype) and not pd.api.types.is_bool_dtype(column_values.dtype):
+            compact_columns[column_name_enum] = pd.to_numeric(column_values, downcast='integer')
+        elif pd.api.types.is_float_dtype(column_values.dtype) and column_values.dtype.itemsize > 4:
+            # Counts with missing values are read as floats; whole numbers below 2^24 are exact in float32
+            float_values = column_values.to_numpy(dtype=np.float64)
+            finite_values = float_values[np.isfinite(float_values)]
+            if np.all(finite_values == np.round(finite_values)) and np.all(np.abs(finite_values) < 2**24):
+                compact_columns[column_name_enum] = column_values.astype(np.float32)
+    if len(compact_columns) > 0:
+        unmasked_data = unmasked_data.copy(deep=False)
+        for column_name_enum, column_values in compact_columns.items():
+            unmasked_data[column_name_enum] = column_values
+    return unmasked_data
+
+def import_unmasked_data(file_path:str = None,
+                         column_names: list[str] | None = None,
+                         compact_flag: bool = False,
+                         categorical_column_names: list[str] | None = None) -> tuple[str, pd.DataFrame]:
+    '''
+    Importing unmasked data from a CSV, XLSX, Parquet or Arrow (Feather) file into a Pandas dataframe
 
     Args:
         file_path (str): full path to file
-        unmasked_data (pd.DataFrame): unmasked data from file_path
+        column_names (list[str] | None, optional): columns to read, all columns if None. Defaults to None.
+        compact_flag (bool, optional): encode text columns as categoricals and narrow numeric columns
+            (see compact_unmasked_data). Defaults to False.
+        categorical_column_names (list[str] | None, optional): text columns to encode when compacting. Defaults to None.
 
     Returns:
+        file_path (str): full path to file
         unmasked_data (pd.DataFrame): unmasked data
     '''   
+    import pandas as pd
     if file_path is None:
+        # GUI-only dependency, not available on every headless node
+        from tkinter import Tk
+        from tkinter.filedialog import askopenfilename
         OutputClass.process('Please select a source file')
         Tk().withdraw()
-        file_path = askopenfilename(filetypes=[('Choose a CVS or XLSX File', '*.csv *.xlsx')])
+        file_path = askopenfilename(filetypes=[('Choose a CVS, XLSX, Parquet or Arrow File',
+                                                '*.csv *.xlsx *.parquet *.feather *.arrow')])
     if os.path.splitext(file_path)[1] in ['.csv', '.CSV']:
-        unmasked_data: pd.DataFrame = pd.read_csv(file_path)
+        unmasked_data: pd.DataFrame = pd.read_csv(file_path, usecols=column_names)
     if os.path.splitext(file_path)[1] in ['.xlsx', '.XLSX']:
-        unmasked_data: pd.DataFrame = pd.read_excel(file_path)
+        unmasked_data: pd.DataFrame = read_excel_low_memory(file_path, column_names=column_names)
+    if os.path.splitext(file_path)[1] in ['.parquet', '.PARQUET']:
+        unmasked_data: pd.DataFrame = pd.read_parquet(file_path, columns=column_names)
+    if os.path.splitext(file_path)[1] in ['.feather', '.FEATHER', '.arrow', '.ARROW']:
+        unmasked_data: pd.DataFrame = pd.read_feather(file_path, columns=column_names)
+    if column_names is not None:
+        unmasked_data = unmasked_data[column_names]
+    if compact_flag:
+        unmasked_data = compact_unmasked_data(unmasked_data, categorical_column_names)
 
     return file_path, unmasked_data    
 
-def export_masked_data(masked_data: pd.DataFrame, input_file_path: str) -> None:
+def export_masked_data(masked_data: pd.DataFrame, input_file_path: str) -> str:
     '''
-    Exporting masked data into a CSV or XLSX file
+    Exporting masked data into a CSV, XLSX, Parquet or Arrow (Feather) file
 
     Args:
         masked_data (pd.DataFrame): final masked data
-        dir_path (str): directory path to save masked file
-        file_name (str): file name for masked data
+        input_file_path (str): full path to unmasked file, the masked file is saved next to it
+
+    Returns:
+        output_file_path (str): full path to masked file
     '''
     OutputClass.process(f'Generating {os.path.basename(input_file_path)}')
     if os.path.splitext(input_file_path)[1] in ['.csv', '.CSV']:
@@ -71,10 +143,15 @@ def export_masked_data(masked_data: pd.DataFrame, input_file_path: str) -> None:
         masked_data.to_csv(output_file_path, index=False, header=True, mode='w')
     if os.path.splitext(input_file_path)[1] in ['.xlsx', '.XLSX']:
         output_file_path = f'{os.path.splitext(input_file_path)[0]}__Masked.xlsx'
-        writer = pd.ExcelWriter(output_file_path, engine='xlsxwriter')
-        masked_data.to_excel(writer, index=False)
-        writer.close()
+        write_excel_low_memory(masked_data, output_file_path)
+    if os.path.splitext(input_file_path)[1] in ['.parquet', '.PARQUET']:
+        output_file_path = f'{os.path.splitext(input_file_path)[0]}_Masked.parquet'
+        masked_data.to_parquet(output_file_path, index=False)
+    if os.path.splitext(input_file_path)[1] in ['.feather', '.FEATHER', '.arrow', '.ARROW']:
+        output_file_path = f'{os.path.splitext(input_file_path)[0]}_Masked{os.path.splitext(input_file_path)[1]}'
+        masked_data.reset_index(drop=True).to_feather(output_file_path)
     OutputClass.success(f'{output_file_path} is generated!')
+    return output_file_path
 
 def get_partition_column_names(data_column_info_dict: dict) -> list[str]:
     '''
@@ -286,7 +363,12 @@ def apply_full_masking(unmasked_data: pd.DataFrame,
                        measure_columns_relation_type: str | None = None,
                        measure_column_numbers: list | None = None,
                        additional_masking_column_flag: bool = False,
-                       additional_masking_column_numbers: list | None = None
+                       additional_masking_column_numbers: list | None = None,
+                       max_workers: int | None = None,
+                       masking_policy: GlobalMaskingPol | None = None,
+                       masking_report: MaskingReport | None = None,
+                       masking_cache: MaskingCache | None = None,
+                       masking_audit: MaskingAudit | None = None
                        ) -> dict:
     '''
     Main function to determine indices to be masked.
@@ -300,11 +382,19 @@ def apply_full_masking(unmasked_data: pd.DataFrame,
         measure_column_numbers (list | None, optional): measure columns (see User_Guide). Defaults to None.
         additional_masking_column_flag (bool, optional): boolen for additional columns to be masked. Defaults to False.
         additional_masking_column_numbers (list | None, optional): additional columns to be masked (see User_Guide). Defaults to None.
+        max_workers (int | None, optional): number of processes to mask partitions in parallel. Defaults to None (serial).
+        masking_policy (GlobalMaskingPol | None, optional): masking limits. Defaults to None (GlobalMaskingPol()).
+        masking_report (MaskingReport | None, optional): run report timing each phase (see masking_report). Defaults to None.
+        masking_cache (MaskingCache | None, optional): on-disk cache of masked cells (see masking_cache). Defaults to None.
+        masking_audit (MaskingAudit | None, optional): records the reason each cell is masked for (see masking_audit).
+            Cached masked cells have no reasons, so the cache is only written to. Defaults to None.
 
     Returns:
         
     '''
 
+    from masking_engine import compute_masked_cells, compute_masked_cells_parallel, apply_masking_string
+
     # Collecting column numbers and names
     data_column_info_dict:dict[str:str] = {}
     column_number_enum = 1
@@ -362,116 +452,50 @@ def apply_full_masking(unmasked_data: pd.DataFrame,
 
 
     # Three set of masking condition will be evaluated.
-    # Distinct index and column numbers will be collected into a dict.
-    masked_cell_index:dict[int, list] = {}
-    # 1) Simple masking procedure
-    for row_index_enum in unmasked_data.index.values:
-        masked_cell_index[row_index_enum] = []
-        for column_name_enum in measure_column_names:
-            temp_value = unmasked_data.loc[row_index_enum, column_name_enum]
-            if temp_value not in [None, 'nan'] and \
-                temp_value >= GlobalMaskingPol().gmp_msk_min \
-                and temp_value <= GlobalMaskingPol().gmp_msk_max:
-                masked_cell_index[row_index_enum].append(column_name_enum)
- 
-    # 2) Vertical masking procedure for subcategories
-    # This routine requires at least one Subcategory Column
-    if len(subcategory_column_names) >= 1:
-        partition_column_values_comb = list(unmasked_data[partition_column_names].drop_duplicates().reset_index(drop = True).values)
-        subcategory_column_names_subset_comb = list(itertools.combinations(subcategory_column_names, len(subcategory_column_names)-1))
-        for partition_column_values in partition_column_values_comb:
-            partioned_data= unmasked_data.copy()
-            for partition_column_names_enum, partition_column_names_value in enumerate(partition_column_names):
-                partioned_data = partioned_data.loc[partioned_data[partition_column_names_value] == partition_column_values[partition_column_names_enum]]          
-            for subcategory_column_names_subset in subcategory_column_names_subset_comb:
-                subcategory_column_values_subset_comb = list(unmasked_data[list(subcategory_column_names_subset)].drop_duplicates().reset_index(drop = True).values)
-                for subcategoryu_column_values_subset in subcategory_column_values_subset_comb:
-                    partioned_subcategoried_data = partioned_data.copy()
-                    for subcategory_column_names_subset_enum, subcategory_column_names_subset_value in enumerate(subcategory_column_names_subset):
-                        partioned_subcategoried_data = partioned_subcategoried_data.loc[partioned_subcategoried_data[subcategory_column_names_subset_value] == subcategoryu_column_values_subset[subcategory_column_names_subset_enum]]
-                    temp_index_list = partioned_subcategoried_data.index.values
-                    for column_name_enum in measure_column_names:
-                        temp_cond = True
-                        while temp_cond:
-                            try:
-                                temp_value_list = partioned_subcategoried_data[column_name_enum].values
-                                n2mins = heapq.nsmallest(2, [i for i in temp_value_list if i != 0])
-                                n1min= min(n2mins)
-                                '''
-                                temp_hist_list = list(itertools.chain.from_iterable([masked_cell_index.get(key) \
-                                                                                            for key in partioned_subcategoried_data[column_name_enum].index]))
-                                for temp_value_enum, temp_value in enumerate(temp_value_list):
-                                    if column_name_enum in temp_hist_list and temp_value == n1min:
-                                        masked_cell_index[temp_index_list[temp_value_enum]].append(column_name_enum)
-                                '''                                                           
-                                if n1min <= GlobalMaskingPol().gmp_msk_max:
-                                    for temp_value_enum, temp_value in enumerate(temp_value_list):
-                                        if n1min <= GlobalMaskingPol().gmp_msk_max:
-                                            if temp_value in n2mins \
-                                                and column_name_enum not in masked_cell_index[temp_index_list[temp_value_enum]]:
-                                                masked_cell_index[temp_index_list[temp_value_enum]].append(column_name_enum)
-                                break
-                            except ValueError:
-                                temp_cond = False
-                            except TypeError:
-                                temp_cond = False
-        
-    # 3) Horizontal masking procedure for measure column relations
-    if measure_columns_relation_type == '1':
-        for row_index_enum in unmasked_data.index.values:
-            if len(set(measure_column_names).intersection(masked_cell_index[row_index_enum])) > 0:
-                masked_cell_index[row_index_enum] += measure_column_names
-            masked_cell_index[row_index_enum] = np.unique(np.array(masked_cell_index[row_index_enum])).tolist()
-            temp_value_list =[]
-            for column_name_enum in measure_column_names:
-                if unmasked_data.loc[row_index_enum, column_name_enum] not in [None, 'nan']:
-                    temp_value_list.append(unmasked_data.loc[row_index_enum, measure_column_names])
-            if len(temp_value_list) >= 1:
-                temp_cond = True
-                while temp_cond:
-                    try:                    
-                        n1min = min(temp_value_list)
-                        if n1min <= GlobalMaskingPol().gmp_msk_max and n1min >= GlobalMaskingPol().gmp_msk_min:
-                            for column_name_enum in measure_column_names:
-                                if column_name_enum not in masked_cell_index[row_index_enum]:
-                                    masked_cell_index[row_index_enum].append(column_name_enum)
-                        break
-                    except ValueError:
-                        temp_cond = False
-                    except TypeError:
-                        temp_cond = False
-
-    if measure_columns_relation_type == '2':
-        for row_index_enum in unmasked_data.index.values:
-            if measure_column_names[0] in masked_cell_index[row_index_enum]:
-                masked_cell_index[row_index_enum] += measure_column_names
-            else:
-                temp_value_list = []
-                for column_name_enum in measure_column_names:
-                    if unmasked_data.loc[row_index_enum, column_name_enum] not in [None, 'nan']:
-                        temp_value_list.append(unmasked_data.loc[row_index_enum, column_name_enum])
-                if len(temp_value_list) >= 2:
-                    n2mins = heapq.nsmallest(2, [i for i in temp_value_list if i != 0])
-                    if len(n2mins) == 2:
-                        n1min= min(n2mins)
-                        if len(set(measure_column_names).intersection(masked_cell_index[row_index_enum])) > 0:
-                            for column_enum in measure_column_names:
-                                if unmasked_data.loc[row_index_enum, column_enum] == n1min:
-                                    masked_cell_index[row_index_enum].append(column_enum)
-                        if n1min <= GlobalMaskingPol().gmp_msk_max: 
-                            for column_enum in measure_column_names:
-                                if unmasked_data.loc[row_index_enum, column_enum] in n2mins:
-                                    masked_cell_index[row_index_enum].append(column_enum)
-            masked_cell_index[row_index_enum] = np.unique(np.array(masked_cell_index[row_index_enum])).tolist()
-                            
-                        
-    unmasked_data = unmasked_data.astype(str)
-    for index_enum, column_list_enum in masked_cell_index.items():
-        if len(column_list_enum) > 0:
-            if len(additional_masking_column_names) > 0:
-                column_list_enum += additional_masking_column_names
-            unmasked_data.loc[index_enum, list(set(column_list_enum))] = masking_string
-    return unmasked_data
+    # Masked cells are collected into a boolean matrix (rows x measure columns).
+    if masking_policy is None:
+        masking_policy = GlobalMaskingPol()
+    if masking_report is not None:
+        masking_report.start(rows=len(unmasked_data), measure_columns_relation_type=measure_columns_relation_type,
+                             measure_columns=len(measure_column_names), max_workers=max_workers,
+                             gmp_msk_min=masking_policy.gmp_msk_min, gmp_msk_max=masking_policy.gmp_msk_max)
+    masked_cells = None
+    reason_codes = None
+    if masking_audit is not None:
+        reason_codes = masking_audit.start(unmasked_data, partition_column_names, subcategory_column_names,
+                                           measure_column_names, additional_masking_column_names)
+    if masking_cache is not None:
+        cache_key = masking_cache.get_key(unmasked_data, partition_column_names, subcategory_column_names,
+                                          measure_columns_relation_type, measure_column_names, masking_policy)
+        if masking_audit is None:
+            masked_cells = masking_cache.get(cache_key, (len(unmasked_data), len(measure_column_names)))
+        if masking_report is not None:
+            masking_report.run_info['cache'] = 'miss' if masked_cells is None else 'hit'
+    if masked_cells is None:
+        if max_workers is None:
+            masked_cells = compute_masked_cells(unmasked_data, partition_column_names, subcategory_column_names,
+                                                measure_columns_relation_type, measure_column_names,
+                                                masking_policy.gmp_msk_min, masking_policy.gmp_msk_max,
+                                                masking_report, masking_policy.gmp_complementary, reason_codes)
+        else:
+            masked_cells = compute_masked_cells_parallel(unmasked_data, partition_column_names, subcategory_column_names,
+                                                         measure_columns_relation_type, measure_column_names,
+                                                         masking_policy.gmp_msk_min, masking_policy.gmp_msk_max,
+                                                         max_workers, masking_report, masking_policy.gmp_complementary,
+                                                         reason_codes)
+        if masking_cache is not None:
+            masking_cache.put(cache_key, masked_cells)
+
+    if masking_report is None:
+        return apply_masking_string(unmasked_data, masked_cells, measure_column_names,
+                                    additional_masking_column_names, masking_string)
+    with masking_report.phase('masking_string', rows=len(unmasked_data)) as phase_record:
+        masked_data = apply_masking_string(unmasked_data, masked_cells, measure_column_names,
+                                           additional_masking_column_names, masking_string)
+        phase_record['cells_masked'] = int(masked_cells.sum()) \
+            + int(masked_cells.any(axis=1).sum()) * len(additional_masking_column_names)
+    masking_report.finish()
+    return masked_data
 
 
 def main_loop() -> None:
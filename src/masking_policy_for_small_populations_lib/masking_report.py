@@ -0,0 +1,180 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Optional per-phase instrumentation of the masking run                              #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing an opt-in run report of apply_full_masking.
+
+Each phase (simple, vertical, horizontal, masking_string) records its wall time, the process peak
+resident memory so far, rows and groups processed, and the number of cells it masked. The peak
+memory allocated within each phase is recorded with tracemalloc when track_memory is set; it slows
+down phases creating many Python objects, masking_string above all, so it is off by default. Hooks are called when a phase
+starts and ends, e.g. to feed a progress display or a metrics system. Without a report, the
+masking routine only pays for a few "is None" checks.
+
+    masking_report = MaskingReport(hooks=[lambda event, phase: print(event, phase['name'])])
+    masked_data = apply_full_masking(unmasked_data, ..., masking_report=masking_report)
+    masking_report.write_json('run_report.json')
+'''
+from __future__ import annotations
+
+# Standard libraries
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable, Iterator
+try:
+    import resource
+except ModuleNotFoundError:
+    # Not available on Windows, the peak resident memory is not reported there
+    resource = None
+
+
+def get_peak_rss_bytes() -> int | None:
+    '''
+    Peak resident memory of the process so far
+
+    Returns:
+        peak_rss_bytes (int | None): peak resident memory, None where not available
+    '''
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+class MaskingReport:
+    '''
+        Class to collect the timings and counts of a masking run
+    '''
+
+    def __init__(self,
+                 hooks: list[Callable[[str, dict], None]] | None = None,
+                 track_memory: bool = False) -> None:
+        '''
+        Args:
+            hooks (list[Callable[[str, dict], None]] | None, optional): called with ('start' or 'end', phase record). Defaults to None.
+            track_memory (bool, optional): record the peak memory of each phase with tracemalloc, which slows allocations down. Defaults to False.
+        '''
+        self.hooks = list(hooks or [])
+        self.track_memory = track_memory
+        self.run_info: dict = {}
+        self.phases: list[dict] = []
+        self.start_time: float | None = None
+        self.wall_time_s: float = 0.0
+        self.tracemalloc_started = False
+
+    def start(self, **run_info) -> None:
+        '''
+        Starting the run, with information about it (rows, relation type, ...)
+
+        Args:
+            run_info: entries added to the report
+        '''
+        self.run_info.update(run_info)
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracemalloc_started = True
+        self.start_time = time.perf_counter()
+
+    def finish(self) -> None:
+        '''
+        Finishing the run
+        '''
+        if self.start_time is not None:
+            self.wall_time_s += time.perf_counter() - self.start_time
+            self.start_time = None
+        if self.tracemalloc_started:
+            tracemalloc.stop()
+            self.tracemalloc_started = False
+
+    @contextlib.contextmanager
+    def phase(self, phase_name: str, **counts) -> Iterator[dict]:
+        '''
+        Timing a phase. Counts can be given here or set on the yielded phase record.
+
+        Args:
+            phase_name (str): phase name
+            counts: counts of the phase, e.g. rows=1000
+
+        Returns:
+            phase_record (Iterator[dict]): record of the phase
+        '''
+        phase_record = {'name': phase_name, 'wall_time_s': 0.0, 'peak_memory_bytes': None, 'peak_rss_bytes': None,
+                        'rows': None, 'groups': None, 'cells_masked': None}
+        phase_record.update(counts)
+        self.phases.append(phase_record)
+        for hook_enum in self.hooks:
+            hook_enum('start', phase_record)
+        memory_start = 0
+        if self.track_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        start_time = time.perf_counter()
+        try:
+            yield phase_record
+        finally:
+            phase_record['wall_time_s'] = time.perf_counter() - start_time
+            if self.track_memory and tracemalloc.is_tracing():
+                phase_record['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1] - memory_start
+            phase_record['peak_rss_bytes'] = get_peak_rss_bytes()
+            for hook_enum in self.hooks:
+                hook_enum('end', phase_record)
+
+    def merge(self, phase_records: list[dict]) -> None:
+        '''
+        Adding phase records of another run, e.g. a shard masked in a worker process.
+        Times and counts of phases with the same name are summed, peak memory is the maximum.
+
+        Args:
+            phase_records (list[dict]): phase records
+        '''
+        for phase_record in phase_records:
+            own_records = [own_record for own_record in self.phases if own_record['name'] == phase_record['name']]
+            if len(own_records) == 0:
+                self.phases.append(dict(phase_record))
+                continue
+            own_record = own_records[0]
+            for key_enum in ['wall_time_s', 'rows', 'groups', 'cells_masked']:
+                if phase_record[key_enum] is not None:
+                    own_record[key_enum] = (own_record[key_enum] or 0) + phase_record[key_enum]
+            for key_enum in ['peak_memory_bytes', 'peak_rss_bytes']:
+                if phase_record[key_enum] is not None:
+                    own_record[key_enum] = max(own_record[key_enum] or 0, phase_record[key_enum])
+
+    def to_dict(self) -> dict:
+        '''
+        Collecting the report into a dict
+
+        Returns:
+            report_dict (dict): run information, totals and phase records
+        '''
+        peak_memory_values = [phase_record['peak_memory_bytes'] for phase_record in self.phases \
+                              if phase_record['peak_memory_bytes'] is not None]
+        peak_rss_values = [phase_record['peak_rss_bytes'] for phase_record in self.phases \
+                           if phase_record['peak_rss_bytes'] is not None]
+        return {**self.run_info,
+                'wall_time_s': self.wall_time_s,
+                'peak_memory_bytes': max(peak_memory_values) if peak_memory_values else None,
+                'peak_rss_bytes': max(peak_rss_values) if peak_rss_values else None,
+                'cells_masked': sum(phase_record['cells_masked'] or 0 for phase_record in self.phases \
+                                    if phase_record['name'] != 'masking_string'),
+                'phases': self.phases}
+
+    def write_json(self, report_file_path: str) -> None:
+        '''
+        Writing the report into a JSON file
+
+        Args:
+            report_file_path (str): full path to report file
+        '''
+        with open(report_file_path, 'w', encoding='utf-8') as report_file:
+            json.dump(self.to_dict(), report_file, indent=4)
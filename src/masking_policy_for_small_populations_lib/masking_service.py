@@ -0,0 +1,490 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Resident local HTTP service masking many small tables                              #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing a long-lived masking service on localhost, so that many small tables do not each
+pay for starting Python and importing pandas. A bounded pool of worker processes keeps the masking
+engine imported; requests above max_workers + max_pending at a time are rejected with 503, before
+their body is read, and bodies above max_body_bytes with 413.
+
+    python ./src/masking_policy_for_small_populations_lib/masking_service.py --spec spec.json --port 8765 --max-workers 4
+
+Endpoints:
+    POST /mask                masks the request body, a CSV file (text/csv) or an Arrow IPC stream
+                              (application/vnd.apache.arrow.stream), and returns it in the same format.
+                              With ?output=cells, returns the table of masked cells (see masking_audit) as CSV.
+                              The masking spec is the X-Masking-Spec header (JSON), or the --spec of the service.
+    POST /mask-file           masks a file under the --file-root directory, given as JSON
+                              {"input_file_path": "...", "spec": {...}}, and returns {"output_file_path": "..."}.
+                              Without --file-root, files cannot be masked and 403 is returned.
+    GET  /status              returns request counts and latencies as JSON.
+
+Invalid specs and requests get 400, unexpected errors 500. Every response has an X-Masking-Latency-Ms
+header, and every request is logged with its latency.
+'''
+from __future__ import annotations
+
+# Standard libraries
+import argparse
+import concurrent.futures
+import io
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# User-defined libraries
+from  terminal_interactions import OutputClass
+from batch_masking import MaskingSpec, MaskingSpecError, check_unmasked_rows, load_masking_spec
+
+CSV_CONTENT_TYPE = 'text/csv'
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+JSON_CONTENT_TYPE = 'application/json'
+
+
+def warm_up_worker() -> None:
+    '''
+    Importing the masking engine once per worker process
+    '''
+    import numpy
+    import pandas
+    import masking_engine
+    import masking_policy_for_small_populations
+
+def mask_payload(payload: bytes, content_type: str, masking_spec: MaskingSpec, output: str = 'data') -> bytes:
+    '''
+    Masking a CSV file or an Arrow IPC stream held in memory
+
+    Args:
+        payload (bytes): CSV file or Arrow IPC stream
+        content_type (str): CSV_CONTENT_TYPE or ARROW_CONTENT_TYPE
+        masking_spec (MaskingSpec): masking spec
+        output (str, optional): 'data' for the masked data, 'cells' for the table of masked cells. Defaults to 'data'.
+
+    Returns:
+        masked_payload (bytes): masked data in the format of the payload, or table of masked cells as CSV
+    '''
+    import pandas as pd
+    import masking_policy_for_small_populations
+    from masking_audit import MaskingAudit
+    try:
+        if content_type == ARROW_CONTENT_TYPE:
+            import pyarrow
+            import pyarrow.ipc
+            with pyarrow.ipc.open_stream(payload) as arrow_reader:
+                unmasked_data = arrow_reader.read_all().to_pandas()
+        else:
+            unmasked_data = pd.read_csv(io.BytesIO(payload))
+    # Parser errors of pandas and pyarrow, and undecodable text, are all ValueError
+    except ValueError as value_error:
+        raise MaskingSpecError(f'The request body is not a valid {content_type} table: {value_error}') from value_error
+    check_unmasked_rows(unmasked_data, 'The request body')
+    masking_audit = MaskingAudit() if output == 'cells' else None
+    masked_data = masking_policy_for_small_populations.apply_full_masking(
+        unmasked_data, masking_audit=masking_audit, **masking_spec.masking_arguments(unmasked_data.columns))
+    if masking_audit is not None:
+        return masking_audit.to_frame().to_csv(index=False).encode('utf-8')
+    if content_type == ARROW_CONTENT_TYPE:
+        masked_table = pyarrow.Table.from_pandas(masked_data, preserve_index=False)
+        arrow_sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(arrow_sink, masked_table.schema) as arrow_writer:
+            arrow_writer.write_table(masked_table)
+        return arrow_sink.getvalue().to_pybytes()
+    return masked_data.to_csv(index=False).encode('utf-8')
+
+def mask_local_file(input_file_path: str, masking_spec: MaskingSpec) -> str:
+    '''
+    Masking a file of the local file system (see batch_masking.mask_file)
+
+    Args:
+        input_file_path (str): full path to file
+        masking_spec (MaskingSpec): masking spec
+
+    Returns:
+        output_file_path (str): full path to masked file
+    '''
+    import batch_masking
+    return batch_masking.mask_file(input_file_path, masking_spec)
+
+def load_json(json_text: str | bytes):
+    '''
+    Reading the JSON of a request
+
+    Args:
+        json_text (str | bytes): JSON text
+
+    Returns:
+        json_value (Any): JSON value
+
+    Raises:
+        MaskingSpecError: the text is not valid JSON
+    '''
+    try:
+        return json.loads(json_text)
+    except ValueError as value_error:
+        raise MaskingSpecError(f'Invalid JSON in the request: {value_error}') from value_error
+
+def get_json_response(status_code: int, response_dict: dict) -> tuple[int, bytes, str]:
+    '''
+    JSON response of a request
+
+    Args:
+        status_code (int): HTTP status code
+        response_dict (dict): response entries
+
+    Returns:
+        status_code (int): HTTP status code
+        response_payload (bytes): response body
+        content_type (str): content type of the body
+    '''
+    return status_code, json.dumps(response_dict).encode('utf-8'), JSON_CONTENT_TYPE
+
+
+class ServiceBusyError(Exception):
+    '''
+        Raised when every worker is busy and the pending request queue is full
+    '''
+
+
+class MaskingService:
+    '''
+        Class to run masking jobs in a bounded pool of warm worker processes and to keep request statistics
+    '''
+
+    def __init__(self,
+                 masking_spec: MaskingSpec | None = None,
+                 max_workers: int = 2,
+                 max_pending: int = 8,
+                 max_body_bytes: int = 256 * 2**20,
+                 file_root_path: str | None = None) -> None:
+        '''
+        Args:
+            masking_spec (MaskingSpec | None, optional): spec of requests without one. Defaults to None.
+            max_workers (int, optional): number of worker processes. Defaults to 2.
+            max_pending (int, optional): number of requests waiting for a worker before 503 is returned. Defaults to 8.
+            max_body_bytes (int, optional): size limit of request bodies. Defaults to 256 MiB.
+            file_root_path (str | None, optional): directory of the files /mask-file may mask and write next to.
+                Defaults to None (/mask-file disabled).
+        '''
+        self.masking_spec = masking_spec
+        self.max_workers = max_workers
+        self.max_body_bytes = max_body_bytes
+        self.file_root_path = None if file_root_path is None else os.path.realpath(file_root_path)
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=warm_up_worker)
+        self.executor_lock = threading.Lock()
+        self.request_slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self.statistics_lock = threading.Lock()
+        self.statistics = {'requests': 0, 'failed': 0, 'rejected': 0, 'latency_ms_total': 0.0,
+                           'latency_ms_max': 0.0, 'latency_ms_last': None}
+
+    def acquire_slot(self) -> None:
+        '''
+        Taking a request slot, to be released with release_slot once the request is answered
+
+        Raises:
+            ServiceBusyError: every request slot is taken
+        '''
+        if not self.request_slots.acquire(blocking=False):
+            raise ServiceBusyError('Every worker is busy, try again later')
+
+    def release_slot(self) -> None:
+        '''
+        Releasing a request slot taken with acquire_slot
+        '''
+        self.request_slots.release()
+
+    def run(self, function, *args):
+        '''
+        Running a job in the worker pool and waiting for its result. If a worker process died, the pool is
+        replaced by a new one for the next jobs and the error is raised.
+
+        Args:
+            function (Callable): module-level function
+            args: arguments of the function
+
+        Returns:
+            result: result of the function
+        '''
+        executor = self.executor
+        try:
+            return executor.submit(function, *args).result()
+        except concurrent.futures.process.BrokenProcessPool:
+            with self.executor_lock:
+                # Jobs failing together on the same broken pool replace it once
+                if self.executor is executor:
+                    OutputClass.warning('A worker process died, starting new worker processes')
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers,
+                                                                           initializer=warm_up_worker)
+            raise
+
+    def get_local_file_path(self, input_file_path: str) -> str:
+        '''
+        Checking that a file requested through /mask-file is under the file root of the service
+
+        Args:
+            input_file_path (str): path to file, relative paths are taken from the file root
+
+        Returns:
+            input_file_path (str): full path to file, symbolic links resolved
+
+        Raises:
+            PermissionError: the service has no file root, or the file is not under it
+        '''
+        if self.file_root_path is None:
+            raise PermissionError('Masking local files is disabled, the service was started without --file-root')
+        input_file_path = os.path.realpath(os.path.join(self.file_root_path, input_file_path))
+        if os.path.commonpath([self.file_root_path, input_file_path]) != self.file_root_path:
+            raise PermissionError(f'{input_file_path} is not under the file root of the service')
+        return input_file_path
+
+    def record(self, status_code: int, latency_ms: float) -> None:
+        '''
+        Adding a request to the statistics
+
+        Args:
+            status_code (int): HTTP status code of the response
+            latency_ms (float): time from the request to its response in milliseconds
+        '''
+        with self.statistics_lock:
+            self.statistics['requests'] += 1
+            self.statistics['failed'] += int(status_code >= 400 and status_code != 503)
+            self.statistics['rejected'] += int(status_code == 503)
+            self.statistics['latency_ms_total'] += latency_ms
+            self.statistics['latency_ms_max'] = max(self.statistics['latency_ms_max'], latency_ms)
+            self.statistics['latency_ms_last'] = latency_ms
+
+    def get_status(self) -> dict:
+        '''
+        Request counts and latencies
+
+        Returns:
+            status_dict (dict): statistics of the requests so far
+        '''
+        with self.statistics_lock:
+            statistics = dict(self.statistics)
+        latency_ms_total = statistics.pop('latency_ms_total')
+        statistics['latency_ms_mean'] = latency_ms_total / statistics['requests'] if statistics['requests'] else None
+        statistics['max_workers'] = self.max_workers
+        return statistics
+
+    def close(self) -> None:
+        '''
+        Stopping the worker processes
+        '''
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class MaskingRequestHandler(BaseHTTPRequestHandler):
+    '''
+        Class to answer the HTTP requests of a masking service
+    '''
+    server_version = 'MaskingService/1.0'
+
+    @property
+    def service(self) -> MaskingService:
+        '''
+        Masking service of the server
+        '''
+        return self.server.masking_service
+
+    def send_payload(self, status_code: int, payload: bytes, content_type: str) -> None:
+        '''
+        Sending a response, with the latency of the request
+
+        Args:
+            status_code (int): HTTP status code
+            payload (bytes): response body
+            content_type (str): content type of the body
+        '''
+        latency_ms = (time.perf_counter() - self.start_time) * 1000
+        # Recorded first, so that /status counts every request a client has an answer to
+        self.service.record(status_code, latency_ms)
+        OutputClass.info(f'{self.command} {self.path} {status_code} {latency_ms:.1f} ms')
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('X-Masking-Latency-Ms', f'{latency_ms:.3f}')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_json(self, status_code: int, response_dict: dict) -> None:
+        '''
+        Sending a JSON response
+
+        Args:
+            status_code (int): HTTP status code
+            response_dict (dict): response entries
+        '''
+        self.send_payload(*get_json_response(status_code, response_dict))
+
+    def get_masking_spec(self, spec_dict: dict | None) -> MaskingSpec:
+        '''
+        Masking spec of the request, or spec of the service if the request has none
+
+        Args:
+            spec_dict (dict | None): masking spec entries of the request
+
+        Returns:
+            masking_spec (MaskingSpec): masking spec
+        '''
+        if spec_dict is not None:
+            return MaskingSpec.from_dict(spec_dict)
+        if self.service.masking_spec is None:
+            raise MaskingSpecError('The request has no masking spec and the service has no default spec')
+        return self.service.masking_spec
+
+    def do_GET(self) -> None:
+        '''
+        Answering GET requests
+        '''
+        self.start_time = time.perf_counter()
+        if urllib.parse.urlsplit(self.path).path == '/status':
+            self.send_json(200, self.service.get_status())
+        else:
+            self.send_json(404, {'error': f'{self.path} is not an endpoint'})
+
+    def do_POST(self) -> None:
+        '''
+        Answering POST requests. The request slot is taken and the body size checked before the body is read.
+        '''
+        self.start_time = time.perf_counter()
+        url = urllib.parse.urlsplit(self.path)
+        if url.path not in ['/mask', '/mask-file']:
+            self.close_connection = True
+            self.send_json(404, {'error': f'{url.path} is not an endpoint'})
+            return
+        try:
+            content_length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            self.close_connection = True
+            self.send_json(411, {'error': 'The request has no valid Content-Length'})
+            return
+        if content_length > self.service.max_body_bytes:
+            self.close_connection = True
+            self.send_json(413, {'error': f'The request body is larger than {self.service.max_body_bytes} bytes'})
+            return
+        try:
+            self.service.acquire_slot()
+        except ServiceBusyError as busy_error:
+            self.close_connection = True
+            self.send_json(503, {'error': str(busy_error)})
+            return
+        # The slot is released before the response is sent, so that a client can send its next request at once
+        try:
+            response = self.get_masking_response(url, self.rfile.read(content_length))
+        finally:
+            self.service.release_slot()
+        self.send_payload(*response)
+
+    def get_masking_response(self, url: urllib.parse.SplitResult, payload: bytes) -> tuple[int, bytes, str]:
+        '''
+        Answering a /mask or /mask-file request
+
+        Args:
+            url (urllib.parse.SplitResult): request URL
+            payload (bytes): request body
+
+        Returns:
+            status_code (int): HTTP status code
+            response_payload (bytes): response body
+            content_type (str): content type of the body
+        '''
+        try:
+            if url.path == '/mask':
+                content_type = self.headers.get('Content-Type', CSV_CONTENT_TYPE).split(';')[0].strip()
+                if content_type not in [CSV_CONTENT_TYPE, ARROW_CONTENT_TYPE]:
+                    return get_json_response(415, {'error': f'{content_type} is not supported'})
+                spec_header = self.headers.get('X-Masking-Spec')
+                masking_spec = self.get_masking_spec(None if spec_header is None else load_json(spec_header))
+                output = urllib.parse.parse_qs(url.query).get('output', ['data'])[0]
+                masked_payload = self.service.run(mask_payload, payload, content_type, masking_spec, output)
+                return 200, masked_payload, CSV_CONTENT_TYPE if output == 'cells' else content_type
+            request_dict = load_json(payload)
+            if not isinstance(request_dict, dict) or not isinstance(request_dict.get('input_file_path'), str):
+                raise MaskingSpecError('The request has no input_file_path')
+            input_file_path = self.service.get_local_file_path(request_dict['input_file_path'])
+            masking_spec = self.get_masking_spec(request_dict.get('spec'))
+            output_file_path = self.service.run(mask_local_file, input_file_path, masking_spec)
+            return get_json_response(200, {'output_file_path': output_file_path})
+        except PermissionError as permission_error:
+            return get_json_response(403, {'error': str(permission_error)})
+        except FileNotFoundError as not_found_error:
+            return get_json_response(404, {'error': str(not_found_error)})
+        except MaskingSpecError as spec_error:
+            return get_json_response(400, {'error': str(spec_error)})
+        except Exception as masking_error:
+            OutputClass.warning(f'{self.command} {self.path} failed: {masking_error!r}')
+            return get_json_response(500, {'error': repr(masking_error)})
+
+    def log_message(self, format: str, *args) -> None:
+        '''
+        Requests are logged with their latency in send_payload instead
+        '''
+
+
+def create_server(masking_service: MaskingService, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    '''
+    Creating the HTTP server of a masking service, port 0 picks a free port
+
+    Args:
+        masking_service (MaskingService): masking service
+        host (str, optional): address to listen on. Defaults to '127.0.0.1' (local requests only).
+        port (int, optional): port to listen on. Defaults to 8765.
+
+    Returns:
+        http_server (ThreadingHTTPServer): HTTP server, to be run with serve_forever
+    '''
+    http_server = ThreadingHTTPServer((host, port), MaskingRequestHandler)
+    http_server.daemon_threads = True
+    http_server.masking_service = masking_service
+    return http_server
+
+def main(argv: list[str] | None = None) -> None:
+    '''
+    Command line entry point
+
+    Args:
+        argv (list[str] | None, optional): command line arguments. Defaults to None (sys.argv).
+    '''
+    parser = argparse.ArgumentParser(description='Run a local masking service over HTTP.')
+    parser.add_argument('--spec', default=None, help='masking spec file (.json or .toml) of requests without one')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on')
+    parser.add_argument('--max-workers', type=int, default=2, help='worker processes')
+    parser.add_argument('--max-pending', type=int, default=8, help='requests waiting for a worker before 503')
+    parser.add_argument('--max-body-mb', type=float, default=256, help='size limit of request bodies in MiB, 413 above')
+    parser.add_argument('--file-root', default=None,
+                        help='directory of the files POST /mask-file may mask, /mask-file is disabled without it')
+    args = parser.parse_args(argv)
+
+    OutputClass()
+    try:
+        masking_spec = None if args.spec is None else load_masking_spec(args.spec)
+    except MaskingSpecError as spec_error:
+        OutputClass.error(str(spec_error))
+    masking_service = MaskingService(masking_spec, args.max_workers, args.max_pending,
+                                     int(args.max_body_mb * 2**20), args.file_root)
+    http_server = create_server(masking_service, args.host, args.port)
+    OutputClass.info(f'Masking service listening on http://{args.host}:{http_server.server_address[1]}')
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        masking_service.close()
+
+# Program entry point
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,201 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Evaluation of several masking policies in one pass                                 #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module comparing masking policies on the same data, e.g. to choose the masking limits of a release.
+
+The data is grouped once: measure values and, for every cell, the lowest upper limit at which the
+vertical masking procedure masks it are computed once, then each policy is evaluated by comparing
+them with its limits. The masked cells of every policy are the same as apply_full_masking with that
+policy. Summary counts give the cells first masked by each procedure, the masked rows and the masked
+cells per policy, Additional Masking Columns included.
+
+    python ./src/masking_policy_for_small_populations_lib/policy_sweep.py --spec spec.json --policy 1-4 --policy 1-9 table.csv
+
+writes table_Policy_sweep.csv, and with --masked-cells table_Policy_sweep_cells.csv: one line per cell
+masked by at least one policy, with a True/False column per policy.
+'''
+from __future__ import annotations
+
+# Standard libraries
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# User-defined libraries
+from  terminal_interactions import OutputClass
+import masking_policy_for_small_populations
+from masking_policy_for_small_populations import GlobalMaskingPol
+from batch_masking import MaskingSpec, MaskingSpecError, load_masking_spec
+
+
+def parse_masking_policy(policy_text: str, complementary_suppression: bool = False) -> GlobalMaskingPol:
+    '''
+    Reading masking limits written as <min>-<max>, e.g. 1-9
+
+    Args:
+        policy_text (str): masking limits
+        complementary_suppression (bool, optional): apply complementary suppression. Defaults to False.
+
+    Returns:
+        masking_policy (GlobalMaskingPol): masking limits
+    '''
+    try:
+        msk_min, msk_max = (float(limit_enum) for limit_enum in policy_text.split('-'))
+    except ValueError as value_error:
+        raise MaskingSpecError(f'Invalid masking policy {policy_text}, expected <min>-<max> e.g. 1-9') from value_error
+    if msk_min > msk_max:
+        raise MaskingSpecError(f'Invalid masking policy {policy_text}, the lower limit is above the upper limit')
+    return GlobalMaskingPol(gmp_msk_min=msk_min, gmp_msk_max=msk_max, gmp_complementary=complementary_suppression)
+
+def get_policy_label(masking_policy: GlobalMaskingPol) -> str:
+    '''
+    Label of masking limits, e.g. 1-9
+
+    Args:
+        masking_policy (GlobalMaskingPol): masking limits
+
+    Returns:
+        policy_label (str): masking limits written as <min>-<max>
+    '''
+    return f'{masking_policy.gmp_msk_min:g}-{masking_policy.gmp_msk_max:g}'
+
+def sweep_masking_policies(unmasked_data: pd.DataFrame,
+                           masking_spec: MaskingSpec,
+                           masking_policies: list[GlobalMaskingPol]) -> tuple[list[np.ndarray], pd.DataFrame]:
+    '''
+    Masking the same data with several masking policies in one pass over the groups.
+    The columns come from the masking spec, its masking limits are not used.
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        masking_spec (MaskingSpec): masking spec
+        masking_policies (list[GlobalMaskingPol]): masking limits to evaluate
+
+    Returns:
+        masked_cells_list (list[np.ndarray]): boolean matrix of masked measure cells per policy
+        sweep_summary (pd.DataFrame): masking counts, one line per policy
+    '''
+    from masking_engine import compute_masked_cells_sweep
+
+    # Checking the spec columns against the data
+    masking_spec.masking_arguments(unmasked_data.columns)
+    masking_limits = [(masking_policy_enum.gmp_msk_min, masking_policy_enum.gmp_msk_max,
+                       masking_policy_enum.gmp_complementary) for masking_policy_enum in masking_policies]
+    OutputClass.process(f'Evaluating {len(masking_policies)} masking policies')
+    masked_cells_list, masking_counts_list = compute_masked_cells_sweep(
+        unmasked_data, masking_spec.partition_columns, masking_spec.subcategory_columns,
+        masking_spec.measure_columns_relation_type, masking_spec.measure_columns, masking_limits)
+
+    summary_records: list[dict] = []
+    for masking_policy, masked_cells, masking_counts in zip(masking_policies, masked_cells_list, masking_counts_list):
+        rows_masked = int(masked_cells.any(axis=1).sum())
+        summary_records.append({'policy': get_policy_label(masking_policy),
+                                'gmp_msk_min': masking_policy.gmp_msk_min,
+                                'gmp_msk_max': masking_policy.gmp_msk_max,
+                                'complementary_suppression': masking_policy.gmp_complementary,
+                                **masking_counts,
+                                'rows_masked': rows_masked,
+                                'cells_masked': int(masked_cells.sum()) \
+                                    + rows_masked * len(masking_spec.additional_masking_columns),
+                                'rows': len(unmasked_data)})
+    return masked_cells_list, pd.DataFrame.from_records(summary_records)
+
+def get_sweep_cell_table(unmasked_data: pd.DataFrame,
+                         masking_spec: MaskingSpec,
+                         masking_policies: list[GlobalMaskingPol],
+                         masked_cells_list: list[np.ndarray]) -> pd.DataFrame:
+    '''
+    Collecting the measure cells masked by at least one policy into a table, ordered by row then column
+
+    Args:
+        unmasked_data (pd.DataFrame): unmasked data
+        masking_spec (MaskingSpec): masking spec
+        masking_policies (list[GlobalMaskingPol]): evaluated masking limits
+        masked_cells_list (list[np.ndarray]): boolean matrix of masked measure cells per policy
+
+    Returns:
+        sweep_cell_table (pd.DataFrame): row, key columns, column and one True/False column per policy
+    '''
+    key_column_names = list(dict.fromkeys(masking_spec.partition_columns + masking_spec.subcategory_columns))
+    any_masked_cells = np.logical_or.reduce(masked_cells_list)
+    # np.nonzero walks the matrix row by row
+    row_positions, column_positions = np.nonzero(any_masked_cells)
+    sweep_cell_table = unmasked_data[key_column_names].iloc[row_positions].reset_index(drop=True)
+    sweep_cell_table.insert(0, 'row', row_positions)
+    sweep_cell_table['column'] = pd.Categorical.from_codes(
+        column_positions, categories=[str(column_name_enum) for column_name_enum in masking_spec.measure_columns])
+    for masking_policy, masked_cells in zip(masking_policies, masked_cells_list):
+        sweep_cell_table[get_policy_label(masking_policy)] = masked_cells[row_positions, column_positions]
+    return sweep_cell_table
+
+def sweep_file(input_file_path: str,
+               masking_spec: MaskingSpec,
+               masking_policies: list[GlobalMaskingPol],
+               masked_cells_flag: bool = False) -> str:
+    '''
+    Evaluating several masking policies on a file and writing the summary next to it
+
+    Args:
+        input_file_path (str): full path to file
+        masking_spec (MaskingSpec): masking spec
+        masking_policies (list[GlobalMaskingPol]): masking limits to evaluate
+        masked_cells_flag (bool, optional): also write the cells masked per policy. Defaults to False.
+
+    Returns:
+        sweep_file_path (str): full path to the summary file
+    '''
+    input_file_path, unmasked_data = masking_policy_for_small_populations.import_unmasked_data(
+        input_file_path, **masking_spec.import_arguments())
+    masked_cells_list, sweep_summary = sweep_masking_policies(unmasked_data, masking_spec, masking_policies)
+    sweep_file_path = f'{os.path.splitext(input_file_path)[0]}_Policy_sweep.csv'
+    sweep_summary.to_csv(sweep_file_path, index=False, header=True, mode='w')
+    OutputClass.success(f'{sweep_file_path} is generated!')
+    if masked_cells_flag:
+        sweep_cell_file_path = f'{os.path.splitext(input_file_path)[0]}_Policy_sweep_cells.csv'
+        get_sweep_cell_table(unmasked_data, masking_spec, masking_policies, masked_cells_list) \
+            .to_csv(sweep_cell_file_path, index=False, header=True, mode='w')
+        OutputClass.success(f'{sweep_cell_file_path} is generated!')
+    return sweep_file_path
+
+def main(argv: list[str] | None = None) -> list[str]:
+    '''
+    Command line entry point
+
+    Args:
+        argv (list[str] | None, optional): command line arguments. Defaults to None (sys.argv).
+
+    Returns:
+        sweep_file_paths (list[str]): full paths to the summary files
+    '''
+    parser = argparse.ArgumentParser(description='Compare masking policies on files with a JSON or TOML masking spec.')
+    parser.add_argument('--spec', required=True, help='masking spec file (.json or .toml)')
+    parser.add_argument('--policy', required=True, action='append',
+                        help='masking limits written as <min>-<max>, e.g. 1-9, may be repeated')
+    parser.add_argument('--masked-cells', action='store_true',
+                        help='also write the cells masked by each policy into a _Policy_sweep_cells.csv file')
+    parser.add_argument('input_files', nargs='+', help='CSV, XLSX, Parquet or Arrow files')
+    args = parser.parse_args(argv)
+
+    try:
+        masking_spec = load_masking_spec(args.spec)
+        masking_policies = [parse_masking_policy(policy_text_enum, masking_spec.complementary_suppression) \
+                            for policy_text_enum in args.policy]
+        return [sweep_file(input_file_path_enum, masking_spec, masking_policies, args.masked_cells) \
+                for input_file_path_enum in args.input_files]
+    # Missing optional packages (pyarrow, openpyxl, xlsxwriter) are reported like spec errors
+    except (MaskingSpecError, ImportError) as masking_error:
+        OutputClass.error(str(masking_error))
+
+# Program entry point
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,267 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Partition-chunked masking of SQLite tables                                         #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing masking of a table in a SQLite database, without exporting it to a file.
+
+The table is read in chunks ordered by the Partition Columns, so every partition arrives in one
+piece. Whole partitions are collected until chunk_size rows and their masked cells are computed
+together; partitions never interact in apply_full_masking. Masked rows are written into a
+<table>_masked table with batched executemany calls inside a single transaction, so the masked
+table appears complete or not at all.
+Unmasked values keep their SQL types; measure and Additional Masking Columns are declared TEXT, as
+in masked files. Rows of the masked table are ordered by the Partition Columns.
+
+    python ./src/masking_policy_for_small_populations_lib/sql_masking.py --spec spec.json --table enrolment data.sqlite
+'''
+from __future__ import annotations
+
+# Standard libraries
+import argparse
+import itertools
+import operator
+import sqlite3
+import sys
+from typing import Iterator
+import numpy as np
+import pandas as pd
+
+# User-defined libraries
+from  terminal_interactions import OutputClass
+import masking_policy_for_small_populations
+from batch_masking import MaskingSpec, MaskingSpecError, load_masking_spec
+from masking_engine import compute_masked_cells
+
+
+def quote_identifier(identifier: str) -> str:
+    '''
+    Quoting a table or column name for SQLite
+
+    Args:
+        identifier (str): table or column name
+
+    Returns:
+        quoted_identifier (str): quoted name
+    '''
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+def get_table_columns(connection: sqlite3.Connection, table_name: str) -> list[tuple[str, str]]:
+    '''
+    Column names and declared types of a table
+
+    Args:
+        connection (sqlite3.Connection): database connection
+        table_name (str): table name
+
+    Returns:
+        table_columns (list[tuple[str, str]]): name and declared type of every column, in order
+    '''
+    table_columns = [(column_info[1], column_info[2]) for column_info \
+                     in connection.execute(f'PRAGMA table_info({quote_identifier(table_name)})')]
+    if len(table_columns) == 0:
+        raise MaskingSpecError(f'{table_name} is not a table of the database')
+    return table_columns
+
+def iter_sorted_partitions(cursor: sqlite3.Cursor,
+                           partition_column_positions: list[int],
+                           chunk_size: int) -> Iterator[list[tuple]]:
+    '''
+    Fetching rows sorted by Partition Columns in chunks and collecting the rows of one partition at a time
+
+    Args:
+        cursor (sqlite3.Cursor): cursor of a query ordered by the Partition Columns
+        partition_column_positions (list[int]): positions of the Partition Columns in the rows
+        chunk_size (int): number of rows fetched at a time
+
+    Returns:
+        partitions (Iterator[list[tuple]]): rows of one partition at a time
+    '''
+    partition_key = operator.itemgetter(*partition_column_positions) if partition_column_positions else lambda row: ()
+    pending_rows: list[tuple] = []
+    while True:
+        chunk_rows = cursor.fetchmany(chunk_size)
+        if len(chunk_rows) == 0:
+            break
+        chunk_partitions = [list(partition_rows) for _, partition_rows in itertools.groupby(chunk_rows, key=partition_key)]
+        # The first partition of a chunk may continue the last one of the previous chunk
+        if pending_rows and partition_key(pending_rows[0]) == partition_key(chunk_partitions[0][0]):
+            chunk_partitions[0] = pending_rows + chunk_partitions[0]
+        elif pending_rows:
+            yield pending_rows
+        yield from chunk_partitions[:-1]
+        pending_rows = chunk_partitions[-1]
+    if pending_rows:
+        yield pending_rows
+
+def iter_partition_batches(partitions: Iterator[list[tuple]], batch_size: int) -> Iterator[list[tuple]]:
+    '''
+    Collecting whole partitions into batches of at least batch_size rows, the last batch excepted
+
+    Args:
+        partitions (Iterator[list[tuple]]): rows of one partition at a time
+        batch_size (int): number of rows per batch
+
+    Returns:
+        batches (Iterator[list[tuple]]): rows of whole partitions
+    '''
+    batch_rows: list[tuple] = []
+    for partition_rows in partitions:
+        batch_rows.extend(partition_rows)
+        if len(batch_rows) >= batch_size:
+            yield batch_rows
+            batch_rows = []
+    if batch_rows:
+        yield batch_rows
+
+def mask_sqlite_table(database_path: str,
+                      table_name: str,
+                      masking_string: str = 'Msk',
+                      partition_column_numbers: list | None = None,
+                      subcategory_column_numbers: list | None = None,
+                      measure_columns_relation_type: str | None = None,
+                      measure_column_numbers: list | None = None,
+                      additional_masking_column_flag: bool = False,
+                      additional_masking_column_numbers: list | None = None,
+                      chunk_size: int = 100_000,
+                      masking_policy: masking_policy_for_small_populations.GlobalMaskingPol | None = None) -> str:
+    '''
+    Masking a SQLite table partition by partition into a <table>_masked table, replaced if it exists.
+    Column arguments are the same as apply_full_masking, all of them are required.
+
+    Args:
+        database_path (str): full path to a SQLite database
+        table_name (str): table to mask
+        masking_string (str, optional): string to replace number to be masked. Defaults to 'Msk'.
+        partition_column_numbers (list | None, optional): partition columns (see User_Guide). Defaults to None.
+        subcategory_column_numbers (list | None, optional): subcategory columns (see User_Guide). Defaults to None.
+        measure_columns_relation_type (str | None, optional): measure columns relation type. Defaults to None.
+        measure_column_numbers (list | None, optional): measure columns (see User_Guide). Defaults to None.
+        additional_masking_column_flag (bool, optional): boolean for additional columns to be masked. Defaults to False.
+        additional_masking_column_numbers (list | None, optional): additional columns to be masked (see User_Guide). Defaults to None.
+        chunk_size (int, optional): number of rows fetched, masked and inserted at a time. Defaults to 100_000.
+        masking_policy (GlobalMaskingPol | None, optional): masking limits. Defaults to None (GlobalMaskingPol()).
+
+    Returns:
+        masked_table_name (str): name of the masked table
+    '''
+    if partition_column_numbers is None or subcategory_column_numbers is None \
+        or measure_columns_relation_type is None or measure_column_numbers is None:
+        raise MaskingSpecError('SQLite masking requires partition, subcategory and measure columns')
+    masked_table_name = f'{table_name}_masked'
+    # Transactions are opened and committed explicitly
+    connection = sqlite3.connect(database_path, isolation_level=None)
+    try:
+        table_columns = get_table_columns(connection, table_name)
+        column_names = [column_name for column_name, _ in table_columns]
+        column_name = lambda column_number: column_names[int(column_number)-1]
+        partition_column_names = [column_name(column_number_enum) for column_number_enum in partition_column_numbers]
+        subcategory_column_names = [column_name(column_number_enum) for column_number_enum in subcategory_column_numbers]
+        measure_column_names = [column_name(column_number_enum) for column_number_enum in measure_column_numbers]
+        additional_masking_column_names = [column_name(column_number_enum) for column_number_enum \
+                                           in additional_masking_column_numbers or []] if additional_masking_column_flag else []
+        partition_column_positions = [column_names.index(column_name_enum) for column_name_enum in partition_column_names]
+        masked_column_positions = [column_names.index(column_name_enum) for column_name_enum \
+                                   in measure_column_names + additional_masking_column_names]
+        if masking_policy is None:
+            masking_policy = masking_policy_for_small_populations.GlobalMaskingPol()
+        if len(partition_column_positions) == 0:
+            OutputClass.warning('No Partition Column, the whole table is masked at once!')
+            chunk_size = sys.maxsize
+
+        OutputClass.process(f'Generating {masked_table_name} partition by partition')
+        connection.execute('BEGIN')
+        connection.execute(f'DROP TABLE IF EXISTS {quote_identifier(masked_table_name)}')
+        column_definitions = [f'{quote_identifier(column_name)} {"TEXT" if column_position in masked_column_positions else column_type}'.strip() \
+                              for column_position, (column_name, column_type) in enumerate(table_columns)]
+        connection.execute(f'CREATE TABLE {quote_identifier(masked_table_name)} ({", ".join(column_definitions)})')
+        insert_statement = f'INSERT INTO {quote_identifier(masked_table_name)} VALUES ({", ".join(["?"] * len(column_names))})'
+        order_clause = ' ORDER BY ' + ', '.join(quote_identifier(column_names[column_position_enum]) \
+                                                for column_position_enum in partition_column_positions) \
+                       if partition_column_positions else ''
+        read_cursor = connection.execute(f'SELECT * FROM {quote_identifier(table_name)}{order_clause}')
+        for batch_rows in iter_partition_batches(iter_sorted_partitions(read_cursor, partition_column_positions, chunk_size),
+                                                 chunk_size):
+            masked_cells = compute_masked_cells(pd.DataFrame.from_records(batch_rows, columns=column_names),
+                                                partition_column_names, subcategory_column_names,
+                                                measure_columns_relation_type, measure_column_names,
+                                                masking_policy.gmp_msk_min, masking_policy.gmp_msk_max,
+                                                complementary_suppression=masking_policy.gmp_complementary)
+            # Original values, with the masking string written into the masked cells. Values of masked columns
+            # are converted into text here, as in masked files; SQLite would write REAL values with 15 digits only.
+            batch_values = np.empty((len(batch_rows), len(column_names)), dtype=object)
+            batch_values[:] = batch_rows
+            for column_position in masked_column_positions:
+                batch_values[:, column_position] = [None if value_enum is None else str(value_enum) \
+                                                    for value_enum in batch_values[:, column_position]]
+            for column_enum, column_name_enum in enumerate(measure_column_names):
+                batch_values[masked_cells[:, column_enum], column_names.index(column_name_enum)] = masking_string
+            for column_name_enum in additional_masking_column_names:
+                batch_values[masked_cells.any(axis=1), column_names.index(column_name_enum)] = masking_string
+            connection.executemany(insert_statement, batch_values.tolist())
+        connection.execute('COMMIT')
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute('ROLLBACK')
+        raise
+    finally:
+        connection.close()
+    OutputClass.success(f'{masked_table_name} is generated!')
+    return masked_table_name
+
+def mask_table(database_path: str,
+               table_name: str,
+               masking_spec: MaskingSpec,
+               chunk_size: int = 100_000) -> str:
+    '''
+    Masking a SQLite table with a masking spec, without any prompt
+
+    Args:
+        database_path (str): full path to a SQLite database
+        table_name (str): table to mask
+        masking_spec (MaskingSpec): masking spec
+        chunk_size (int, optional): number of rows fetched, masked and inserted at a time. Defaults to 100_000.
+
+    Returns:
+        masked_table_name (str): name of the masked table
+    '''
+    connection = sqlite3.connect(database_path)
+    try:
+        column_names = [column_name for column_name, _ in get_table_columns(connection, table_name)]
+    finally:
+        connection.close()
+    return mask_sqlite_table(database_path, table_name, chunk_size=chunk_size,
+                             **masking_spec.masking_arguments(column_names))
+
+def main(argv: list[str] | None = None) -> list[str]:
+    '''
+    Command line entry point
+
+    Args:
+        argv (list[str] | None, optional): command line arguments. Defaults to None (sys.argv).
+
+    Returns:
+        masked_table_names (list[str]): names of the masked tables
+    '''
+    parser = argparse.ArgumentParser(description='Mask tables of a SQLite database with a JSON or TOML masking spec.')
+    parser.add_argument('--spec', required=True, help='masking spec file (.json or .toml)')
+    parser.add_argument('--table', required=True, action='append', help='table to mask, may be repeated')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='rows fetched, masked and inserted at a time')
+    parser.add_argument('database_path', help='SQLite database file')
+    args = parser.parse_args(argv)
+
+    try:
+        masking_spec = load_masking_spec(args.spec)
+        return [mask_table(args.database_path, table_name_enum, masking_spec, args.chunk_size) for table_name_enum in args.table]
+    except MaskingSpecError as spec_error:
+        OutputClass.error(str(spec_error))
+
+# Program entry point
+if __name__ == '__main__':
+    main(sys.argv[1:])
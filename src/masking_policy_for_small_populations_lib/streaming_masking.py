@@ -0,0 +1,222 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Partition-chunked masking for CSV files larger than memory                        #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing streaming masking of a CSV file, one partition at a time.
+
+Partitions never interact in apply_full_masking, so each partition can be masked on its own.
+The input is read in chunks and its rows are spilled into one temporary file per partition
+(or, for input already sorted by the Partition Columns, collected until the partition ends).
+Each partition is then masked and appended to the _Masked.csv output, so peak memory is bounded
+by the largest partition rather than by the whole file. Column types are found once for the whole
+file, in a first pass over its chunks, so that every partition is parsed and written alike.
+'''
+# Standard libraries
+import io
+import os
+import tempfile
+from typing import Iterator
+import numpy as np
+import pandas as pd
+
+# User-defined libraries
+from  terminal_interactions import OutputClass
+import masking_policy_for_small_populations
+from batch_masking import MaskingSpecError
+
+
+def read_raw_chunks(input_file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    '''
+    Reading a CSV file in chunks, keeping every value as its original text
+
+    Args:
+        input_file_path (str): full path to file
+        chunk_size (int): number of rows per chunk
+
+    Returns:
+        raw_chunks (Iterator[pd.DataFrame]): chunks of text columns
+    '''
+    return pd.read_csv(input_file_path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+
+def get_column_dtypes(input_file_path: str, chunk_size: int) -> dict[str, str]:
+    '''
+    Column types pd.read_csv infers for a whole file, found chunk by chunk: a column stays numeric only if it
+    is numeric in every chunk, and becomes float if any chunk is float, e.g. because of a missing value.
+
+    Args:
+        input_file_path (str): full path to a CSV file
+        chunk_size (int): number of rows per chunk
+
+    Returns:
+        column_dtypes (dict[str, str]): type per column name, 'str' for text columns
+    '''
+    chunk_dtypes_dict: dict[str, list] = {}
+    for chunk_data in pd.read_csv(input_file_path, chunksize=chunk_size):
+        for column_name_enum in chunk_data.columns:
+            chunk_dtypes_dict.setdefault(column_name_enum, []).append(chunk_data[column_name_enum].dtype)
+    if len(chunk_dtypes_dict) == 0:
+        return {column_name_enum: 'str' for column_name_enum in pd.read_csv(input_file_path, nrows=0).columns}
+    column_dtypes: dict[str, str] = {}
+    for column_name_enum, chunk_dtypes in chunk_dtypes_dict.items():
+        if all(pd.api.types.is_bool_dtype(dtype_enum) for dtype_enum in chunk_dtypes):
+            column_dtypes[column_name_enum] = 'bool'
+        elif all(pd.api.types.is_numeric_dtype(dtype_enum) and not pd.api.types.is_bool_dtype(dtype_enum) \
+                 for dtype_enum in chunk_dtypes):
+            column_dtypes[column_name_enum] = str(np.result_type(*chunk_dtypes))
+        else:
+            column_dtypes[column_name_enum] = 'str'
+    return column_dtypes
+
+def parse_raw_partition(raw_partition_data: pd.DataFrame, column_dtypes: dict[str, str]) -> pd.DataFrame:
+    '''
+    Parsing the text of a partition as pd.read_csv does for a whole file, with the column types of the whole file
+
+    Args:
+        raw_partition_data (pd.DataFrame): text columns of a partition
+        column_dtypes (dict[str, str]): type per column name (see get_column_dtypes)
+
+    Returns:
+        partition_data (pd.DataFrame): parsed partition
+    '''
+    return pd.read_csv(io.StringIO(raw_partition_data.to_csv(index=False)), dtype=column_dtypes)
+
+def iter_presorted_partitions(raw_chunks: Iterator[pd.DataFrame],
+                              partition_column_names: list[str]) -> Iterator[pd.DataFrame]:
+    '''
+    Collecting consecutive rows with the same partition values, for input sorted by Partition Columns.
+    Pieces of a partition spread over several chunks are concatenated once, when the partition ends.
+
+    Args:
+        raw_chunks (Iterator[pd.DataFrame]): chunks of text columns
+        partition_column_names (list[str]): partition column names
+
+    Returns:
+        raw_partitions (Iterator[pd.DataFrame]): text columns of one partition at a time
+    '''
+    pending_pieces: list[pd.DataFrame] = []
+    pending_key: tuple | None = None
+    for raw_chunk in raw_chunks:
+        partition_data = raw_chunk[partition_column_names]
+        partition_changes = (partition_data != partition_data.shift()).any(axis=1).to_numpy(copy=True)
+        # The first row of a chunk may continue the last partition of the previous chunk
+        partition_changes[0] = pending_key is not None and tuple(partition_data.iloc[0]) != pending_key
+        piece_start = 0
+        for partition_start in np.flatnonzero(partition_changes):
+            if partition_start > piece_start:
+                pending_pieces.append(raw_chunk.iloc[piece_start:partition_start])
+            yield pd.concat(pending_pieces) if len(pending_pieces) > 1 else pending_pieces[0]
+            pending_pieces, piece_start = [], partition_start
+        pending_pieces.append(raw_chunk.iloc[piece_start:])
+        pending_key = tuple(partition_data.iloc[-1])
+    if len(pending_pieces) > 0:
+        yield pd.concat(pending_pieces) if len(pending_pieces) > 1 else pending_pieces[0]
+
+def iter_spilled_partitions(raw_chunks: Iterator[pd.DataFrame],
+                            partition_column_names: list[str],
+                            spill_dir_path: str) -> Iterator[pd.DataFrame]:
+    '''
+    Spilling rows into one temporary file per partition, then reading the partitions back one by one.
+    Partitions are returned in order of first appearance, rows keep their original order.
+
+    Args:
+        raw_chunks (Iterator[pd.DataFrame]): chunks of text columns
+        partition_column_names (list[str]): partition column names
+        spill_dir_path (str): directory for the temporary partition files
+
+    Returns:
+        raw_partitions (Iterator[pd.DataFrame]): text columns of one partition at a time
+    '''
+    spill_file_paths: dict[tuple, str] = {}
+    column_names: list[str] = []
+    for raw_chunk in raw_chunks:
+        column_names = list(raw_chunk.columns)
+        for partition_key, raw_partition_data in raw_chunk.groupby(partition_column_names, sort=False):
+            if partition_key not in spill_file_paths:
+                spill_file_paths[partition_key] = os.path.join(spill_dir_path, f'partition_{len(spill_file_paths):08d}.csv')
+            raw_partition_data.to_csv(spill_file_paths[partition_key], index=False, header=False, mode='a')
+    for spill_file_path in spill_file_paths.values():
+        yield pd.read_csv(spill_file_path, header=None, names=column_names, dtype=str, keep_default_na=False)
+        os.remove(spill_file_path)
+
+def stream_full_masking(input_file_path: str,
+                        masking_string: str = 'Msk',
+                        partition_column_numbers: list | None = None,
+                        subcategory_column_numbers: list | None = None,
+                        measure_columns_relation_type: str | None = None,
+                        measure_column_numbers: list | None = None,
+                        additional_masking_column_flag: bool = False,
+                        additional_masking_column_numbers: list | None = None,
+                        chunk_size: int = 100_000,
+                        presorted: bool = False,
+                        masking_policy: masking_policy_for_small_populations.GlobalMaskingPol | None = None,
+                        column_dtypes: dict[str, str] | None = None) -> str:
+    '''
+    Masking a CSV file partition by partition and appending each masked partition to the output file.
+    Column arguments are the same as apply_full_masking, all of them are required.
+
+    Args:
+        input_file_path (str): full path to a CSV file
+        masking_string (str, optional): string to replace number to be masked. Defaults to 'Msk'.
+        partition_column_numbers (list | None, optional): partition columns (see User_Guide). Defaults to None.
+        subcategory_column_numbers (list | None, optional): subcategory columns (see User_Guide). Defaults to None.
+        measure_columns_relation_type (str | None, optional): measure columns relation type. Defaults to None.
+        measure_column_numbers (list | None, optional): measure columns (see User_Guide). Defaults to None.
+        additional_masking_column_flag (bool, optional): boolean for additional columns to be masked. Defaults to False.
+        additional_masking_column_numbers (list | None, optional): additional columns to be masked (see User_Guide). Defaults to None.
+        chunk_size (int, optional): number of rows read at a time. Defaults to 100_000.
+        presorted (bool, optional): input rows are sorted by Partition Columns, no spilling needed. Defaults to False.
+        masking_policy (GlobalMaskingPol | None, optional): masking limits. Defaults to None (GlobalMaskingPol()).
+        column_dtypes (dict[str, str] | None, optional): type per column name, given to every partition.
+            Defaults to None (types of the whole file, found in a first pass, see get_column_dtypes).
+
+    Returns:
+        output_file_path (str): full path to masked file
+    '''
+    if os.path.splitext(input_file_path)[1] not in ['.csv', '.CSV']:
+        raise MaskingSpecError('Streaming masking supports CSV files only')
+    if partition_column_numbers is None or subcategory_column_numbers is None \
+        or measure_columns_relation_type is None or measure_column_numbers is None:
+        raise MaskingSpecError('Streaming masking requires partition, subcategory and measure columns')
+
+    column_names: list[str] = list(pd.read_csv(input_file_path, nrows=0).columns)
+    partition_column_names: list[str] = [column_names[int(column_number_enum)-1] for column_number_enum in partition_column_numbers]
+    if len(partition_column_names) == 0:
+        OutputClass.warning('No Partition Column, the whole file is masked at once!')
+
+    # Every partition is parsed with the same types, as when the whole file is read at once
+    if column_dtypes is None:
+        column_dtypes = get_column_dtypes(input_file_path, chunk_size)
+
+    output_file_path = f'{os.path.splitext(input_file_path)[0]}_Masked.csv'
+    OutputClass.process(f'Generating {os.path.basename(output_file_path)} partition by partition')
+    with tempfile.TemporaryDirectory() as spill_dir_path:
+        raw_chunks = read_raw_chunks(input_file_path, chunk_size)
+        if presorted or len(partition_column_names) == 0:
+            raw_partitions = iter_presorted_partitions(raw_chunks, partition_column_names)
+        else:
+            raw_partitions = iter_spilled_partitions(raw_chunks, partition_column_names, spill_dir_path)
+        header_flag = True
+        for raw_partition_data in raw_partitions:
+            masked_data = masking_policy_for_small_populations.apply_full_masking(
+                parse_raw_partition(raw_partition_data, column_dtypes),
+                masking_string=masking_string,
+                partition_column_numbers=partition_column_numbers,
+                subcategory_column_numbers=subcategory_column_numbers,
+                measure_columns_relation_type=measure_columns_relation_type,
+                measure_column_numbers=measure_column_numbers,
+                additional_masking_column_flag=additional_masking_column_flag,
+                additional_masking_column_numbers=additional_masking_column_numbers,
+                masking_policy=masking_policy)
+            masked_data.to_csv(output_file_path, index=False, header=header_flag, mode='w' if header_flag else 'a')
+            header_flag = False
+        if header_flag:
+            pd.DataFrame(columns=column_names).to_csv(output_file_path, index=False, header=True, mode='w')
+    OutputClass.success(f'{output_file_path} is generated!')
+    return output_file_path
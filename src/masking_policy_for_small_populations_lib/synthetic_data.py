@@ -0,0 +1,182 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Seeded generator of synthetic data shaped like the masking test fixtures           #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module generating synthetic datasets shaped like tests/dummy_data_mea_col_rel_{0,1,2}.csv.
+
+Every partition (school year, district, school) holds the full cube of subcategory values plus
+their "All" rollup rows, e.g. 3 x 3 x 3 = 27 rows for 3 subcategory columns of 2 values each.
+Leaf counts are drawn so that a chosen share of them are small (0 to 9), and the "All" rows hold
+the sums of the rows they roll up, as in a published table.
+
+    synthetic_data = generate_masking_data(n_rows=1_000_000, relation_type='2', seed=0)
+    masking_spec = get_synthetic_masking_spec(synthetic_data, relation_type='2')
+'''
+from __future__ import annotations
+
+# Standard libraries
+import math
+import numpy as np
+import pandas as pd
+
+# User-defined libraries
+from batch_masking import MaskingSpec
+
+ROLLUP_VALUE: str = 'All'
+PARTITION_COLUMN_NAMES: list[str] = ['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03']
+
+
+def get_measure_column_names(relation_type: str, n_measure_columns: int = 3) -> list[str]:
+    '''
+    Measure column names of synthetic data, in the order expected by a masking spec
+
+    Args:
+        relation_type (str): '0' (none), '1' (rate) or '2' (sum)
+        n_measure_columns (int, optional): number of independent (none) or element (sum) columns. Defaults to 3.
+
+    Returns:
+        measure_column_names (list[str]): measure column names
+    '''
+    element_column_names = [f'MEASURE_COLUMN_{column_number_enum:02d}' for column_number_enum in range(1, n_measure_columns+1)]
+    if relation_type == '0':
+        return element_column_names
+    if relation_type == '1':
+        return ['MEASURE_COLUMN_NUMERATOR', 'MEASURE_COLUMN_DENOMINATOR']
+    if relation_type == '2':
+        return ['MEASURE_COLUMN_SUM'] + element_column_names
+    raise ValueError(f'Invalid Measure Columns Relation Type {relation_type}')
+
+def draw_leaf_counts(rng: np.random.Generator,
+                     shape: tuple[int, ...],
+                     small_count_density: float) -> np.ndarray:
+    '''
+    Drawing leaf counts, a share small_count_density of them between 0 and 9, the others between 10 and 199
+
+    Args:
+        rng (np.random.Generator): random generator
+        shape (tuple[int, ...]): shape of the counts
+        small_count_density (float): share of small counts
+
+    Returns:
+        leaf_counts (np.ndarray): counts
+    '''
+    small_flags = rng.random(shape) < small_count_density
+    return np.where(small_flags, rng.integers(0, 10, shape), rng.integers(10, 200, shape))
+
+def add_rollups(leaf_counts: np.ndarray, n_subcategory_columns: int) -> np.ndarray:
+    '''
+    Appending the "All" rollup along each subcategory axis, the last position of each axis
+
+    Args:
+        leaf_counts (np.ndarray): counts of shape (partitions, *subcategory cardinalities, measures)
+        n_subcategory_columns (int): number of subcategory axes
+
+    Returns:
+        counts (np.ndarray): counts with one more position on each subcategory axis
+    '''
+    counts = leaf_counts
+    for axis_enum in range(1, n_subcategory_columns+1):
+        counts = np.concatenate([counts, counts.sum(axis=axis_enum, keepdims=True)], axis=axis_enum)
+    return counts
+
+def generate_masking_data(n_rows: int | None = None,
+                          relation_type: str = '2',
+                          n_partitions: int | None = None,
+                          subcategory_cardinalities: tuple[int, ...] = (2, 2, 2),
+                          small_count_density: float = 0.3,
+                          n_measure_columns: int = 3,
+                          seed: int = 0) -> pd.DataFrame:
+    '''
+    Generating a synthetic dataset shaped like the masking test fixtures.
+    Exactly one of n_rows and n_partitions is given; with n_rows, the last partition may be incomplete.
+
+    Args:
+        n_rows (int | None, optional): number of rows. Defaults to None.
+        relation_type (str, optional): '0' (none), '1' (rate) or '2' (sum). Defaults to '2'.
+        n_partitions (int | None, optional): number of complete partitions. Defaults to None.
+        subcategory_cardinalities (tuple[int, ...], optional): values of each subcategory column, "All" excluded. Defaults to (2, 2, 2).
+        small_count_density (float, optional): share of leaf counts between 0 and 9. Defaults to 0.3.
+        n_measure_columns (int, optional): number of independent (none) or element (sum) columns. Defaults to 3.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        synthetic_data (pd.DataFrame): synthetic data
+    '''
+    if (n_rows is None) == (n_partitions is None):
+        raise ValueError('Give either a number of rows or a number of partitions')
+    rows_per_partition = math.prod(cardinality_enum + 1 for cardinality_enum in subcategory_cardinalities)
+    if n_partitions is None:
+        n_partitions = max(math.ceil(n_rows / rows_per_partition), 1)
+    n_subcategory_columns = len(subcategory_cardinalities)
+    rng = np.random.default_rng(seed)
+
+    # Measure counts of the leaf rows, then rollups
+    leaf_shape = (n_partitions, *subcategory_cardinalities)
+    if relation_type == '1':
+        denominators = draw_leaf_counts(rng, leaf_shape, small_count_density)
+        numerators = rng.binomial(denominators, rng.uniform(0.1, 0.9, leaf_shape))
+        leaf_counts = np.stack([numerators, denominators], axis=-1)
+    else:
+        leaf_counts = draw_leaf_counts(rng, (*leaf_shape, n_measure_columns), small_count_density)
+    counts = add_rollups(leaf_counts, n_subcategory_columns).reshape(n_partitions * rows_per_partition, -1)
+    measure_column_names = get_measure_column_names(relation_type, n_measure_columns)
+    if relation_type == '2':
+        counts = np.concatenate([counts.sum(axis=1, keepdims=True), counts], axis=1)
+
+    # Partition and subcategory values; object arrays share one string per distinct value
+    partition_codes = np.repeat(np.arange(n_partitions), rows_per_partition)
+    column_dict: dict[str, np.ndarray] = {
+        PARTITION_COLUMN_NAMES[0]: np.array([f'{2018+year_enum}/{2019+year_enum}' for year_enum in range(5)],
+                                            dtype=object)[partition_codes % 5],
+        PARTITION_COLUMN_NAMES[1]: np.array([f'SD_{district_enum:03d}' for district_enum in range(n_partitions // 100 + 1)],
+                                            dtype=object)[partition_codes // 100],
+        PARTITION_COLUMN_NAMES[2]: np.array([f'SCH_{school_enum:06d}' for school_enum in range(n_partitions)],
+                                            dtype=object)[partition_codes]}
+    subcategory_codes = np.indices([cardinality_enum + 1 for cardinality_enum in subcategory_cardinalities]) \
+        .reshape(n_subcategory_columns, -1)
+    for column_position_enum, cardinality_enum in enumerate(subcategory_cardinalities):
+        subcategory_values = np.array([f'S{column_position_enum+1}_{value_enum:02d}' for value_enum in range(cardinality_enum)] \
+                                      + [ROLLUP_VALUE], dtype=object)
+        column_dict[f'SUBCATEGORY_COLUMN_{column_position_enum+1:02d}'] = \
+            np.tile(subcategory_values[subcategory_codes[column_position_enum]], n_partitions)
+    for column_position_enum, column_name_enum in enumerate(measure_column_names):
+        column_dict[column_name_enum] = counts[:, column_position_enum]
+    synthetic_data = pd.DataFrame(column_dict)
+    if relation_type == '1':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            synthetic_data['MEASURE_COLUMN_RATE'] = counts[:, 0] / counts[:, 1]
+    if n_rows is not None:
+        synthetic_data = synthetic_data.iloc[:n_rows]
+    return synthetic_data
+
+def get_synthetic_masking_spec(synthetic_data: pd.DataFrame,
+                               relation_type: str = '2',
+                               masking_string: str = 'Msk') -> MaskingSpec:
+    '''
+    Masking spec of a synthetic dataset; the rate column of Rate data is an additional masking column
+
+    Args:
+        synthetic_data (pd.DataFrame): synthetic data from generate_masking_data
+        relation_type (str, optional): '0' (none), '1' (rate) or '2' (sum). Defaults to '2'.
+        masking_string (str, optional): string to replace number to be masked. Defaults to 'Msk'.
+
+    Returns:
+        masking_spec (MaskingSpec): masking spec
+    '''
+    column_names = list(synthetic_data.columns)
+    n_element_columns = sum(column_name_enum.startswith('MEASURE_COLUMN_0') for column_name_enum in column_names)
+    return MaskingSpec(
+        partition_columns=PARTITION_COLUMN_NAMES,
+        subcategory_columns=[column_name_enum for column_name_enum in column_names \
+                             if column_name_enum.startswith('SUBCATEGORY_COLUMN_')],
+        measure_columns_relation_type=relation_type,
+        measure_columns=get_measure_column_names(relation_type, n_element_columns),
+        additional_masking_columns=['MEASURE_COLUMN_RATE'] if relation_type == '1' else [],
+        masking_string=masking_string)
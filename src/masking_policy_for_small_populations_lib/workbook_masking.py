@@ -0,0 +1,175 @@
+# ================================================================================================#
+#                                                                                                 #
+#                       ECC EAO Masking Policy for Small Populations                              #
+#                                                                                                 #
+# ------------------------------------------------------------------------------------------------#
+#                                                                                                 #
+# Description: Masking of every sheet of an XLSX workbook with a per-sheet masking spec           #
+#                                                                                                 #
+# ================================================================================================#
+
+'''
+Module providing masking of multi-sheet XLSX workbooks.
+
+Sheets are independent, so each one is read and masked in its own process. The masked sheets then
+replace the original ones in a copy of the workbook, the __Masked.xlsx file, where every other sheet is
+copied byte for byte, formulas and formatting included.
+
+Example workbook spec (JSON):
+
+    {
+        "subcategory_columns": ["SUBCATEGORY_COLUMN_01", "SUBCATEGORY_COLUMN_02"],
+        "masking_string": "Msk",
+        "sheets": {
+            "Enrolment": {
+                "partition_columns": ["PARTITION_COLUMN_01"],
+                "measure_columns_relation_type": "none",
+                "measure_columns": ["MEASURE_COLUMN_01"]
+            },
+            "Completion": {
+                "partition_columns": ["PARTITION_COLUMN_01", "PARTITION_COLUMN_02"],
+                "measure_columns_relation_type": "rate",
+                "measure_columns": ["MEASURE_COLUMN_01", "MEASURE_COLUMN_02"]
+            }
+        }
+    }
+
+Top level entries are shared by every sheet and may be overridden per sheet. Without "sheets",
+the top level spec masks every sheet; with it, only the listed sheets are masked and the other
+sheets are copied unchanged.
+
+    python ./src/masking_policy_for_small_populations_lib/workbook_masking.py --spec spec.json --max-workers 4 book.xlsx
+'''
+from __future__ import annotations
+
+# Standard libraries
+import argparse
+import os
+import sys
+from typing import TYPE_CHECKING
+
+# User-defined libraries
+from  terminal_interactions import OutputClass
+import masking_policy_for_small_populations
+from batch_masking import MaskingSpec, MaskingSpecError, check_unmasked_rows, read_spec_file
+from excel_io import get_excel_sheet_names, read_excel_low_memory, replace_excel_sheets
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def load_workbook_spec(spec_file_path: str) -> tuple[MaskingSpec | None, dict[str, MaskingSpec]]:
+    '''
+    Loading a workbook spec from a JSON or TOML file
+
+    Args:
+        spec_file_path (str): full path to spec file
+
+    Returns:
+        masking_spec (MaskingSpec | None): spec of every sheet, None if sheets are listed
+        sheet_specs (dict[str, MaskingSpec]): spec of each listed sheet
+    '''
+    spec_dict = read_spec_file(spec_file_path)
+    sheet_spec_dicts = spec_dict.pop('sheets', None)
+    if sheet_spec_dicts is None:
+        return MaskingSpec.from_dict(spec_dict), {}
+    return None, {sheet_name_enum: MaskingSpec.from_dict({**spec_dict, **sheet_spec_dict}) \
+                  for sheet_name_enum, sheet_spec_dict in sheet_spec_dicts.items()}
+
+def mask_sheet(input_file_path: str,
+               sheet_name: str,
+               masking_spec: MaskingSpec) -> pd.DataFrame:
+    '''
+    Reading and masking one sheet of an XLSX file
+
+    Args:
+        input_file_path (str): full path to file
+        sheet_name (str): sheet name
+        masking_spec (MaskingSpec): masking spec
+
+    Returns:
+        masked_data (pd.DataFrame): masked sheet
+    '''
+    unmasked_data = read_excel_low_memory(input_file_path, sheet_name=sheet_name)
+    check_unmasked_rows(unmasked_data, f'Sheet {sheet_name}')
+    if masking_spec.compact_dtypes:
+        unmasked_data = masking_policy_for_small_populations.compact_unmasked_data(
+            unmasked_data, masking_spec.partition_columns + masking_spec.subcategory_columns)
+    OutputClass.process(f'Masking sheet {sheet_name}')
+    return masking_policy_for_small_populations.apply_full_masking(
+        unmasked_data, **masking_spec.masking_arguments(unmasked_data.columns))
+
+def mask_workbook(input_file_path: str,
+                  masking_spec: MaskingSpec | None = None,
+                  sheet_specs: dict[str, MaskingSpec] | None = None,
+                  max_workers: int | None = None) -> str:
+    '''
+    Masking the sheets of an XLSX file in a process pool and writing them into a copy of the workbook, __Masked.xlsx.
+    Sheets listed in sheet_specs are masked with their own spec, the other sheets with masking_spec,
+    or copied byte for byte if masking_spec is None.
+
+    Args:
+        input_file_path (str): full path to an XLSX file
+        masking_spec (MaskingSpec | None, optional): spec of sheets not listed in sheet_specs. Defaults to None.
+        sheet_specs (dict[str, MaskingSpec] | None, optional): spec of each sheet. Defaults to None.
+        max_workers (int | None, optional): number of processes masking sheets. Defaults to None (CPU count).
+
+    Returns:
+        output_file_path (str): full path to masked file
+    '''
+    if os.path.splitext(input_file_path)[1] not in ['.xlsx', '.XLSX']:
+        raise MaskingSpecError(f'{os.path.basename(input_file_path)} is not an XLSX file')
+    sheet_specs = sheet_specs or {}
+    sheet_names = get_excel_sheet_names(input_file_path)
+    for sheet_name_enum in sheet_specs:
+        if sheet_name_enum not in sheet_names:
+            raise MaskingSpecError(f'{sheet_name_enum} is not a sheet of {os.path.basename(input_file_path)}')
+    if masking_spec is None and len(sheet_specs) == 0:
+        raise MaskingSpecError('Masking a workbook requires a masking spec')
+    sheet_spec_dict = {sheet_name_enum: sheet_specs.get(sheet_name_enum, masking_spec) for sheet_name_enum in sheet_names \
+                       if sheet_specs.get(sheet_name_enum, masking_spec) is not None}
+    max_workers = min(max_workers or os.cpu_count() or 1, len(sheet_spec_dict))
+
+    output_file_path = f'{os.path.splitext(input_file_path)[0]}__Masked.xlsx'
+    OutputClass.process(f'Generating {os.path.basename(output_file_path)}')
+    if max_workers <= 1:
+        replace_excel_sheets(input_file_path, output_file_path, list(sheet_spec_dict),
+                             lambda sheet_name: mask_sheet(input_file_path, sheet_name, sheet_spec_dict[sheet_name]))
+    else:
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            sheet_futures = {sheet_name_enum: executor.submit(mask_sheet, input_file_path, sheet_name_enum, sheet_spec_enum) \
+                             for sheet_name_enum, sheet_spec_enum in sheet_spec_dict.items()}
+            # Each masked sheet is written as soon as its part of the workbook is reached, then released
+            replace_excel_sheets(input_file_path, output_file_path, list(sheet_spec_dict),
+                                 lambda sheet_name: sheet_futures.pop(sheet_name).result())
+    OutputClass.success(f'{output_file_path} is generated!')
+    return output_file_path
+
+def main(argv: list[str] | None = None) -> list[str]:
+    '''
+    Command line entry point
+
+    Args:
+        argv (list[str] | None, optional): command line arguments. Defaults to None (sys.argv).
+
+    Returns:
+        output_file_paths (list[str]): full paths to masked files
+    '''
+    parser = argparse.ArgumentParser(description='Mask every sheet of XLSX files with a JSON or TOML workbook spec.')
+    parser.add_argument('--spec', required=True, help='workbook spec file (.json or .toml)')
+    parser.add_argument('--max-workers', type=int, default=None, help='processes to mask sheets in parallel')
+    parser.add_argument('input_file_paths', nargs='+', help='XLSX files to mask')
+    args = parser.parse_args(argv)
+
+    try:
+        masking_spec, sheet_specs = load_workbook_spec(args.spec)
+        return [mask_workbook(input_file_path, masking_spec, sheet_specs, args.max_workers) \
+                for input_file_path in args.input_file_paths]
+    # Missing optional packages (pyarrow, openpyxl, xlsxwriter) are reported like spec errors
+    except (MaskingSpecError, ImportError) as masking_error:
+        OutputClass.error(str(masking_error))
+
+# Program entry point
+if __name__ == '__main__':
+    main(sys.argv[1:])
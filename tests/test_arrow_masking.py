@@ -0,0 +1,59 @@
+'''
+    Tests for Parquet and Arrow masking
+'''
+import os
+import pandas as pd
+import batch_masking
+from masking_cache import MaskingCache
+
+def test_mask_parquet_and_feather(tmp_path) -> None:
+    '''
+    Parquet and Arrow files give the same masked cells as CSV files,
+    columns that are not masked keep their type.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_1.csv')
+    expected_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_1_Masked_Actual.csv', dtype=str)
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='rate',
+        measure_columns=['MEASURE_COLUMN_03', 'MEASURE_COLUMN_SUM'])
+    unmasked_data.to_parquet(str(tmp_path / 'rate.parquet'), index=False)
+    unmasked_data.to_feather(str(tmp_path / 'rate.feather'))
+    output_file_paths = batch_masking.mask_files(batch_masking.find_input_files([str(tmp_path)]), masking_spec)
+    assert len(output_file_paths) == 2
+    for output_file_path in output_file_paths:
+        if output_file_path.endswith('.parquet'):
+            masked_data: pd.DataFrame = pd.read_parquet(output_file_path)
+        else:
+            masked_data = pd.read_feather(output_file_path)
+        assert masked_data['MEASURE_COLUMN_RATE'].dtype == unmasked_data['MEASURE_COLUMN_RATE'].dtype
+        for column_name_enum in ['MEASURE_COLUMN_03', 'MEASURE_COLUMN_SUM']:
+            assert masked_data[column_name_enum].tolist() == expected_data[column_name_enum].tolist()
+
+def test_mask_parquet_options(tmp_path) -> None:
+    '''
+    Parallel masking, the masking cache and compact column types give the same masked Parquet file.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv')
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='2',
+        measure_columns=['MEASURE_COLUMN_SUM', 'MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03'])
+    input_file_path = str(tmp_path / 'sum.parquet')
+    unmasked_data.to_parquet(input_file_path, index=False)
+    expected_data: pd.DataFrame = pd.read_parquet(batch_masking.mask_file(input_file_path, masking_spec))
+    masking_spec.compact_dtypes = True
+    masking_cache = MaskingCache(str(tmp_path / 'cache'))
+    for _ in range(2):
+        masked_data: pd.DataFrame = pd.read_parquet(batch_masking.mask_file(input_file_path, masking_spec, max_workers=2,
+                                                                            masking_cache=masking_cache))
+        pd.testing.assert_frame_equal(masked_data, expected_data)
+    assert masking_cache.hits == 1 and masking_cache.misses == 1
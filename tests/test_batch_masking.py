@@ -0,0 +1,155 @@
+'''
+    Tests for headless masking with a masking spec
+'''
+import json
+import os
+import shutil
+import pandas as pd
+import batch_masking
+import masking_policy_for_small_populations
+
+def test_batch_masking_json_and_toml(tmp_path) -> None:
+    '''
+    Masking with a JSON or TOML spec gives the same file as the interactive routine.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'dummy_data_mea_col_rel_2.csv')
+    shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv', input_file_path)
+    expected_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2_Masked_Actual.csv', dtype=str)
+
+    spec_file_path = str(tmp_path / 'spec.json')
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        spec_file.write('''{
+            "partition_columns": ["PARTITION_COLUMN_01", "PARTITION_COLUMN_02", "PARTITION_COLUMN_03"],
+            "subcategory_columns": ["SUBCATEGORY_COLUMN_01", "SUBCATEGORY_COLUMN_02", "SUBCATEGORY_COLUMN_03"],
+            "measure_columns_relation_type": "sum",
+            "measure_columns": ["MEASURE_COLUMN_SUM", "MESAURE_COLUMN_01", "MEASURE_COLUMN_02", "MEASURE_COLUMN_03"]
+        }''')
+    output_file_paths = batch_masking.main(['--spec', spec_file_path, input_file_path])
+    pd.testing.assert_frame_equal(pd.read_csv(output_file_paths[0], dtype=str), expected_data)
+
+    spec_file_path = str(tmp_path / 'spec.toml')
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        spec_file.write('''
+            partition_columns = ["PARTITION_COLUMN_01", "PARTITION_COLUMN_02", "PARTITION_COLUMN_03"]
+            subcategory_columns = ["SUBCATEGORY_COLUMN_01", "SUBCATEGORY_COLUMN_02", "SUBCATEGORY_COLUMN_03"]
+            measure_columns_relation_type = "2"
+            measure_columns = ["MEASURE_COLUMN_SUM", "MESAURE_COLUMN_01", "MEASURE_COLUMN_02", "MEASURE_COLUMN_03"]
+            masking_string = "*"
+        ''')
+    masking_spec = batch_masking.load_masking_spec(spec_file_path)
+    masked_data: pd.DataFrame = pd.read_csv(batch_masking.mask_file(input_file_path, masking_spec), dtype=str)
+    pd.testing.assert_frame_equal(masked_data, expected_data.replace('Msk', '*'))
+
+    # All measure values of the dummy data are multiples of 5, nothing is masked below 5
+    masking_spec.gmp_msk_max = 4
+    masked_data = pd.read_csv(batch_masking.mask_file(input_file_path, masking_spec), dtype=str)
+    pd.testing.assert_frame_equal(masked_data, pd.read_csv(input_file_path, dtype=str))
+
+def test_mask_directory(tmp_path) -> None:
+    '''
+    Every unmasked file of a directory is masked, previously masked files are skipped.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    for file_number_enum in range(4):
+        shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv', str(tmp_path / f'table_{file_number_enum}.csv'))
+    shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2_Masked_Actual.csv', str(tmp_path / 'table_0_Masked.csv'))
+    expected_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2_Masked_Actual.csv', dtype=str)
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='2',
+        measure_columns=['MEASURE_COLUMN_SUM', 'MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03'])
+    output_file_paths = batch_masking.mask_directory(str(tmp_path), masking_spec, max_workers=2)
+    assert [os.path.basename(output_file_path) for output_file_path in output_file_paths] == \
+        [f'table_{file_number_enum}_Masked.csv' for file_number_enum in range(4)]
+    for output_file_path in output_file_paths:
+        pd.testing.assert_frame_equal(pd.read_csv(output_file_path, dtype=str), expected_data)
+
+def test_mask_directory_masked_cells(tmp_path) -> None:
+    '''
+    Masking a directory twice with --masked-cells skips the _Masked_cells.csv files of the first run.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_dir_path = tmp_path / 'tables'
+    input_dir_path.mkdir()
+    for file_number_enum in range(2):
+        shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv', str(input_dir_path / f'table_{file_number_enum}.csv'))
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='2',
+        measure_columns=['MEASURE_COLUMN_SUM', 'MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03'])
+    spec_file_path = str(tmp_path / 'spec.json')
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        json.dump(masking_spec.to_dict(), spec_file)
+    for _ in range(2):
+        output_file_paths = batch_masking.main(['--spec', spec_file_path, '--masked-cells', str(input_dir_path)])
+        assert [os.path.basename(output_file_path) for output_file_path in output_file_paths] == \
+            [f'table_{file_number_enum}_Masked_cells.csv' for file_number_enum in range(2)]
+
+def test_compact_dtypes(tmp_path) -> None:
+    '''
+    Compacting column types at load gives the same masked file
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    masked_data_list = []
+    for compact_dtypes in [False, True]:
+        input_file_path = str(tmp_path / f'compact_{compact_dtypes}.csv')
+        shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_1.csv', input_file_path)
+        masking_spec = batch_masking.MaskingSpec(
+            partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+            subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+            measure_columns_relation_type='rate',
+            measure_columns=['MEASURE_COLUMN_03', 'MEASURE_COLUMN_SUM'],
+            additional_masking_columns=['MEASURE_COLUMN_RATE'],
+            compact_dtypes=compact_dtypes)
+        masked_data_list.append(pd.read_csv(batch_masking.mask_file(input_file_path, masking_spec), dtype=str))
+    pd.testing.assert_frame_equal(*masked_data_list)
+    _, compact_data = masking_policy_for_small_populations.import_unmasked_data(
+        input_file_path, **masking_spec.import_arguments())
+    assert str(compact_data['PARTITION_COLUMN_01'].dtype) == 'category'
+
+def test_masking_spec_errors(tmp_path) -> None:
+    '''
+    Library functions raise MaskingSpecError, only the command line exits.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    spec_file_path = str(tmp_path / 'spec.json')
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        spec_file.write('{"partition_columns": [], "subcategory_columns": [], "measure_columns_relation_type": "rate", '
+                        '"measure_columns": ["MEASURE_COLUMN_01"]}')
+    try:
+        batch_masking.load_masking_spec(spec_file_path)
+        assert False, 'A rate spec with one Measure Column is invalid'
+    except batch_masking.MaskingSpecError as spec_error:
+        assert isinstance(spec_error, ValueError)
+        assert 'numerator and a denominator' in str(spec_error)
+    try:
+        batch_masking.main(['--spec', spec_file_path, str(tmp_path)])
+        assert False, 'The command line exits on an invalid spec'
+    except SystemExit as exit_error:
+        assert 'numerator and a denominator' in str(exit_error.code)
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        spec_file.write('{"partition_columns": [], "subcategory_columns": [], "measure_columns_relation_type": "none", '
+                        '"measure_columns": ["MEASURE_COLUMN_01"]}')
+    for option_names, error_text in [(['--stream', '--file-workers', '2'], '--stream cannot be combined with --file-workers'),
+                                     (['--stream', '--max-workers', '2'], '--stream cannot be combined with --max-workers'),
+                                     (['--file-workers', '2', '--max-workers', '2'],
+                                      '--file-workers cannot be combined with --max-workers'),
+                                     (['--presorted'], '--presorted requires --stream')]:
+        try:
+            batch_masking.main(['--spec', spec_file_path, *option_names, str(tmp_path)])
+            assert False, 'The command line exits on options that cannot be combined'
+        except SystemExit as exit_error:
+            assert error_text in str(exit_error.code)
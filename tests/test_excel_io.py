@@ -0,0 +1,69 @@
+'''
+    Tests for low-memory XLSX reading and writing
+'''
+import os
+import numpy as np
+import openpyxl
+import pandas as pd
+import batch_masking
+from excel_io import read_excel_low_memory, write_excel_low_memory
+
+def test_excel_round_trip(tmp_path) -> None:
+    '''
+    Low-memory reading and writing give the same data as pandas, missing values included
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_1.csv')
+    unmasked_data.loc[3, 'MEASURE_COLUMN_03'] = np.nan
+    write_excel_low_memory(unmasked_data, str(tmp_path / 'rate.xlsx'))
+    assert read_excel_low_memory(str(tmp_path / 'rate.xlsx')).equals(unmasked_data)
+    assert pd.read_excel(str(tmp_path / 'rate.xlsx')).equals(unmasked_data)
+    assert read_excel_low_memory(str(tmp_path / 'rate.xlsx'), column_names=['MEASURE_COLUMN_SUM'], chunk_size=7) \
+        .equals(unmasked_data[['MEASURE_COLUMN_SUM']])
+
+def test_excel_read_parity(tmp_path) -> None:
+    '''
+    Column names and types match pd.read_excel whatever the chunk size, with blank and repeated headers,
+    columns empty in the first chunks, blank rows and a row wider than the header
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    worksheet.append(['COUNT', None, 'COUNT', 'LATE_COUNT', 'FLAG', 'LATE_TEXT'])
+    for row_enum in range(30):
+        worksheet.append([row_enum, f'S{row_enum}' if row_enum % 3 else None, row_enum * 1.5,
+                          row_enum if row_enum >= 20 else None, row_enum % 2 == 0, f'T{row_enum}' if row_enum >= 25 else None])
+    worksheet.append([])
+    worksheet.append([30, 'S30', 45.0, 30, True, 'T30', 'WIDE'])
+    worksheet.append([])
+    workbook.save(str(tmp_path / 'sheet.xlsx'))
+    expected_data: pd.DataFrame = pd.read_excel(str(tmp_path / 'sheet.xlsx'))
+    for chunk_size_enum in [1, 7, 100]:
+        pd.testing.assert_frame_equal(read_excel_low_memory(str(tmp_path / 'sheet.xlsx'), chunk_size=chunk_size_enum),
+                                      expected_data)
+    pd.testing.assert_frame_equal(read_excel_low_memory(str(tmp_path / 'sheet.xlsx'), column_names=['LATE_COUNT', 'COUNT.1'],
+                                                        chunk_size=7), expected_data[['LATE_COUNT', 'COUNT.1']])
+
+def test_mask_xlsx(tmp_path) -> None:
+    '''
+    XLSX files give the same masked cells as CSV files
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_1.csv')
+    expected_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_1_Masked_Actual.csv', dtype=str)
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='rate',
+        measure_columns=['MEASURE_COLUMN_03', 'MEASURE_COLUMN_SUM'])
+    write_excel_low_memory(unmasked_data, str(tmp_path / 'rate.xlsx'))
+    output_file_path = batch_masking.mask_file(str(tmp_path / 'rate.xlsx'), masking_spec)
+    masked_data: pd.DataFrame = pd.read_excel(output_file_path, dtype=str)
+    for column_name_enum in ['MEASURE_COLUMN_03', 'MEASURE_COLUMN_SUM']:
+        assert masked_data[column_name_enum].tolist() == expected_data[column_name_enum].tolist()
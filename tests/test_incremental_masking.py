@@ -0,0 +1,107 @@
+'''
+    Tests for incremental masking
+'''
+import json
+import pandas as pd
+import batch_masking
+import incremental_masking
+from synthetic_data import generate_masking_data, get_synthetic_masking_spec
+
+def test_incremental_masking(tmp_path) -> None:
+    '''
+    Appending a school year masks only the new partitions, and so does changing a partition in the
+    middle of the file; the output is the same as masking the whole file. Changing the spec masks
+    every partition again.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'table.csv')
+    history_data: pd.DataFrame = generate_masking_data(n_partitions=20, relation_type='2', seed=1)
+    new_year_data = generate_masking_data(n_partitions=20, relation_type='2', seed=2)
+    new_year_data['PARTITION_COLUMN_01'] = '2030/2031'
+    masking_spec = get_synthetic_masking_spec(history_data, '2')
+
+    history_data.to_csv(input_file_path, index=False)
+    output_file_path = incremental_masking.mask_file_incrementally(input_file_path, masking_spec)
+    with open(incremental_masking.get_fingerprint_file_path(output_file_path), 'r', encoding='utf-8') as fingerprint_file:
+        assert len(json.load(fingerprint_file)['partitions']) == 20
+
+    pd.concat([history_data, new_year_data]).to_csv(input_file_path, index=False)
+    # Previous masked rows are kept, a tampered value shows that they are not masked again
+    previous_masked_data = pd.read_csv(output_file_path, dtype=str, keep_default_na=False)
+    previous_masked_data.loc[0, 'MEASURE_COLUMN_SUM'] = 'kept'
+    previous_masked_data.to_csv(output_file_path, index=False)
+    spec_file_path = str(tmp_path / 'spec.json')
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        json.dump(masking_spec.to_dict(), spec_file)
+    output_file_path = batch_masking.main(['--spec', spec_file_path, '--incremental', input_file_path])[0]
+    masked_data = pd.read_csv(output_file_path, dtype=str, keep_default_na=False)
+    assert masked_data.loc[0, 'MEASURE_COLUMN_SUM'] == 'kept'
+
+    full_file_path = str(tmp_path / 'full.csv')
+    pd.concat([history_data, new_year_data]).to_csv(full_file_path, index=False)
+    expected_data = pd.read_csv(batch_masking.mask_file(full_file_path, masking_spec), dtype=str, keep_default_na=False)
+    pd.testing.assert_frame_equal(masked_data.iloc[1:], expected_data.iloc[1:])
+
+    # A changed partition in the middle of the file is masked again and spliced in
+    changed_data = pd.concat([history_data, new_year_data], ignore_index=True)
+    changed_data.loc[100, 'MEASURE_COLUMN_01'] = 3
+    changed_data.loc[100, 'MEASURE_COLUMN_SUM'] += 3 - pd.concat([history_data, new_year_data]).iloc[100]['MEASURE_COLUMN_01']
+    for file_path_enum in [input_file_path, full_file_path]:
+        changed_data.to_csv(file_path_enum, index=False)
+    masked_data = pd.read_csv(incremental_masking.mask_file_incrementally(input_file_path, masking_spec),
+                              dtype=str, keep_default_na=False)
+    expected_data = pd.read_csv(batch_masking.mask_file(full_file_path, masking_spec), dtype=str, keep_default_na=False)
+    assert masked_data.loc[0, 'MEASURE_COLUMN_SUM'] == 'kept'
+    assert masked_data.loc[100, 'MEASURE_COLUMN_01'] == 'Msk'
+    pd.testing.assert_frame_equal(masked_data.iloc[1:], expected_data.iloc[1:])
+
+    masking_spec.gmp_msk_max = 4
+    masked_data = pd.read_csv(incremental_masking.mask_file_incrementally(input_file_path, masking_spec),
+                              dtype=str, keep_default_na=False)
+    assert masked_data.loc[0, 'MEASURE_COLUMN_SUM'] != 'kept'
+
+def test_incremental_masking_missing_partition(tmp_path) -> None:
+    '''
+    Rows with a blank partition value, in the history and in an appended year, are a partition of
+    their own: appending the year keeps the previous rows and the output is the same as masking the whole file
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'table.csv')
+    history_data: pd.DataFrame = generate_masking_data(n_partitions=5, relation_type='2', seed=1)
+    history_data.loc[[3, 40], 'PARTITION_COLUMN_03'] = None
+    new_year_data = generate_masking_data(n_partitions=5, relation_type='2', seed=2)
+    new_year_data['PARTITION_COLUMN_01'] = '2030/2031'
+    new_year_data.loc[[5], 'PARTITION_COLUMN_03'] = None
+    masking_spec = get_synthetic_masking_spec(history_data, '2')
+
+    history_data.to_csv(input_file_path, index=False)
+    output_file_path = incremental_masking.mask_file_incrementally(input_file_path, masking_spec)
+    previous_masked_data = pd.read_csv(output_file_path, dtype=str, keep_default_na=False)
+    previous_masked_data.loc[3, 'MEASURE_COLUMN_SUM'] = 'kept'
+    previous_masked_data.to_csv(output_file_path, index=False)
+
+    pd.concat([history_data, new_year_data]).to_csv(input_file_path, index=False)
+    masked_data = pd.read_csv(incremental_masking.mask_file_incrementally(input_file_path, masking_spec),
+                              dtype=str, keep_default_na=False)
+    assert masked_data.loc[3, 'MEASURE_COLUMN_SUM'] == 'kept'
+    full_file_path = str(tmp_path / 'full.csv')
+    pd.concat([history_data, new_year_data]).to_csv(full_file_path, index=False)
+    expected_data = pd.read_csv(batch_masking.mask_file(full_file_path, masking_spec), dtype=str, keep_default_na=False)
+    pd.testing.assert_frame_equal(masked_data.drop(index=3), expected_data.drop(index=3))
+    assert masked_data.loc[len(history_data) + 5, 'PARTITION_COLUMN_03'] == ''
+
+    # A changed value in the history masks its partition again, the blank partition rows are kept
+    changed_data = pd.concat([history_data, new_year_data], ignore_index=True)
+    changed_data.loc[100, 'MEASURE_COLUMN_01'] += 1
+    changed_data.loc[100, 'MEASURE_COLUMN_SUM'] += 1
+    for file_path_enum in [input_file_path, full_file_path]:
+        changed_data.to_csv(file_path_enum, index=False)
+    masked_data = pd.read_csv(incremental_masking.mask_file_incrementally(input_file_path, masking_spec),
+                              dtype=str, keep_default_na=False)
+    expected_data = pd.read_csv(batch_masking.mask_file(full_file_path, masking_spec), dtype=str, keep_default_na=False)
+    assert masked_data.loc[3, 'MEASURE_COLUMN_SUM'] == 'kept'
+    pd.testing.assert_frame_equal(masked_data.drop(index=3), expected_data.drop(index=3))
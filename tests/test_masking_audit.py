@@ -0,0 +1,62 @@
+'''
+    Tests for the reason-coded table of masked cells
+'''
+import json
+import os
+import shutil
+import pandas as pd
+import batch_masking
+from masking_audit import MaskingAudit, apply_masked_cell_table
+from masking_policy_for_small_populations import apply_full_masking
+
+def test_masked_cell_table(tmp_path) -> None:
+    '''
+    The --masked-cells option writes one line per masked cell, with a reason for each one;
+    applying the table to the unmasked file gives the masked file
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'dummy_data_mea_col_rel_1.csv')
+    shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_1.csv', input_file_path)
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='rate',
+        measure_columns=['MEASURE_COLUMN_03', 'MEASURE_COLUMN_SUM'],
+        additional_masking_columns=['MEASURE_COLUMN_RATE'])
+    spec_file_path = str(tmp_path / 'spec.json')
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        json.dump(masking_spec.to_dict(), spec_file)
+    masked_cell_file_path = batch_masking.main(['--spec', spec_file_path, '--masked-cells', input_file_path])[0]
+    assert masked_cell_file_path == str(tmp_path / 'dummy_data_mea_col_rel_1_Masked_cells.csv')
+    masked_cell_table = pd.read_csv(masked_cell_file_path)
+    assert set(masked_cell_table['reason']) <= {'primary', 'rate', 'additional', 'vertical:SUBCATEGORY_COLUMN_01+SUBCATEGORY_COLUMN_02',
+                                                'vertical:SUBCATEGORY_COLUMN_01+SUBCATEGORY_COLUMN_03',
+                                                'vertical:SUBCATEGORY_COLUMN_02+SUBCATEGORY_COLUMN_03'}
+    assert {'primary', 'rate', 'additional'} <= set(masked_cell_table['reason'])
+
+    expected_data = pd.read_csv(batch_masking.mask_file(input_file_path, masking_spec), dtype=str)
+    applied_file_path = str(tmp_path / 'applied.csv')
+    apply_masked_cell_table(pd.read_csv(input_file_path), masked_cell_table).to_csv(applied_file_path, index=False)
+    pd.testing.assert_frame_equal(pd.read_csv(applied_file_path, dtype=str), expected_data)
+
+def test_masked_cell_table_key_names() -> None:
+    '''
+    Key columns named like the table's own columns are prefixed instead of overwriting them
+    '''
+    unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_0.csv').rename(
+        columns={'PARTITION_COLUMN_01': 'row', 'PARTITION_COLUMN_02': 'column', 'SUBCATEGORY_COLUMN_01': 'reason'})
+    masking_audit = MaskingAudit()
+    apply_full_masking(unmasked_data, partition_column_numbers=['1', '2', '3'], subcategory_column_numbers=['4', '5', '6'],
+                       measure_columns_relation_type='0', measure_column_numbers=['7', '8', '9'], masking_audit=masking_audit)
+    masked_cell_table = masking_audit.to_frame()
+    assert list(masked_cell_table.columns) == ['row', 'key_row', 'key_column', 'PARTITION_COLUMN_03', 'key_reason',
+                                               'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03', 'column', 'reason']
+    assert (masked_cell_table['key_row'].to_numpy() == unmasked_data['row'].to_numpy()[masked_cell_table['row']]).all()
+    assert len(masked_cell_table) > 0
+    pd.testing.assert_frame_equal(apply_masked_cell_table(unmasked_data, masked_cell_table).astype(str),
+                                  apply_full_masking(unmasked_data, partition_column_numbers=['1', '2', '3'],
+                                                     subcategory_column_numbers=['4', '5', '6'],
+                                                     measure_columns_relation_type='0',
+                                                     measure_column_numbers=['7', '8', '9']).astype(str))
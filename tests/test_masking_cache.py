@@ -0,0 +1,45 @@
+'''
+    Tests for the on-disk masking cache
+'''
+import os
+import pandas as pd
+import masking_policy_for_small_populations
+from masking_cache import MaskingCache
+from synthetic_data import generate_masking_data, get_synthetic_masking_spec
+
+def test_masking_cache(tmp_path) -> None:
+    '''
+    A second run on the same data and spec is a cache hit with the same output; changing the
+    masking limits or a value is a miss. Least recently used files are evicted above the size limit.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    synthetic_data: pd.DataFrame = generate_masking_data(n_partitions=30, relation_type='2', seed=3)
+    masking_spec = get_synthetic_masking_spec(synthetic_data, '2')
+    masking_cache = MaskingCache(str(tmp_path / 'cache'))
+    expected_data = masking_policy_for_small_populations.apply_full_masking(
+        synthetic_data.copy(), **masking_spec.masking_arguments(synthetic_data.columns))
+
+    for _ in range(2):
+        masked_data = masking_policy_for_small_populations.apply_full_masking(
+            synthetic_data.copy(), masking_cache=masking_cache, **masking_spec.masking_arguments(synthetic_data.columns))
+        pd.testing.assert_frame_equal(masked_data, expected_data)
+    assert (masking_cache.hits, masking_cache.misses) == (1, 1)
+
+    masking_spec.gmp_msk_max = 4
+    masking_policy_for_small_populations.apply_full_masking(
+        synthetic_data.copy(), masking_cache=masking_cache, **masking_spec.masking_arguments(synthetic_data.columns))
+    changed_data = synthetic_data.copy()
+    changed_data.loc[0, 'MEASURE_COLUMN_01'] += 1
+    masking_policy_for_small_populations.apply_full_masking(
+        changed_data, masking_cache=masking_cache, **masking_spec.masking_arguments(changed_data.columns))
+    assert (masking_cache.hits, masking_cache.misses) == (1, 3)
+    assert len(os.listdir(masking_cache.cache_dir_path)) == 3
+
+    # A limit below two files keeps only the most recent one
+    cache_file_size = max(os.path.getsize(os.path.join(masking_cache.cache_dir_path, file_name_enum)) \
+                          for file_name_enum in os.listdir(masking_cache.cache_dir_path))
+    masking_cache.max_bytes = cache_file_size
+    masking_cache.evict()
+    assert len(os.listdir(masking_cache.cache_dir_path)) == 1
@@ -0,0 +1,145 @@
+'''
+    Tests for the vectorized masking engine
+'''
+import numpy as np
+import pandas as pd
+import masking_engine
+
+def test_simple_masking_missing_values() -> None:
+    '''
+    NaN, None and 'nan' are never masked, values within the limits are.
+    '''
+    unmasked_data: pd.DataFrame = pd.DataFrame({'A': [None, 'nan', 5, 12],
+                                                'B': [1.0, np.nan, 9, 0]})
+    measure_values = masking_engine.get_measure_value_matrix(unmasked_data, ['A', 'B'])
+    masked_cells = masking_engine.apply_simple_masking(measure_values, 1, 9)
+    assert masked_cells.tolist() == [[False, True],
+                                     [False, False],
+                                     [True, True],
+                                     [False, False]]
+
+def test_vertical_masking_groups() -> None:
+    '''
+    The two smallest non-zero values of each group are masked when the smallest is within the limit.
+    Rows with a missing partition value do not belong to any group.
+    '''
+    unmasked_data: pd.DataFrame = pd.DataFrame({'PARTITION': ['X', 'X', 'X', 'Y', 'Y', 'Y', None],
+                                                'SUBCATEGORY': ['A', 'B', 'All', 'A', 'B', 'All', 'A'],
+                                                'MEASURE': [0, 5, 20, 30, 40, 70, 3]})
+    measure_values = masking_engine.get_measure_value_matrix(unmasked_data, ['MEASURE'])
+    masked_cells = masking_engine.apply_vertical_masking(unmasked_data, measure_values,
+                                                         ['PARTITION'], ['SUBCATEGORY'], 9)
+    assert masked_cells[:, 0].tolist() == [False, True, True, False, False, False, False]
+
+def test_rate_masking_rows() -> None:
+    '''
+    Numerator and denominator are masked together.
+    '''
+    measure_values = np.array([[3, 50], [20, 40], [0, 12], [np.nan, np.nan]], dtype=float)
+    masked_cells = np.array([[True, False], [False, False], [False, True], [False, False]])
+    masked_cells = masking_engine.apply_rate_masking(measure_values, masked_cells, 1, 9)
+    assert masked_cells.tolist() == [[True, True],
+                                     [False, False],
+                                     [True, True],
+                                     [False, False]]
+
+def test_sum_masking_rows() -> None:
+    '''
+    Sum Column in the first position, followed by the Element Columns.
+    '''
+    measure_values = np.array([[45, 20, 15, 10],
+                               [30, 25, 5, 0],
+                               [60, 30, 20, 10],
+                               [12, 12, 0, 0]], dtype=float)
+    masked_cells = np.array([[True, False, False, False],
+                             [False, False, True, False],
+                             [False, True, False, False],
+                             [False, False, False, False]])
+    masked_cells = masking_engine.apply_sum_masking(measure_values, masked_cells, 9)
+    assert masked_cells.tolist() == [[True, True, True, True],
+                                     [False, True, True, False],
+                                     [False, True, False, True],
+                                     [False, False, False, False]]
+
+def test_parallel_masking_matches_serial() -> None:
+    '''
+    Masking shards of partitions in a process pool gives the same cells as serial masking.
+    '''
+    rng = np.random.default_rng(0)
+    n_rows = 2000
+    unmasked_data: pd.DataFrame = pd.DataFrame({'PARTITION': rng.integers(0, 50, n_rows).astype(str),
+                                                'SUBCATEGORY_01': rng.choice(['A', 'B', 'All'], n_rows),
+                                                'SUBCATEGORY_02': rng.choice(['X', 'Y', 'All'], n_rows),
+                                                'MEASURE_SUM': rng.integers(0, 60, n_rows),
+                                                'MEASURE_01': rng.integers(0, 30, n_rows),
+                                                'MEASURE_02': rng.integers(0, 30, n_rows)})
+    unmasked_data.loc[::97, 'PARTITION'] = None
+    masking_arguments = (['PARTITION'], ['SUBCATEGORY_01', 'SUBCATEGORY_02'], '2',
+                         ['MEASURE_SUM', 'MEASURE_01', 'MEASURE_02'], 1, 9)
+    serial_masked_cells = masking_engine.compute_masked_cells(unmasked_data, *masking_arguments)
+    parallel_masked_cells = masking_engine.compute_masked_cells_parallel(unmasked_data, *masking_arguments, max_workers=3)
+    assert np.array_equal(serial_masked_cells, parallel_masked_cells)
+
+def test_complementary_suppression_converges() -> None:
+    '''
+    After complementary suppression, no vertical group column and no Sum row holds a single masked
+    non-zero value next to unmasked non-zero values, and every primary masked cell stays masked.
+    '''
+    from synthetic_data import generate_masking_data
+    unmasked_data: pd.DataFrame = generate_masking_data(3000, relation_type='2', subcategory_cardinalities=(3, 2, 2),
+                                                        small_count_density=0.15, seed=3)
+    partition_column_names = ['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03']
+    subcategory_column_names = ['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03']
+    measure_column_names = ['MEASURE_COLUMN_SUM', 'MEASURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03']
+    masking_arguments = (partition_column_names, subcategory_column_names, '2', measure_column_names, 1, 9)
+    primary_masked_cells = masking_engine.compute_masked_cells(unmasked_data, *masking_arguments)
+    masked_cells = masking_engine.compute_masked_cells(unmasked_data, *masking_arguments, complementary_suppression=True)
+    assert (masked_cells >= primary_masked_cells).all() and masked_cells.sum() > primary_masked_cells.sum()
+
+    measure_values = unmasked_data[measure_column_names].to_numpy(dtype=float)
+    valid_cells = measure_values != 0
+    exposed_flags = lambda flags: (flags.sum() == 1) and (flags.sum() < valid_cells_enum.sum())
+    for subcategory_column_name in subcategory_column_names:
+        group_column_names = partition_column_names + [column_name_enum for column_name_enum in subcategory_column_names \
+                                                      if column_name_enum != subcategory_column_name]
+        for row_positions in unmasked_data.groupby(group_column_names).indices.values():
+            for column_position_enum in range(len(measure_column_names)):
+                valid_cells_enum = valid_cells[row_positions, column_position_enum]
+                assert not exposed_flags(masked_cells[row_positions, column_position_enum] & valid_cells_enum)
+    for row_position_enum in range(len(unmasked_data)):
+        valid_cells_enum = valid_cells[row_position_enum]
+        assert not exposed_flags(masked_cells[row_position_enum] & valid_cells_enum)
+        assert masked_cells[row_position_enum].all() or not masked_cells[row_position_enum, 0]
+
+    parallel_masked_cells = masking_engine.compute_masked_cells_parallel(unmasked_data, *masking_arguments, 2,
+                                                                         complementary_suppression=True)
+    assert (parallel_masked_cells == masked_cells).all()
+
+def test_vertical_kernels_agree() -> None:
+    '''
+    The loop kernel compiled with Numba and the NumPy kernel flag the same two smallest values as
+    get_group_two_smallest, with ties, zeros, missing values and rows without a group.
+    '''
+    import masking_kernels
+    rng = np.random.default_rng(0)
+    n_rows, n_groups = 3000, 400
+    measure_values = rng.integers(0, 15, (n_rows, 3)).astype(float)
+    measure_values[rng.random((n_rows, 3)) < 0.05] = np.nan
+    group_codes = rng.integers(-1, n_groups, n_rows)
+    group_codes[group_codes >= 0] = pd.factorize(group_codes[group_codes >= 0])[0]
+    n_groups = int(group_codes.max()) + 1
+
+    valid_cells, n1min, n2min = masking_engine.get_group_two_smallest(measure_values, group_codes, n_groups)
+    cell_groups = np.maximum(group_codes, 0)[:, None]
+    column_positions = np.arange(3)[None, :]
+    expected_limits = np.where(valid_cells & ((measure_values == n1min[cell_groups, column_positions])
+                                              | (measure_values == n2min[cell_groups, column_positions])),
+                               n1min[cell_groups, column_positions], np.inf)
+
+    row_order, group_offsets = masking_engine.get_group_offsets(group_codes, n_groups)
+    grouped_rows = row_order[group_offsets[0]:]
+    for kernel in [masking_kernels.get_sorted_vertical_limits_loop, masking_kernels.get_sorted_vertical_limits_numpy]:
+        sorted_limits = kernel(measure_values[grouped_rows], group_offsets - group_offsets[0])
+        assert np.array_equal(sorted_limits, expected_limits[grouped_rows])
+    assert np.array_equal(masking_engine.apply_group_masking(measure_values, group_codes, n_groups, 9),
+                          expected_limits <= 9)
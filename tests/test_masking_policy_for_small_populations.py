@@ -2,6 +2,8 @@
     _summary_
 '''
 import os
+import subprocess
+import sys
 from typing import Any, Iterator
 from _pytest.monkeypatch import MonkeyPatch
 from csv_diff import load_csv, compare
@@ -130,4 +132,15 @@ def test_full_run(monkeypatch: MonkeyPatch) -> None:
                 load_csv(infile_01),
                 load_csv(infile_02)
             )
-            print(diff)
\ No newline at end of file
+            print(diff)
+
+def test_import_is_lightweight() -> None:
+    '''
+    Importing the masking modules does not load pandas, numpy or tkinter
+    '''
+    code = 'import sys, masking_policy_for_small_populations, batch_masking; ' \
+           'print([m for m in ("pandas", "numpy", "tkinter") if m in sys.modules])'
+    environment = dict(os.environ, PYTHONPATH=f'{os.getcwd()}/src/masking_policy_for_small_populations_lib')
+    output = subprocess.run([sys.executable, '-c', code], env=environment, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    assert output == '[]'
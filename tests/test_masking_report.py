@@ -0,0 +1,55 @@
+'''
+    Tests for the masking run report
+'''
+import json
+import os
+import shutil
+import pandas as pd
+import batch_masking
+import masking_policy_for_small_populations
+from masking_report import MaskingReport
+from synthetic_data import generate_masking_data, get_synthetic_masking_spec
+
+def test_masking_report() -> None:
+    '''
+    The run report records every phase and hook events without changing the masked data.
+    Cells masked by the three procedures add up to the masked measure cells.
+    '''
+    synthetic_data: pd.DataFrame = generate_masking_data(2000, relation_type='1', small_count_density=0.4)
+    masking_arguments = get_synthetic_masking_spec(synthetic_data, '1').masking_arguments(synthetic_data.columns)
+    hook_events: list[tuple[str, str]] = []
+    masking_report = MaskingReport(hooks=[lambda event, phase_record: hook_events.append((event, phase_record['name']))],
+                                   track_memory=True)
+    masked_data = masking_policy_for_small_populations.apply_full_masking(synthetic_data.copy(), masking_report=masking_report,
+                                                                          **masking_arguments)
+    pd.testing.assert_frame_equal(masked_data, masking_policy_for_small_populations.apply_full_masking(synthetic_data.copy(),
+                                                                                                       **masking_arguments))
+
+    report_dict = masking_report.to_dict()
+    assert [phase_record['name'] for phase_record in report_dict['phases']] == ['simple', 'vertical', 'horizontal', 'masking_string']
+    assert hook_events[:2] == [('start', 'simple'), ('end', 'simple')] and len(hook_events) == 8
+    n_masked_cells = int((masked_data[['MEASURE_COLUMN_NUMERATOR', 'MEASURE_COLUMN_DENOMINATOR']] == 'Msk').sum().sum())
+    assert report_dict['cells_masked'] == n_masked_cells
+    assert report_dict['phases'][3]['cells_masked'] == int((masked_data == 'Msk').sum().sum())
+    assert report_dict['phases'][1]['groups'] > 0 and report_dict['rows'] == 2000
+    assert report_dict['peak_memory_bytes'] > 0
+
+def test_batch_masking_report(tmp_path) -> None:
+    '''
+    The --report option writes a JSON run report next to the masked file
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'dummy_data_mea_col_rel_2.csv')
+    shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv', input_file_path)
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='sum',
+        measure_columns=['MEASURE_COLUMN_SUM', 'MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03'])
+    output_file_path = batch_masking.mask_file(input_file_path, masking_spec, report_flag=True)
+    with open(str(tmp_path / 'dummy_data_mea_col_rel_2_Masked_report.json'), 'r', encoding='utf-8') as report_file:
+        report_dict = json.load(report_file)
+    assert report_dict['output_file_path'] == output_file_path
+    assert report_dict['cells_masked'] == int((pd.read_csv(output_file_path, dtype=str) == 'Msk').sum().sum())
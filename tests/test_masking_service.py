@@ -0,0 +1,134 @@
+'''
+    Tests for the local masking service
+'''
+import json
+import os
+import shutil
+import signal
+import threading
+import urllib.error
+import urllib.request
+import pandas as pd
+import batch_masking
+import masking_service
+
+def test_masking_service(tmp_path) -> None:
+    '''
+    The service returns the same masked CSV as headless masking, the table of masked cells on request,
+    400 for a bad spec and 503 when every request slot is taken, and counts requests with their latency
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'dummy_data_mea_col_rel_2.csv')
+    shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv', input_file_path)
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='sum',
+        measure_columns=['MEASURE_COLUMN_SUM', 'MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03'])
+    service = masking_service.MaskingService(max_workers=1, max_pending=0)
+    http_server = masking_service.create_server(service, port=0)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    service_url = f'http://127.0.0.1:{http_server.server_address[1]}'
+    with open(input_file_path, 'rb') as input_file:
+        payload = input_file.read()
+
+    def post_csv(path: str, spec_dict: dict) -> urllib.request.Request:
+        return urllib.request.Request(service_url + path, data=payload, headers={
+            'Content-Type': masking_service.CSV_CONTENT_TYPE, 'X-Masking-Spec': json.dumps(spec_dict)})
+
+    try:
+        with urllib.request.urlopen(post_csv('/mask', masking_spec.to_dict())) as response:
+            masked_payload = response.read()
+            assert float(response.headers['X-Masking-Latency-Ms']) > 0
+        with open(batch_masking.mask_file(input_file_path, masking_spec), 'rb') as masked_file:
+            assert masked_payload == masked_file.read()
+        with urllib.request.urlopen(post_csv('/mask?output=cells', masking_spec.to_dict())) as response:
+            assert response.read().decode('utf-8').startswith('row,PARTITION_COLUMN_01')
+
+        for spec_dict, status_code in [({**masking_spec.to_dict(), 'measure_columns': ['MISSING_COLUMN', 'MEASURE_COLUMN_SUM']}, 400),
+                                       (masking_spec.to_dict(), 503)]:
+            if status_code == 503:
+                service.request_slots.acquire()
+            try:
+                urllib.request.urlopen(post_csv('/mask', spec_dict))
+                assert False
+            except urllib.error.HTTPError as http_error:
+                assert http_error.code == status_code
+        service.request_slots.release()
+
+        with urllib.request.urlopen(service_url + '/status') as response:
+            status_dict = json.loads(response.read())
+        assert (status_dict['requests'], status_dict['failed'], status_dict['rejected']) == (4, 1, 1)
+        assert status_dict['latency_ms_max'] >= status_dict['latency_ms_mean'] > 0
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+        service.close()
+
+
+def test_masking_service_limits(tmp_path) -> None:
+    '''
+    The service returns 413 for a body above its limit, masks files under its file root only (403 elsewhere,
+    and without a file root), and answers 500 when a worker dies, then starts new workers for the next requests
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    file_root_path = tmp_path / 'tables'
+    file_root_path.mkdir()
+    input_file_path = str(file_root_path / 'dummy_data_mea_col_rel_2.csv')
+    shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv', input_file_path)
+    outside_file_path = str(tmp_path / 'dummy_data_mea_col_rel_2.csv')
+    shutil.copy(input_file_path, outside_file_path)
+    spec_dict = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='sum',
+        measure_columns=['MEASURE_COLUMN_SUM', 'MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03']).to_dict()
+    service = masking_service.MaskingService(max_workers=1, max_pending=0, max_body_bytes=1024,
+                                             file_root_path=str(file_root_path))
+    http_server = masking_service.create_server(service, port=0)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    service_url = f'http://127.0.0.1:{http_server.server_address[1]}'
+
+    def get_status_code(path: str, payload: bytes) -> int:
+        try:
+            with urllib.request.urlopen(urllib.request.Request(service_url + path, data=payload)) as response:
+                return response.status
+        except urllib.error.HTTPError as http_error:
+            return http_error.code
+
+    def mask_file_payload(file_path: str) -> bytes:
+        return json.dumps({'input_file_path': file_path, 'spec': spec_dict}).encode('utf-8')
+
+    try:
+        with open(input_file_path, 'rb') as input_file:
+            assert get_status_code('/mask', input_file.read()) == 413
+        assert get_status_code('/mask-file', mask_file_payload(outside_file_path)) == 403
+        assert get_status_code('/mask-file', mask_file_payload('../dummy_data_mea_col_rel_2.csv')) == 403
+        assert get_status_code('/mask-file', b'{"spec": {}}') == 400
+        empty_file_path = str(file_root_path / 'empty.csv')
+        pd.read_csv(input_file_path, nrows=0).to_csv(empty_file_path, index=False)
+        assert get_status_code('/mask-file', mask_file_payload(empty_file_path)) == 400
+        assert get_status_code('/mask-file', mask_file_payload(input_file_path)) == 200
+        assert os.path.exists(str(file_root_path / 'dummy_data_mea_col_rel_2_Masked.csv'))
+        assert not os.path.exists(str(tmp_path / 'dummy_data_mea_col_rel_2_Masked.csv'))
+
+        os.kill(service.run(os.getpid), signal.SIGKILL)
+        assert get_status_code('/mask-file', mask_file_payload(input_file_path)) == 500
+        assert get_status_code('/mask-file', mask_file_payload(input_file_path)) == 200
+
+        local_service = masking_service.MaskingService(max_workers=1)
+        try:
+            local_service.get_local_file_path(input_file_path)
+            assert False
+        except PermissionError:
+            pass
+        finally:
+            local_service.close()
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+        service.close()
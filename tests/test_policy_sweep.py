@@ -0,0 +1,73 @@
+'''
+    Tests for the evaluation of several masking policies in one pass
+'''
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import policy_sweep
+from batch_masking import MaskingSpec, find_input_files
+from masking_engine import compute_masked_cells
+
+def test_sweep_matches_single_policies() -> None:
+    '''
+    Every policy of a sweep masks the same cells as a masking run with that policy alone
+    '''
+    measure_columns_dict = {'0': ['MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03'],
+                            '1': ['MEASURE_COLUMN_03', 'MEASURE_COLUMN_SUM'],
+                            '2': ['MEASURE_COLUMN_SUM', 'MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03']}
+    masking_policies = [policy_sweep.parse_masking_policy(policy_text_enum) for policy_text_enum in ['1-4', '1-9', '0-19', '5-9']]
+    masking_policies.append(policy_sweep.parse_masking_policy('1-9', complementary_suppression=True))
+    for relation_type_enum, measure_column_names in measure_columns_dict.items():
+        unmasked_data = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_{relation_type_enum}.csv')
+        masking_spec = MaskingSpec(
+            partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+            subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+            measure_columns_relation_type=relation_type_enum,
+            measure_columns=measure_column_names)
+        masked_cells_list, sweep_summary = policy_sweep.sweep_masking_policies(unmasked_data, masking_spec, masking_policies)
+        assert list(sweep_summary['policy']) == ['1-4', '1-9', '0-19', '5-9', '1-9']
+        for masking_policy, masked_cells, (_, summary_record) in zip(masking_policies, masked_cells_list, sweep_summary.iterrows()):
+            expected_masked_cells = compute_masked_cells(unmasked_data, masking_spec.partition_columns, masking_spec.subcategory_columns,
+                                                         relation_type_enum, measure_column_names, masking_policy.gmp_msk_min,
+                                                         masking_policy.gmp_msk_max,
+                                                         complementary_suppression=masking_policy.gmp_complementary)
+            assert np.array_equal(masked_cells, expected_masked_cells)
+            assert summary_record['cells_masked'] == expected_masked_cells.sum()
+            assert summary_record['primary'] + summary_record['vertical'] + summary_record['horizontal'] \
+                + summary_record['complementary'] == expected_masked_cells.sum()
+
+def test_sweep_command_line(tmp_path) -> None:
+    '''
+    The command line writes a summary line per policy and a table of the cells masked by any policy
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'dummy_data_mea_col_rel_1.csv')
+    shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_1.csv', input_file_path)
+    masking_spec = MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='rate',
+        measure_columns=['MEASURE_COLUMN_03', 'MEASURE_COLUMN_SUM'],
+        additional_masking_columns=['MEASURE_COLUMN_RATE'])
+    spec_file_path = str(tmp_path / 'spec.json')
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        json.dump(masking_spec.to_dict(), spec_file)
+    sweep_file_path = policy_sweep.main(['--spec', spec_file_path, '--policy', '1-4', '--policy', '1-9',
+                                         '--masked-cells', input_file_path])[0]
+    assert sweep_file_path == str(tmp_path / 'dummy_data_mea_col_rel_1_Policy_sweep.csv')
+    sweep_summary = pd.read_csv(sweep_file_path)
+    assert list(sweep_summary['policy']) == ['1-4', '1-9']
+    # Wider limits never mask fewer cells
+    assert sweep_summary['cells_masked'].is_monotonic_increasing
+    assert (sweep_summary['cells_masked'] == sweep_summary['primary'] + sweep_summary['vertical']
+            + sweep_summary['horizontal'] + sweep_summary['rows_masked']).all()
+
+    sweep_cell_table = pd.read_csv(str(tmp_path / 'dummy_data_mea_col_rel_1_Policy_sweep_cells.csv'))
+    assert sweep_cell_table['1-9'].all()
+    assert sweep_cell_table['1-4'].sum() + sweep_summary['rows_masked'][0] == sweep_summary['cells_masked'][0]
+    # Sweep outputs are not taken as input files when the directory is masked
+    assert find_input_files([str(tmp_path)]) == [input_file_path]
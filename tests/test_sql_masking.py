@@ -0,0 +1,78 @@
+'''
+    Tests for masking SQLite tables
+'''
+import json
+import os
+import shutil
+import sqlite3
+import pandas as pd
+import batch_masking
+import sql_masking
+
+def test_sql_masking(tmp_path) -> None:
+    '''
+    A SQLite table masked in small chunks gives the same rows as the masked CSV file,
+    in a <table>_masked table that is replaced on the next run
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'dummy_data_mea_col_rel_2.csv')
+    shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv', input_file_path)
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='sum',
+        measure_columns=['MEASURE_COLUMN_SUM', 'MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03'])
+    spec_file_path = str(tmp_path / 'spec.json')
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        json.dump(masking_spec.to_dict(), spec_file)
+    database_path = str(tmp_path / 'data.sqlite')
+    connection = sqlite3.connect(database_path)
+    pd.read_csv(input_file_path).to_sql('enrolment', connection, index=False)
+    connection.close()
+
+    for _ in range(2):
+        assert sql_masking.main(['--spec', spec_file_path, '--table', 'enrolment', '--chunk-size', '7', database_path]) \
+            == ['enrolment_masked']
+    connection = sqlite3.connect(database_path)
+    masked_file_path = str(tmp_path / 'enrolment_masked.csv')
+    pd.read_sql_query('SELECT * FROM enrolment_masked', connection).to_csv(masked_file_path, index=False)
+    connection.close()
+    masked_data = pd.read_csv(masked_file_path, dtype=str)
+    expected_data = pd.read_csv(batch_masking.mask_file(input_file_path, masking_spec), dtype=str)
+    column_names = list(expected_data.columns)
+    pd.testing.assert_frame_equal(masked_data.sort_values(column_names, ignore_index=True),
+                                  expected_data.sort_values(column_names, ignore_index=True))
+
+def test_sql_masking_additional_columns(tmp_path) -> None:
+    '''
+    Rate masking with an Additional Masking Column gives the same rows as the masked CSV file
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'dummy_data_mea_col_rel_1.csv')
+    shutil.copy(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_1.csv', input_file_path)
+    masking_spec = batch_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='rate',
+        measure_columns=['MEASURE_COLUMN_03', 'MEASURE_COLUMN_SUM'],
+        additional_masking_columns=['MEASURE_COLUMN_RATE'])
+    database_path = str(tmp_path / 'data.sqlite')
+    connection = sqlite3.connect(database_path)
+    pd.read_csv(input_file_path).to_sql('completion', connection, index=False)
+    connection.close()
+
+    assert sql_masking.mask_table(database_path, 'completion', masking_spec, chunk_size=5) == 'completion_masked'
+    connection = sqlite3.connect(database_path)
+    masked_file_path = str(tmp_path / 'completion_masked.csv')
+    pd.read_sql_query('SELECT * FROM completion_masked', connection).to_csv(masked_file_path, index=False)
+    connection.close()
+    masked_data = pd.read_csv(masked_file_path, dtype=str)
+    expected_data = pd.read_csv(batch_masking.mask_file(input_file_path, masking_spec), dtype=str)
+    column_names = list(expected_data.columns)
+    assert (masked_data['MEASURE_COLUMN_RATE'] == 'Msk').any()
+    pd.testing.assert_frame_equal(masked_data.sort_values(column_names, ignore_index=True),
+                                  expected_data.sort_values(column_names, ignore_index=True))
@@ -0,0 +1,90 @@
+'''
+    Tests for partition-chunked masking
+'''
+import os
+import pandas as pd
+import masking_policy_for_small_populations
+import streaming_masking
+from batch_masking import MaskingSpecError
+
+def test_stream_full_masking(tmp_path) -> None:
+    '''
+    Streaming masking gives the same cells as masking the whole file at once,
+    whether the partitions are spilled or read in sorted order.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv')
+    next_year_data: pd.DataFrame = unmasked_data.copy()
+    next_year_data['PARTITION_COLUMN_01'] = '2019/2020'
+    next_year_data['MEASURE_COLUMN_SUM'] += 3
+    unmasked_data = pd.concat([unmasked_data, next_year_data], ignore_index=True)
+    input_file_path = str(tmp_path / 'dummy_data_two_years.csv')
+    unmasked_data.to_csv(input_file_path, index=False)
+
+    column_arguments: dict = {'partition_column_numbers': ['1', '2', '3'],
+                              'subcategory_column_numbers': ['4', '5', '6'],
+                              'measure_columns_relation_type': '2',
+                              'measure_column_numbers': ['10', '7', '8', '9']}
+    expected_data = masking_policy_for_small_populations.apply_full_masking(unmasked_data, **column_arguments)
+    for presorted in [False, True]:
+        output_file_path = streaming_masking.stream_full_masking(input_file_path, chunk_size=10,
+                                                                 presorted=presorted, **column_arguments)
+        masked_data: pd.DataFrame = pd.read_csv(output_file_path, dtype=str)
+        pd.testing.assert_frame_equal(masked_data, expected_data, check_dtype=False)
+
+def test_stream_column_types_of_whole_file(tmp_path) -> None:
+    '''
+    A missing value in one partition only changes the type of its column in the whole file,
+    so every partition is written as when the whole file is masked at once.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv')
+    next_year_data: pd.DataFrame = unmasked_data.copy()
+    next_year_data['PARTITION_COLUMN_01'] = '2019/2020'
+    unmasked_data = pd.concat([unmasked_data, next_year_data], ignore_index=True)
+    unmasked_data['EXTRA_COLUMN'] = 7
+    # Integer columns with a missing value in the last partition only
+    for column_name_enum in ['MEASURE_COLUMN_02', 'EXTRA_COLUMN']:
+        unmasked_data[column_name_enum] = unmasked_data[column_name_enum].astype('Int64')
+        unmasked_data.loc[len(unmasked_data) - 1, column_name_enum] = None
+    input_file_path = str(tmp_path / 'dummy_data_two_years.csv')
+    unmasked_data.to_csv(input_file_path, index=False)
+
+    column_arguments: dict = {'partition_column_numbers': ['1', '2', '3'],
+                              'subcategory_column_numbers': ['4', '5', '6'],
+                              'measure_columns_relation_type': '2',
+                              'measure_column_numbers': ['10', '7', '8', '9']}
+    expected_file_path = str(tmp_path / 'expected.csv')
+    masking_policy_for_small_populations.apply_full_masking(pd.read_csv(input_file_path), **column_arguments) \
+        .to_csv(expected_file_path, index=False)
+    with open(expected_file_path, 'r', encoding='utf-8') as expected_file:
+        expected_text = expected_file.read()
+    assert '7.0' in expected_text
+    for presorted in [False, True]:
+        output_file_path = streaming_masking.stream_full_masking(input_file_path, chunk_size=7,
+                                                                 presorted=presorted, **column_arguments)
+        with open(output_file_path, 'r', encoding='utf-8') as output_file:
+            assert output_file.read() == expected_text
+
+def test_stream_non_csv_file(tmp_path) -> None:
+    '''
+    Streaming a file other than CSV raises MaskingSpecError instead of exiting
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_2.csv')
+    input_file_path = str(tmp_path / 'table.xlsx')
+    unmasked_data.to_excel(input_file_path, index=False)
+    try:
+        streaming_masking.stream_full_masking(input_file_path, partition_column_numbers=['1', '2', '3'],
+                                              subcategory_column_numbers=['4', '5', '6'],
+                                              measure_columns_relation_type='2',
+                                              measure_column_numbers=['10', '7', '8', '9'])
+        assert False
+    except MaskingSpecError as spec_error:
+        assert 'CSV files only' in str(spec_error)
@@ -0,0 +1,35 @@
+'''
+    Tests for the synthetic data generator
+'''
+import pandas as pd
+import masking_policy_for_small_populations
+from synthetic_data import ROLLUP_VALUE, generate_masking_data, get_synthetic_masking_spec
+
+def test_generate_masking_data() -> None:
+    '''
+    Synthetic data is reproducible, "All" rows hold the sums of the rows they roll up,
+    and the data can be masked with its spec.
+    '''
+    synthetic_data: pd.DataFrame = generate_masking_data(1000, relation_type='2', subcategory_cardinalities=(3, 2), seed=7)
+    assert len(synthetic_data) == 1000
+    pd.testing.assert_frame_equal(synthetic_data, generate_masking_data(1000, relation_type='2',
+                                                                        subcategory_cardinalities=(3, 2), seed=7))
+    assert not synthetic_data.equals(generate_masking_data(1000, relation_type='2', subcategory_cardinalities=(3, 2), seed=8))
+
+    complete_data = generate_masking_data(n_partitions=5, relation_type='2', subcategory_cardinalities=(3, 2))
+    assert len(complete_data) == 5 * 4 * 3
+    measure_column_names = ['MEASURE_COLUMN_SUM', 'MEASURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03']
+    leaf_data = complete_data[(complete_data['SUBCATEGORY_COLUMN_01'] != ROLLUP_VALUE) \
+                              & (complete_data['SUBCATEGORY_COLUMN_02'] != ROLLUP_VALUE)]
+    total_data = complete_data[(complete_data['SUBCATEGORY_COLUMN_01'] == ROLLUP_VALUE) \
+                               & (complete_data['SUBCATEGORY_COLUMN_02'] == ROLLUP_VALUE)]
+    assert (leaf_data.groupby('PARTITION_COLUMN_03')[measure_column_names].sum().to_numpy() \
+            == total_data.set_index('PARTITION_COLUMN_03')[measure_column_names].to_numpy()).all()
+    assert (complete_data['MEASURE_COLUMN_SUM'] == complete_data[measure_column_names[1:]].sum(axis=1)).all()
+
+    for relation_type_enum in ['0', '1', '2']:
+        synthetic_data = generate_masking_data(500, relation_type=relation_type_enum, small_count_density=0.5)
+        masking_spec = get_synthetic_masking_spec(synthetic_data, relation_type_enum)
+        masked_data = masking_policy_for_small_populations.apply_full_masking(
+            synthetic_data, **masking_spec.masking_arguments(synthetic_data.columns))
+        assert (masked_data[masking_spec.measure_columns] == 'Msk').any().all()
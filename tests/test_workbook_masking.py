@@ -0,0 +1,95 @@
+'''
+    Tests for multi-sheet workbook masking
+'''
+import os
+import zipfile
+import openpyxl
+import pandas as pd
+import workbook_masking
+from excel_io import ConstantMemoryExcelWriter
+
+def test_mask_workbook(tmp_path) -> None:
+    '''
+    Each listed sheet is masked with its own spec, in parallel, as if it were a file on its own.
+    Sheets that are not listed are copied unchanged.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'book.xlsx')
+    excel_writer = ConstantMemoryExcelWriter(input_file_path)
+    for sheet_name_enum in ['rel_0', 'rel_2']:
+        unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_{sheet_name_enum}.csv')
+        excel_writer.add_sheet(sheet_name_enum, list(unmasked_data.columns))
+        excel_writer.write_frame(unmasked_data)
+    notes_data = pd.DataFrame({'NOTE': ['Source: dummy data'], 'COUNT': [3]})
+    excel_writer.add_sheet('Notes', list(notes_data.columns))
+    excel_writer.write_frame(notes_data)
+    excel_writer.close()
+
+    spec_file_path = str(tmp_path / 'spec.json')
+    with open(spec_file_path, 'w', encoding='utf-8') as spec_file:
+        spec_file.write('''{
+            "partition_columns": ["PARTITION_COLUMN_01", "PARTITION_COLUMN_02", "PARTITION_COLUMN_03"],
+            "subcategory_columns": ["SUBCATEGORY_COLUMN_01", "SUBCATEGORY_COLUMN_02", "SUBCATEGORY_COLUMN_03"],
+            "sheets": {
+                "rel_0": {
+                    "measure_columns_relation_type": "none",
+                    "measure_columns": ["MESAURE_COLUMN_01", "MEASURE_COLUMN_02", "MEASURE_COLUMN_03"]
+                },
+                "rel_2": {
+                    "measure_columns_relation_type": "sum",
+                    "measure_columns": ["MEASURE_COLUMN_SUM", "MESAURE_COLUMN_01", "MEASURE_COLUMN_02", "MEASURE_COLUMN_03"]
+                }
+            }
+        }''')
+    output_file_path = workbook_masking.main(['--spec', spec_file_path, '--max-workers', '2', input_file_path])[0]
+    assert output_file_path.endswith('book__Masked.xlsx')
+
+    masked_sheets: dict[str, pd.DataFrame] = pd.read_excel(output_file_path, sheet_name=None, dtype=str)
+    assert list(masked_sheets) == ['rel_0', 'rel_2', 'Notes']
+    for sheet_name_enum in ['rel_0', 'rel_2']:
+        expected_data = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_{sheet_name_enum}_Masked_Actual.csv', dtype=str)
+        pd.testing.assert_frame_equal(masked_sheets[sheet_name_enum], expected_data)
+    pd.testing.assert_frame_equal(pd.read_excel(output_file_path, sheet_name='Notes'), notes_data)
+
+def test_copy_unlisted_sheets(tmp_path) -> None:
+    '''
+    Sheets that are not listed are copied byte for byte: formulas, formatting and blank rows are kept.
+
+    Args:
+        tmp_path (_type_): temporary directory
+    '''
+    input_file_path = str(tmp_path / 'book.xlsx')
+    unmasked_data: pd.DataFrame = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_0.csv')
+    workbook = openpyxl.Workbook()
+    data_worksheet = workbook.active
+    data_worksheet.title = 'rel_0'
+    data_worksheet.append(list(unmasked_data.columns))
+    for row_values in unmasked_data.itertuples(index=False, name=None):
+        data_worksheet.append(list(row_values))
+    summary_worksheet = workbook.create_sheet('Summary')
+    summary_worksheet['A1'] = 'Enrolment summary'
+    summary_worksheet['A1'].font = openpyxl.styles.Font(bold=True)
+    summary_worksheet['A4'] = 'Total'
+    summary_worksheet['B4'] = f'=SUM(rel_0!J2:J{len(unmasked_data) + 1})'
+    summary_worksheet['D6'] = 'Note beyond the title width'
+    workbook.save(input_file_path)
+
+    masking_spec = workbook_masking.MaskingSpec(
+        partition_columns=['PARTITION_COLUMN_01', 'PARTITION_COLUMN_02', 'PARTITION_COLUMN_03'],
+        subcategory_columns=['SUBCATEGORY_COLUMN_01', 'SUBCATEGORY_COLUMN_02', 'SUBCATEGORY_COLUMN_03'],
+        measure_columns_relation_type='none',
+        measure_columns=['MESAURE_COLUMN_01', 'MEASURE_COLUMN_02', 'MEASURE_COLUMN_03'])
+    output_file_path = workbook_masking.mask_workbook(input_file_path, sheet_specs={'rel_0': masking_spec})
+
+    with zipfile.ZipFile(input_file_path) as input_package, zipfile.ZipFile(output_file_path) as output_package:
+        assert output_package.read('xl/worksheets/sheet2.xml') == input_package.read('xl/worksheets/sheet2.xml')
+        assert output_package.read('xl/styles.xml') == input_package.read('xl/styles.xml')
+    masked_workbook = openpyxl.load_workbook(output_file_path)
+    assert masked_workbook.sheetnames == ['rel_0', 'Summary']
+    assert masked_workbook['Summary']['B4'].value == f'=SUM(rel_0!J2:J{len(unmasked_data) + 1})'
+    assert masked_workbook['Summary']['A1'].font.bold
+    assert masked_workbook['Summary']['D6'].value == 'Note beyond the title width'
+    expected_data = pd.read_csv(f'{os.getcwd()}/tests/dummy_data_mea_col_rel_0_Masked_Actual.csv', dtype=str)
+    pd.testing.assert_frame_equal(pd.read_excel(output_file_path, sheet_name='rel_0', dtype=str), expected_data)